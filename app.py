@@ -1,5 +1,5 @@
 import streamlit as st
-from src.layout import init_page
+from src.layout import init_page, render_debug_panel
 from src.views import configuration, scanner, gallery, export
 
 # 1. Init Page & Sidebar
@@ -18,22 +18,22 @@ if not game_name:
     </div>
     """, unsafe_allow_html=True)
 else:
-    # 3. Tabs Navigation (Contextual to the selected game)
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "⚙️ Configuration", 
-        "📸 Scanner", 
-        "🖼️ Galerie", 
-        "🖨️ Export PDF"
-    ])
-    
-    with tab1:
-        configuration.render(gm, game_name)
-    
-    with tab2:
-        scanner.render(gm, game_name)
-        
-    with tab3:
-        gallery.render(gm, game_name)
-        
-    with tab4:
-        export.render(gm, game_name)
+    # 3. Navigation (Contextual to the selected game)
+    # Contrairement à st.tabs, seule la vue active est exécutée à chaque rerun
+    views = {
+        "⚙️ Configuration": configuration,
+        "📸 Scanner": scanner,
+        "🖼️ Galerie": gallery,
+        "🖨️ Export": export,
+    }
+    active_view = st.radio(
+        "Vue", list(views.keys()),
+        horizontal=True,
+        key="active_view",
+        label_visibility="collapsed"
+    )
+
+    views[active_view].render(gm, game_name)
+
+# 4. Debug (?debug=1) : rendu en dernier pour compter les appels de tout le rerun
+render_debug_panel()
@@ -0,0 +1,341 @@
+"""
+Benchmark de la détection de cartes (src.utils) : précision des coins et vitesse.
+
+Corpus :
+    - synthétique : chaque PNG de carte du dépôt (data/**, carte_finale.png,
+      resultat.png) est posé sur un fond sombre avec une perspective connue,
+      puis décliné en variantes d'éclairage (sombre, surexposé, dégradé,
+      dominante, bruit + JPEG, flou). Les coins vrais sont ceux de la
+      transformation ; génération déterministe (graine fixe).
+    - photos réelles : benchmarks/detection/ground_truth.json liste des photos
+      (chemins relatifs à ce fichier) avec leurs 4 coins annotés à la main.
+      `--propose photo.jpg ...` ajoute des photos avec les coins détectés par
+      le mode "lignes", à corriger à la main avant de servir de référence.
+
+Pour chaque mode de détection (src.utils.MODES_DETECTION) :
+    latence par image (p50 / p95 / max de detourer_carte_precise), débit,
+    pic mémoire Python par image (tracemalloc), taux de succès et erreur de
+    coin (moyenne / max, en px et en % de la diagonale de la carte).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_detection --label v1
+    python -m benchmarks.bench_detection --label v2 --compare benchmarks/results/detection_v1.jsonl
+    python -m benchmarks.bench_detection --write-corpus /tmp/corpus   # images à inspecter
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import MODES_DETECTION, detecter_coins, detourer_carte_precise
+from benchmarks.bench_export import RESULTS_DIR, default_label
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+GROUND_TRUTH = os.path.join(os.path.dirname(__file__), "detection", "ground_truth.json")
+PPI_SOURCE = 10  # Les PNG du dépôt sont des sorties du scanner : 10 px/mm
+PHOTO_W, PHOTO_H = 1200, 1600
+SEUIL = 45
+
+# Une détection est réussie si aucun coin n'est à plus de 1 % de la diagonale
+SUCCESS_TOLERANCE = 0.01
+
+GEOMETRIES = {
+    "face": {"rotation": 3, "perspective": 0.01},
+    "inclinee": {"rotation": 5, "perspective": 0.06},
+    "tournee": {"rotation": 18, "perspective": 0.02},
+}
+
+
+def _lighting(photo, variant, rng):
+    img = photo.astype(np.float32)
+    if variant == "sombre":
+        img *= 0.55
+    elif variant == "surexposee":
+        img *= 1.35
+    elif variant == "degrade":
+        ramp = np.linspace(0.5, 1.2, img.shape[1], dtype=np.float32)
+        img *= ramp[None, :, None]
+    elif variant == "dominante":
+        img *= np.array([0.8, 1.0, 1.15], dtype=np.float32)
+    elif variant == "bruit":
+        img += rng.normal(0, 8, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    if variant == "bruit":
+        img = cv2.imdecode(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 70])[1], cv2.IMREAD_COLOR)
+    elif variant == "flou":
+        img = cv2.GaussianBlur(img, (7, 7), 0)
+    return img
+
+
+LIGHTING = ("nominal", "sombre", "surexposee", "degrade", "dominante", "bruit", "flou")
+
+
+def source_cards():
+    """PNG de cartes du dépôt (BGRA) avec leurs dimensions en mm"""
+    paths = sorted(glob.glob(os.path.join(ROOT, "data", "**", "*.png"), recursive=True))
+    paths += [os.path.join(ROOT, name) for name in ("carte_finale.png", "resultat.png")]
+    cards = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            continue
+        if img.ndim == 2 or img.shape[2] == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA if img.ndim == 2 else cv2.COLOR_BGR2BGRA)
+        h, w = img.shape[:2]
+        cards.append({
+            "name": os.path.relpath(path, ROOT),
+            "image": img,
+            "width_mm": round(w / PPI_SOURCE),
+            "height_mm": round(h / PPI_SOURCE),
+        })
+    return cards
+
+
+def synthetic_photo(card, geometry, lighting, seed):
+    """Photo simulée d'une carte : (image BGR, coins vrais (4, 2) haut-gauche, haut-droite, bas-droite, bas-gauche)"""
+    rng = np.random.default_rng(seed)
+    img = card["image"]
+    h, w = img.shape[:2]
+    params = GEOMETRIES[geometry]
+
+    # Carte occupant ~70 % de la photo, centrée avec un léger décalage
+    scale = 0.7 * min(PHOTO_W / w, PHOTO_H / h) * rng.uniform(0.85, 1.0)
+    angle = np.radians(rng.uniform(-params["rotation"], params["rotation"]))
+    center = np.array([PHOTO_W / 2, PHOTO_H / 2]) + rng.uniform(-40, 40, 2)
+    local = np.array([[-w / 2, -h / 2], [w / 2, -h / 2], [w / 2, h / 2], [-w / 2, h / 2]]) * scale
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    corners = local @ rot.T + center
+    corners += rng.uniform(-1, 1, (4, 2)) * params["perspective"] * max(w, h) * scale
+    corners = corners.astype(np.float32)
+
+    src = np.array([[0, 0], [w, 0], [w, h], [0, h]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(src, corners)
+
+    # Fond sombre texturé (tapis / table), sous le seuil de détection
+    background = rng.normal(22, 6, (PHOTO_H, PHOTO_W, 1)).clip(0, 40).astype(np.float32)
+    background = cv2.GaussianBlur(np.repeat(background, 3, axis=2), (5, 5), 0)
+
+    warped = cv2.warpPerspective(img, M, (PHOTO_W, PHOTO_H), flags=cv2.INTER_LINEAR)
+    alpha = warped[:, :, 3:4].astype(np.float32) / 255.0
+    # Les zones sombres d'une carte restent au-dessus du fond (papier)
+    card_rgb = np.maximum(warped[:, :, :3].astype(np.float32), 70)
+    photo = card_rgb * alpha + background * (1 - alpha)
+    return _lighting(photo, lighting, rng), corners
+
+
+def synthetic_corpus():
+    corpus = []
+    for c_idx, card in enumerate(source_cards()):
+        for g_idx, geometry in enumerate(GEOMETRIES):
+            for l_idx, lighting in enumerate(LIGHTING):
+                seed = c_idx * 1000 + g_idx * 100 + l_idx
+                photo, corners = synthetic_photo(card, geometry, lighting, seed)
+                corpus.append({
+                    "name": f"{card['name']}|{geometry}|{lighting}",
+                    "kind": "synthetique",
+                    "image": photo,
+                    "corners": corners,
+                    "width_mm": card["width_mm"],
+                    "height_mm": card["height_mm"],
+                })
+    return corpus
+
+
+def load_ground_truth():
+    if not os.path.exists(GROUND_TRUTH):
+        return []
+    with open(GROUND_TRUTH, encoding="utf-8") as f:
+        entries = json.load(f).get("photos", [])
+    corpus = []
+    for entry in entries:
+        path = os.path.join(os.path.dirname(GROUND_TRUTH), entry["file"])
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"Photo introuvable : {path}")
+            continue
+        corpus.append({
+            "name": entry["file"],
+            "kind": "reelle",
+            "image": image,
+            "corners": np.array(entry["corners"], dtype=np.float32),
+            "width_mm": entry["width_mm"],
+            "height_mm": entry["height_mm"],
+        })
+    return corpus
+
+
+def propose(paths, width_mm, height_mm):
+    """Ajoute des photos au fichier de vérité terrain avec les coins détectés (à corriger à la main)"""
+    data = {"photos": []}
+    if os.path.exists(GROUND_TRUTH):
+        with open(GROUND_TRUTH, encoding="utf-8") as f:
+            data = json.load(f)
+    known = {p["file"] for p in data["photos"]}
+    for path in paths:
+        rel = os.path.relpath(os.path.abspath(path), os.path.dirname(GROUND_TRUTH))
+        if rel in known:
+            continue
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        corners, msg = detecter_coins(image, SEUIL, "lignes") if image is not None else (None, "illisible")
+        if corners is None:
+            print(f"{path} : {msg}, coins à saisir à la main")
+            corners = np.zeros((4, 2))
+        data["photos"].append({
+            "file": rel.replace(os.sep, "/"),
+            "corners": [[round(float(x), 1), round(float(y), 1)] for x, y in corners],
+            "width_mm": width_mm,
+            "height_mm": height_mm,
+            "verified": False,
+        })
+    with open(GROUND_TRUTH, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    print(f"{GROUND_TRUTH} : vérifier les coins (verified: true) avant de comparer des versions")
+
+
+def corner_error(found, truth):
+    """Erreur par coin (px) et en fraction de la diagonale de la carte"""
+    errors = np.linalg.norm(found - truth, axis=1)
+    diagonal = np.linalg.norm(truth[2] - truth[0])
+    return errors, errors / diagonal
+
+
+def bench_mode(mode, corpus, ppi):
+    latencies, mem_peaks, mean_errors, max_errors, rel_errors = [], [], [], [], []
+    failures, successes = 0, 0
+    start = time.perf_counter()
+    for item in corpus:
+        t0 = time.perf_counter()
+        _, ok, _ = detourer_carte_precise(item["image"], item["width_mm"], item["height_mm"], ppi, SEUIL, mode=mode)
+        latencies.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+
+    for item in corpus:
+        tracemalloc.start()
+        corners, _ = detecter_coins(item["image"], SEUIL, mode)
+        mem_peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+        tracemalloc.stop()
+        if corners is None:
+            failures += 1
+            continue
+        errors, rel = corner_error(corners, item["corners"])
+        mean_errors.append(float(errors.mean()))
+        max_errors.append(float(errors.max()))
+        rel_errors.append(float(rel.max()))
+        successes += int(rel.max() <= SUCCESS_TOLERANCE)
+
+    return {
+        "mode": mode,
+        "images": len(corpus),
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "images_per_s": len(corpus) / wall,
+        "mem_peak_mb": max(mem_peaks),
+        "failures": failures,
+        "success_rate": successes / len(corpus),
+        "err_mean_px": float(np.mean(mean_errors)) if mean_errors else None,
+        "err_max_px": float(np.max(max_errors)) if max_errors else None,
+        "err_max_diag_pct": float(np.max(rel_errors)) * 100 if rel_errors else None,
+    }
+
+
+def worst_cases(mode, corpus, n=5):
+    worst = []
+    for item in corpus:
+        corners, msg = detecter_coins(item["image"], SEUIL, mode)
+        err = float("inf") if corners is None else float(corner_error(corners, item["corners"])[0].max())
+        worst.append((err, item["name"]))
+    return sorted(worst, reverse=True)[:n]
+
+
+# Plus petit = mieux, sauf les champs de PLUS_GRAND
+COMPARED = ["p50_ms", "p95_ms", "mem_peak_mb", "err_mean_px", "err_max_px", "success_rate", "images_per_s"]
+PLUS_GRAND = ("success_rate", "images_per_s")
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["corpus"], r["mode"]): r for r in map(json.loads, f)}
+    print(f"\nComparaison avec {os.path.basename(baseline_path)} (ratio nouveau / ancien) :")
+    for r in results:
+        ref = baseline.get((r["corpus"], r["mode"]))
+        if not ref:
+            continue
+        ratios = []
+        for m in COMPARED:
+            if ref.get(m) and r.get(m) is not None:
+                ratio = r[m] / ref[m]
+                worse = ratio < 0.95 if m in PLUS_GRAND else ratio > 1.2
+                ratios.append(f"{m}={ratio:.2f}{' ⚠' if worse else ''}")
+        print(f"  {r['corpus']:<12} {r['mode']:<8} : " + ", ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark précision / vitesse de la détection de cartes")
+    parser.add_argument("--modes", nargs="+", default=list(MODES_DETECTION), choices=list(MODES_DETECTION))
+    parser.add_argument("--ppi", type=int, default=10, help="Résolution de sortie (px/mm)")
+    parser.add_argument("--label", default=None, help="Nom du fichier de résultats (défaut: git describe)")
+    parser.add_argument("--compare", default=None, help="Fichier .jsonl de référence")
+    parser.add_argument("--write-corpus", default=None, help="Ecrit le corpus synthétique (images + coins) dans ce dossier")
+    parser.add_argument("--propose", nargs="+", default=None, help="Photos à ajouter à la vérité terrain")
+    parser.add_argument("--size-mm", type=int, nargs=2, default=[60, 113], help="Dimensions des cartes proposées")
+    args = parser.parse_args()
+
+    if args.propose:
+        propose(args.propose, *args.size_mm)
+        return
+
+    corpora = {"synthetique": synthetic_corpus(), "reelle": load_ground_truth()}
+    if args.write_corpus:
+        os.makedirs(args.write_corpus, exist_ok=True)
+        truth = {}
+        for i, item in enumerate(corpora["synthetique"]):
+            filename = f"{i:04d}.jpg"
+            cv2.imwrite(os.path.join(args.write_corpus, filename), item["image"])
+            truth[filename] = {"source": item["name"], "corners": item["corners"].tolist()}
+        with open(os.path.join(args.write_corpus, "corners.json"), "w", encoding="utf-8") as f:
+            json.dump(truth, f, indent=2)
+        print(f"Corpus écrit dans {args.write_corpus}")
+
+    label = args.label or default_label()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"detection_{label}.jsonl")
+
+    results = []
+    for corpus_name, corpus in corpora.items():
+        if not corpus:
+            continue
+        print(f"\nCorpus {corpus_name} : {len(corpus)} images")
+        print(f"  {'mode':<8} {'p50':>7} {'p95':>7} {'img/s':>7} {'mém.':>7} {'échecs':>6} {'succès':>7} {'err moy':>8} {'err max':>8}")
+        for mode in args.modes:
+            r = {"label": label, "corpus": corpus_name, "ppi": args.ppi, **bench_mode(mode, corpus, args.ppi)}
+            results.append(r)
+            fmt = lambda v, spec: format(v, spec) if v is not None else "-"
+            print(
+                f"  {mode:<8} {r['p50_ms']:6.1f}ms {r['p95_ms']:6.1f}ms {r['images_per_s']:7.1f} "
+                f"{r['mem_peak_mb']:5.1f}Mo {r['failures']:6d} {r['success_rate']:7.0%} "
+                f"{fmt(r['err_mean_px'], '6.1f')}px {fmt(r['err_max_px'], '6.1f')}px"
+            )
+        for mode in args.modes:
+            cases = ", ".join(f"{name} ({err:.1f}px)" for err, name in worst_cases(mode, corpus, 3))
+            print(f"  Pires cas {mode} : {cases}")
+
+    with open(results_path, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps(r) + "\n")
+    print(f"\nRésultats : {results_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark de l'export sur des jeux synthétiques (stockage local, sans R2).
+
+Pour chaque scénario (decks x cartes x exemplaires x ppi), un jeu est généré dans
+un LocalS3Client puis l'export est mesuré étape par étape dans un process dédié
+(pic RSS propre au scénario) :
+    list   : GameManager.get_cards_by_type + dos pour chaque deck
+    fetch  : lecture des images (front + dos) vers des fichiers temporaires
+    layout : PDFGenerator.add_deck_section sur ces fichiers (sans accès au stockage)
+    save   : PDFGenerator.save
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_export --label v1
+    python -m benchmarks.bench_export --label v2 --compare benchmarks/results/v1.jsonl
+
+Les résultats sont ajoutés en JSON lines dans benchmarks/results/<label>.jsonl.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import itertools
+import subprocess
+import multiprocessing
+from queue import Empty
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+from src.pdf_generator import PDFGenerator
+from src.raster_generator import load_image_bytes
+from src.exporter import build_cards_data
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BUCKET = "bench"
+CARD_W_MM, CARD_H_MM = 63, 88
+
+# Métriques comparées entre deux versions (plus petit = mieux)
+COMPARED = ["t_list", "t_fetch", "t_layout", "t_save", "t_total", "peak_rss_mb", "output_mb"]
+
+
+def synthetic_card(w_px, h_px, seed):
+    """Carte BGRA pseudo-aléatoire (dégradé + bruit), peu compressible comme une vraie photo"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h_px, 0:w_px].astype(np.float32)
+    base = rng.uniform(0, 255, size=3).astype(np.float32)
+    img = np.empty((h_px, w_px, 4), dtype=np.uint8)
+    for ch in range(3):
+        grad = base[ch] + 80 * np.sin((xx * (ch + 1) + yy) / (w_px / 6))
+        img[:, :, ch] = np.clip(grad + rng.normal(0, 12, size=(h_px, w_px)), 0, 255)
+    img[:, :, 3] = 255
+    return img
+
+
+def generate_game(gm, game_name, n_decks, n_cards, count, ppi):
+    gm.create_game(game_name)
+    w_px, h_px = CARD_W_MM * ppi, CARD_H_MM * ppi
+    for d in range(n_decks):
+        deck = f"Deck{d:02d}"
+        gm.add_card_type(game_name, deck, CARD_W_MM, CARD_H_MM)
+        gm.save_back_image(game_name, deck, synthetic_card(w_px, h_px, seed=10_000 + d))
+        for c in range(n_cards):
+            gm.save_card(game_name, deck, synthetic_card(w_px, h_px, seed=d * 1000 + c), f"carte_{c:04d}", count=count)
+
+
+def run_scenario(storage_root, scenario, queue):
+    """Exécuté dans un process dédié : mesure chaque étape de l'export"""
+    import resource
+
+    gm = GameManager(s3=LocalS3Client(storage_root), bucket=BUCKET)
+    game_name = scenario["game"]
+    timings = {}
+
+    t0 = time.perf_counter()
+    decks = []
+    for deck in gm.get_card_types(game_name).values():
+        cards = gm.get_cards_by_type(game_name, deck['folder'])
+        back = gm.get_back_image_path(game_name, deck['folder'])
+        decks.append((deck, cards, back))
+    timings["t_list"] = time.perf_counter() - t0
+
+    # Les images sont copiées dans des fichiers temporaires : la mise en page ne lit
+    # plus le stockage, t_layout ne mesure que le décodage et la composition
+    fetch_dir = tempfile.mkdtemp(dir=storage_root)
+
+    def fetch(path, name):
+        data = load_image_bytes(path)
+        local = os.path.join(fetch_dir, name)
+        with open(local, "wb") as f:
+            f.write(data)
+        return local, len(data)
+
+    t0 = time.perf_counter()
+    fetched = 0
+    local_decks = []
+    for deck, cards, back in decks:
+        local_cards = []
+        for c in cards:
+            local, size = fetch(c['path'], f"{deck['folder']}_{c['filename']}")
+            local_cards.append({**c, 'path': local})
+            fetched += size
+        if back:
+            back, size = fetch(back, f"{deck['folder']}_back.png")
+            fetched += size
+        local_decks.append((deck, local_cards, back))
+    timings["t_fetch"] = time.perf_counter() - t0
+
+    pdf = PDFGenerator()
+    t0 = time.perf_counter()
+    for deck, cards, back in local_decks:
+        pdf.add_deck_section(build_cards_data(cards, back, deck['width_mm'], deck['height_mm']))
+    timings["t_layout"] = time.perf_counter() - t0
+
+    output_path = os.path.join(storage_root, f"{game_name}.pdf")
+    t0 = time.perf_counter()
+    ok, msg = pdf.save(output_path)
+    timings["t_save"] = time.perf_counter() - t0
+
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+    queue.put({
+        **timings,
+        "t_total": sum(timings.values()),
+        "ok": ok,
+        "pages": pdf.page,
+        "fetched_mb": fetched / 1e6,
+        "peak_rss_mb": rss_mb,
+        "output_mb": os.path.getsize(output_path) / 1e6 if ok else 0.0,
+    })
+
+
+def wait_measures(proc, queue, poll=1.0):
+    """Mesures du process de scénario, ou None s'il s'est terminé sans en envoyer (crash, OOM)"""
+    while True:
+        try:
+            return queue.get(timeout=poll)
+        except Empty:
+            if proc.exitcode is not None:
+                # Dernière chance : le résultat a pu arriver juste avant la fin du process
+                try:
+                    return queue.get(timeout=poll)
+                except Empty:
+                    return None
+
+
+def default_label():
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(__file__), text=True
+        ).strip()
+    except Exception:
+        return "local"
+
+
+def scenario_key(r):
+    return (r["decks"], r["cards"], r["count"], r["ppi"])
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {scenario_key(r): r for r in map(json.loads, f)}
+    print(f"\nComparaison avec {os.path.basename(baseline_path)} (ratio nouveau / ancien) :")
+    for r in results:
+        ref = baseline.get(scenario_key(r))
+        if not ref:
+            continue
+        ratios = []
+        for m in COMPARED:
+            if ref.get(m):
+                ratio = r[m] / ref[m]
+                flag = " ⚠" if ratio > 1.2 else ""
+                ratios.append(f"{m}={ratio:.2f}{flag}")
+        print(f"  {scenario_key(r)} : " + ", ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export PDF sur jeux synthétiques")
+    parser.add_argument("--decks", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--count", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--ppi", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--label", default=None, help="Nom du fichier de résultats (défaut: git describe)")
+    parser.add_argument("--compare", default=None, help="Fichier .jsonl de référence")
+    args = parser.parse_args()
+
+    label = args.label or default_label()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"{label}.jsonl")
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+
+    with tempfile.TemporaryDirectory() as storage_root:
+        gm = GameManager(s3=LocalS3Client(storage_root), bucket=BUCKET)
+        for n_decks, n_cards, count, ppi in itertools.product(args.decks, args.cards, args.count, args.ppi):
+            game_name = f"bench_{n_decks}x{n_cards}x{count}_{ppi}ppi"
+            generate_game(gm, game_name, n_decks, n_cards, count, ppi)
+
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_scenario, args=(storage_root, {"game": game_name}, queue))
+            proc.start()
+            measures = wait_measures(proc, queue)
+            proc.join()
+            if measures is None:
+                print(f"{game_name:<28} échec (process terminé avec le code {proc.exitcode})")
+                continue
+
+            result = {
+                "label": label, "decks": n_decks, "cards": n_cards, "count": count, "ppi": ppi,
+                **measures,
+            }
+            results.append(result)
+            print(
+                f"{game_name:<28} total {result['t_total']:7.2f}s "
+                f"(list {result['t_list']:.2f} / fetch {result['t_fetch']:.2f} / "
+                f"layout {result['t_layout']:.2f} / save {result['t_save']:.2f}) "
+                f"RSS {result['peak_rss_mb']:.0f} Mo, PDF {result['output_mb']:.1f} Mo, {result['pages']} pages"
+            )
+
+    with open(results_path, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps(r) + "\n")
+    print(f"\nRésultats : {results_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
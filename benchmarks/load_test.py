@@ -0,0 +1,425 @@
+"""
+Test de charge : N sessions concurrentes (galerie, scanner, export) sur un
+même GameManager, contre un stockage local avec latence et limitation de
+débit injectables (aucun appel R2).
+
+Chaque session exécute la vraie fonction render de sa vue via le harnais
+AppTest de Streamlit, puis l'action de la vue :
+    gallery : rendu puis pages suivantes
+    scanner : rendu puis détection + save_card d'une photo synthétique
+              (AppTest ne sait pas simuler un upload de fichier)
+    export  : rendu puis export_decks dans la session (le worker fait de même),
+              avec un cache de sections vide à chaque palier
+
+Les URL "presignées" pointent vers un serveur HTTP local qui lit les objets à
+travers le stockage simulé : les téléchargements d'images de l'export subissent
+la même latence et la même limitation de débit que les autres requêtes.
+
+Le rapport donne, pour chaque vue, le nombre de requêtes S3 par étape (passe
+de calibration séquentielle, cache froid puis chaud), les latences p50/p99 des
+étapes sous charge et le débit (étapes/s, requêtes S3/s) pour chaque nombre de
+sessions : le palier où le débit ne monte plus est la limite.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.load_test --sessions 1 4 16 --latency-ms 30
+    python -m benchmarks.load_test --sessions 8 --rate-limit 200 --label throttled
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+import numpy as np
+from botocore.exceptions import ClientError
+from fpdf.enums import ResourceAccessPolicy
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+from src.export_cache import SectionCache
+from src import exporter
+from src.exporter import export_decks
+from src.pdf_generator import PDFGenerator
+from src.utils import detourer_carte_precise
+from benchmarks.bench_export import RESULTS_DIR, CARD_W_MM, CARD_H_MM, synthetic_card, generate_game, default_label
+
+BUCKET = "load"
+GAME = "load_game"
+VIEWS = ("gallery", "scanner", "export")
+
+
+class SimulatedS3Client:
+    """
+    Enveloppe d'un LocalS3Client simulant un stockage distant :
+    latence (+ gigue) par requête, nombre de requêtes simultanées borné et
+    limitation de débit (seau à jetons) levant SlowDown comme R2 / S3.
+    """
+
+    # Opérations locales côté boto3 (pas d'aller-retour réseau)
+    LOCAL_OPERATIONS = ("generate_presigned_url",)
+
+    def __init__(self, inner, latency_ms=0, jitter_ms=0, rate_limit=None, max_inflight=None, seed=0):
+        self._inner = inner
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rate_limit = rate_limit
+        self.inflight = threading.BoundedSemaphore(max_inflight) if max_inflight else None
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tokens = float(rate_limit or 0)
+        self.refilled_at = time.monotonic()
+        self.requests = Counter()
+        self.throttled = 0
+        self.server = None  # ObjectServer des URL presignées
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests.clear()
+            self.throttled = 0
+
+    def stats(self):
+        with self.lock:
+            return dict(self.requests), self.throttled
+
+    def _take_token(self, operation):
+        if not self.rate_limit:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled_at) * self.rate_limit)
+            self.refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            self.throttled += 1
+        raise ClientError(
+            {"Error": {"Code": "SlowDown", "Message": "Please reduce your request rate."},
+             "ResponseMetadata": {"HTTPStatusCode": 503}},
+            operation
+        )
+
+    def _simulate(self, operation, func, *args, **kwargs):
+        with self.lock:
+            self.requests[operation] += 1
+            delay = self.latency + self.random.uniform(0, self.jitter)
+        self._take_token(operation)
+        if self.inflight:
+            self.inflight.acquire()
+        try:
+            time.sleep(delay)
+            return func(*args, **kwargs)
+        finally:
+            if self.inflight:
+                self.inflight.release()
+
+    def download(self, Bucket, Key):
+        """GET d'une URL presignée (compté à part des get_object de GameManager)"""
+        return self._simulate("url_get", self._inner.get_object, Bucket=Bucket, Key=Key)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        if self.server is None:
+            return self._inner.generate_presigned_url(ClientMethod, Params=Params, ExpiresIn=ExpiresIn)
+        return self.server.url(Params["Bucket"], Params["Key"])
+
+    def __getattr__(self, operation):
+        attr = getattr(self._inner, operation)
+        if not callable(attr) or operation in self.LOCAL_OPERATIONS:
+            return attr
+        return lambda *args, **kwargs: self._simulate(operation, attr, *args, **kwargs)
+
+
+class ObjectServer:
+    """Serveur HTTP local (127.0.0.1) des objets, lus à travers SimulatedS3Client.download"""
+
+    def __init__(self, storage):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                bucket, _, key = unquote(urlsplit(self.path).path).lstrip("/").partition("/")
+                try:
+                    data = storage.download(Bucket=bucket, Key=key)["Body"].read()
+                except ClientError as e:
+                    self.send_error(e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, name="object-server", daemon=True).start()
+        storage.server = self
+
+    def url(self, bucket, key):
+        return f"http://127.0.0.1:{self.httpd.server_port}/{bucket}/{quote(key)}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LoopbackPDFGenerator(PDFGenerator):
+    """fpdf refuse par défaut les URL d'adresses privées : le serveur d'objets est en 127.0.0.1"""
+
+    def __init__(self):
+        super().__init__()
+        self.resource_access_policy = ResourceAccessPolicy.ALL
+
+
+def _view_script(gm, game_name, view):
+    # Script AppTest : exécuté tel quel par Streamlit (imports inclus)
+    from src.views import gallery, scanner, export
+    {"gallery": gallery, "scanner": scanner, "export": export}[view].render(gm, game_name)
+
+
+def synthetic_photo(ppi, seed):
+    """Carte posée sur fond noir, légèrement décalée : entrée réaliste du scanner"""
+    card = synthetic_card(CARD_W_MM * ppi, CARD_H_MM * ppi, seed)[:, :, :3]
+    margin = 20 * ppi
+    photo = np.zeros((card.shape[0] + 2 * margin, card.shape[1] + 2 * margin, 3), dtype=np.uint8)
+    dx, dy = random.Random(seed).randint(0, margin), random.Random(seed + 1).randint(0, margin)
+    photo[dy:dy + card.shape[0], dx:dx + card.shape[1]] = np.maximum(card, 60)
+    return photo
+
+
+class Session:
+    """Une session opérateur : enchaîne rendu et actions d'une vue"""
+
+    def __init__(self, gm, view, steps, ppi, export_cache, export_dir, seed, timeout):
+        self.gm = gm
+        self.view = view
+        self.steps = steps
+        self.ppi = ppi
+        self.export_cache = export_cache
+        self.export_dir = export_dir
+        self.seed = seed
+        self.timeout = timeout
+        self.latencies = []  # (étape, secondes)
+        self.errors = 0
+        self.sections = Counter()  # sections d'export rendues / servies par le cache
+
+    def _timed(self, step, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            self.errors += 1
+            print(f"[{self.view}] {step} : {e}")
+        self.latencies.append((step, time.perf_counter() - start))
+
+    def _render(self):
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_function(_view_script, args=(self.gm, GAME, self.view), default_timeout=self.timeout)
+        self._timed("render", at.run)
+        if at.exception:
+            self.errors += len(at.exception)
+        return at
+
+    def run(self):
+        at = self._render()
+        config = self.gm._load_config(GAME).get("card_types", {})
+        folders = [d["folder"] for d in config.values()]
+        for i in range(self.steps):
+            if self.view == "gallery":
+                buttons = [b for b in at.button if b.key == "gallery_next"]
+                if not buttons or buttons[0].disabled:
+                    break
+                # Equivalent du bouton ▶ : AppTest relance tout le script, pas le fragment seul
+                at.session_state['gallery_page'] = at.session_state['gallery_page'] + 1
+                self._timed("action", at.run)
+            elif self.view == "scanner":
+                photo = synthetic_photo(self.ppi, self.seed * 1000 + i)
+                folder = folders[(self.seed + i) % len(folders)]
+
+                def scan():
+                    res, ok, msg = detourer_carte_precise(photo, CARD_W_MM, CARD_H_MM, self.ppi, 45)
+                    if not ok:
+                        raise RuntimeError(msg)
+                    ok, msg = self.gm.save_card(GAME, folder, res, f"scan_{self.seed:03d}_{i:03d}")
+                    if not ok:
+                        raise RuntimeError(msg)
+                self._timed("action", scan)
+            else:
+                output = os.path.join(self.export_dir, f"export_{self.seed}_{i}.pdf")
+
+                def export():
+                    ok, msg, stats = export_decks(self.gm, GAME, list(config.values()), output, cache=self.export_cache)
+                    if not ok:
+                        raise RuntimeError(msg)
+                    self.sections.update(rendered=stats["rendered"], cached=stats["cached"])
+                self._timed("action", export)
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def empty_section_cache(root):
+    """Cache de sections d'export neuf : chaque export y rend au moins une fois ses decks"""
+    return SectionCache(tempfile.mkdtemp(dir=root))
+
+
+def calibrate(gm, storage, args, sections_root, export_dir):
+    """Requêtes S3 par vue, une session à la fois (caches froids puis chauds)"""
+    counts = {}
+    for view in VIEWS:
+        for temperature in ("cold", "warm"):
+            if temperature == "cold":
+                gm.cache.clear()
+                gm.thumbnails.clear()
+                export_cache = empty_section_cache(sections_root)
+            storage.reset_stats()
+            session = Session(gm, view, 1, args.ppi, export_cache, export_dir, seed=900, timeout=args.timeout)
+            session.run()
+            requests, _ = storage.stats()
+            counts[(view, temperature)] = requests
+    return counts
+
+
+def run_load(gm, storage, n_sessions, args, sections_root, export_dir):
+    # Vues entrelacées selon les poids : même 3 sessions couvrent les trois vues
+    remaining = dict(zip(VIEWS, args.mix))
+    pool = []
+    while any(remaining.values()):
+        for view in VIEWS:
+            if remaining[view]:
+                pool.append(view)
+                remaining[view] -= 1
+    # Cache de sections neuf : sans lui, chaque export sous charge serait servi par le cache
+    export_cache = empty_section_cache(sections_root)
+    sessions = [
+        Session(gm, pool[i % len(pool)], args.steps, args.ppi, export_cache, export_dir, seed=i, timeout=args.timeout)
+        for i in range(n_sessions)
+    ]
+    gm.cache.clear()
+    gm.thumbnails.clear()
+    storage.reset_stats()
+    threads = [threading.Thread(target=s.run, name=f"session-{i}") for i, s in enumerate(sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    requests, throttled = storage.stats()
+
+    per_view = defaultdict(list)
+    errors = Counter()
+    sections = Counter()
+    for s in sessions:
+        per_view[s.view] += [sec for _, sec in s.latencies]
+        errors[s.view] += s.errors
+        sections += s.sections
+    steps = sum(len(v) for v in per_view.values())
+    total_requests = sum(requests.values())
+    return {
+        "sessions": n_sessions,
+        "wall_s": wall,
+        "steps": steps,
+        "steps_per_s": steps / wall,
+        "s3_requests": total_requests,
+        "s3_requests_per_s": total_requests / wall,
+        "throttled": throttled,
+        "export_sections": {"rendered": sections["rendered"], "cached": sections["cached"]},
+        "views": {
+            view: {
+                "steps": len(lat),
+                "p50_s": percentile(lat, 50),
+                "p99_s": percentile(lat, 99),
+                "errors": errors[view],
+            }
+            for view, lat in per_view.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des vues sur stockage local simulé")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--mix", type=int, nargs=3, default=[6, 3, 1], metavar=("GALERIE", "SCANNER", "EXPORT"),
+                        help="Poids des vues dans les sessions")
+    parser.add_argument("--steps", type=int, default=5, help="Actions par session")
+    parser.add_argument("--decks", type=int, default=4)
+    parser.add_argument("--cards", type=int, default=100, help="Cartes par deck")
+    parser.add_argument("--filler-games", type=int, default=0, help="Jeux vides supplémentaires (gros bucket)")
+    parser.add_argument("--ppi", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-limit", type=float, default=None, help="Requêtes/s max avant SlowDown")
+    parser.add_argument("--max-inflight", type=int, default=None, help="Requêtes simultanées max")
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout d'un rendu AppTest (s)")
+    parser.add_argument("--label", default=None, help="Nom du fichier de résultats (défaut: git describe)")
+    args = parser.parse_args()
+
+    label = args.label or default_label()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"load_{label}.jsonl")
+
+    with tempfile.TemporaryDirectory() as root:
+        # Génération sans latence, puis même arborescence vue à travers le stockage simulé
+        setup = GameManager(s3=LocalS3Client(root), bucket=BUCKET)
+        generate_game(setup, GAME, args.decks, args.cards, 1, args.ppi)
+        for i in range(args.filler_games):
+            setup.create_game(f"filler_{i:05d}")
+
+        storage = SimulatedS3Client(
+            LocalS3Client(root), args.latency_ms, args.jitter_ms, args.rate_limit, args.max_inflight
+        )
+        server = ObjectServer(storage)
+        exporter.PDFGenerator = LoopbackPDFGenerator
+        gm = GameManager(s3=storage, bucket=BUCKET)
+        sections_root = os.path.join(root, "sections")
+        export_dir = os.path.join(root, "exports")
+        os.makedirs(sections_root)
+        os.makedirs(export_dir)
+
+        counts = calibrate(gm, storage, args, sections_root, export_dir)
+        print("Requêtes S3 par vue (rendu + 1 action) :")
+        for (view, temperature), requests in counts.items():
+            detail = ", ".join(f"{op}={n}" for op, n in sorted(requests.items()))
+            print(f"  {view:<8} {temperature:<5} {sum(requests.values()):5d}  ({detail})")
+
+        results = []
+        print("\nCharge :")
+        for n in args.sessions:
+            r = run_load(gm, storage, n, args, sections_root, export_dir)
+            results.append(r)
+            views = " | ".join(
+                f"{v} p50 {s['p50_s']*1000:.0f} ms p99 {s['p99_s']*1000:.0f} ms"
+                + (f" ({s['errors']} err.)" if s['errors'] else "")
+                for v, s in sorted(r["views"].items())
+            )
+            print(
+                f"  {n:3d} sessions : {r['steps_per_s']:6.2f} étapes/s, {r['s3_requests_per_s']:7.1f} req/s"
+                + (f", {r['throttled']} SlowDown" if r['throttled'] else "") + f" — {views}"
+                + f" (exports : {r['export_sections']['rendered']} sections rendues, "
+                f"{r['export_sections']['cached']} en cache)"
+            )
+        server.close()
+        exporter.PDFGenerator = PDFGenerator
+
+    config = {k: getattr(args, k) for k in ("decks", "cards", "filler_games", "ppi", "latency_ms",
+                                            "jitter_ms", "rate_limit", "max_inflight", "steps", "mix")}
+    with open(results_path, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({"label": label, **config, **r}) + "\n")
+        f.write(json.dumps({
+            "label": label, **config, "calibration": {f"{v}/{t}": c for (v, t), c in counts.items()}
+        }) + "\n")
+    print(f"\nRésultats : {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Archive unique d'un jeu (config, métadonnées des decks, faces, dos) pour
+sauvegarde, restauration et clonage en un seul transfert.
+
+Usage en ligne de commande (depuis la racine du dépôt) :
+    python -m src.archive pack "Mon Jeu" mon_jeu.tar.gz
+    python -m src.archive unpack mon_jeu.tar.gz --name "Mon Jeu (copie)"
+    python -m src.archive unpack mon_jeu.tar.gz --local ./backup
+"""
+import io
+import json
+import time
+import tarfile
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.game_manager import StorageError
+
+ARCHIVE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def _list_game_objects(gm, game_name):
+    prefix = gm._get_game_path(game_name)
+    objects = []
+    kwargs = {'Bucket': gm.bucket, 'Prefix': prefix}
+    while True:
+        resp = gm.s3.list_objects_v2(**kwargs)
+        objects += resp.get('Contents', [])
+        if not resp.get('IsTruncated'):
+            return prefix, objects
+        kwargs['ContinuationToken'] = resp['NextContinuationToken']
+
+
+def _add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def pack_game(gm, game_name, fileobj, workers=8, progress=None):
+    """
+    Ecrit l'archive tar.gz d'un jeu dans fileobj (flux, pas de seek nécessaire).
+    Les objets sont téléchargés en parallèle mais écrits dans l'ordre, avec au
+    plus 2 x workers objets en mémoire.
+    Returns:
+        tuple: (succès, message, nombre d'objets)
+    """
+    try:
+        prefix, objects = _list_game_objects(gm, game_name)
+    except Exception as e:
+        return False, f"Erreur S3: {str(e)}", 0
+    if not objects:
+        return False, "Jeu vide ou introuvable.", 0
+
+    manifest = {
+        "format": ARCHIVE_FORMAT,
+        "game": game_name,
+        "created": time.time(),
+        "objects": [
+            {"path": o['Key'][len(prefix):], "size": o.get('Size', 0), "etag": o.get('ETag', '').strip('"')}
+            for o in objects
+        ],
+    }
+
+    def fetch(key):
+        return gm.s3.get_object(Bucket=gm.bucket, Key=key)['Body'].read()
+
+    try:
+        with tarfile.open(fileobj=fileobj, mode="w|gz") as tar, ThreadPoolExecutor(max_workers=workers) as pool:
+            _add_member(tar, MANIFEST_NAME, json.dumps(manifest, indent=4).encode("utf-8"))
+            window = deque()
+            pending = iter(objects)
+            done = 0
+            while True:
+                while len(window) < 2 * workers:
+                    obj = next(pending, None)
+                    if obj is None:
+                        break
+                    window.append((obj, pool.submit(fetch, obj['Key'])))
+                if not window:
+                    break
+                obj, future = window.popleft()
+                _add_member(tar, obj['Key'][len(prefix):], future.result())
+                done += 1
+                if progress:
+                    progress(done / len(objects), obj['Key'][len(prefix):])
+    except Exception as e:
+        return False, f"Erreur archive : {str(e)}", 0
+
+    return True, f"Archive créée ({len(objects)} fichiers).", len(objects)
+
+
+def unpack_game(gm, fileobj, new_name=None, workers=8, progress=None):
+    """
+    Restaure une archive dans le bucket de gm (éventuellement sous un autre nom).
+    L'archive est lue en flux ; les envois sont parallélisés.
+    Returns:
+        tuple: (succès, message)
+    """
+    uploads = threading.BoundedSemaphore(2 * workers)
+    errors = []
+
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|gz") as tar, ThreadPoolExecutor(max_workers=workers) as pool:
+            member = tar.next()
+            if member is None or member.name != MANIFEST_NAME:
+                return False, "Archive invalide (manifeste manquant)."
+            manifest = json.loads(tar.extractfile(member).read().decode("utf-8"))
+            if manifest.get("format") != ARCHIVE_FORMAT:
+                return False, f"Format d'archive non supporté : {manifest.get('format')}"
+
+            game_name = new_name or manifest["game"]
+            sanitized = "".join([c for c in game_name if c.isalnum() or c in (' ', '-', '_')]).strip()
+            if not sanitized:
+                return False, "Nom invalide."
+            if sanitized in gm.get_games():
+                return False, "Ce jeu existe déjà."
+
+            prefix = gm._get_game_path(sanitized)
+            expected = {o["path"] for o in manifest["objects"]}
+            total = len(expected)
+            restored = []
+
+            def upload(key, data):
+                try:
+                    gm.s3.put_object(Bucket=gm.bucket, Key=key, Body=data)
+                    gm._invalidate(key)
+                except Exception as e:
+                    errors.append(f"{key}: {e}")
+                finally:
+                    uploads.release()
+
+            # L'itération repasse par les membres déjà lus (le manifeste)
+            for member in tar:
+                if not member.isfile() or member.name == MANIFEST_NAME:
+                    continue
+                # Pas de chemins qui sortent du dossier du jeu
+                parts = member.name.split('/')
+                if member.name.startswith('/') or '..' in parts or member.name not in expected:
+                    errors.append(f"{member.name}: ignoré")
+                    continue
+                data = tar.extractfile(member).read()
+                uploads.acquire()
+                pool.submit(upload, prefix + member.name, data)
+                restored.append(member.name)
+                if progress:
+                    progress(len(restored) / total, member.name)
+    except (tarfile.TarError, OSError, ValueError, KeyError, StorageError) as e:
+        return False, f"Erreur archive : {str(e)}"
+
+    missing = expected - set(restored)
+    if errors or missing:
+        return False, f"Restauration incomplète : {len(errors)} erreur(s), {len(missing)} fichier(s) manquant(s)."
+    return True, f"Jeu '{sanitized}' restauré ({len(restored)} fichiers)."
+
+
+def clone_game(gm, game_name, new_name, target_gm=None, workers=8):
+    """Clone un jeu (dans le même bucket ou celui de target_gm) via une archive temporaire"""
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as tmp:
+        ok, msg, _ = pack_game(gm, game_name, tmp, workers)
+        if not ok:
+            return False, msg
+        tmp.seek(0)
+        return unpack_game(target_gm or gm, tmp, new_name, workers)
+
+
+def save_archive_to_bucket(gm, game_name, workers=8):
+    """Sauvegarde l'archive du jeu dans le bucket (archives/<jeu>.tar.gz) en un seul objet"""
+    key = f"archives/{game_name}.tar.gz"
+    with tempfile.TemporaryFile() as tmp:
+        ok, msg, _ = pack_game(gm, game_name, tmp, workers)
+        if not ok:
+            return False, msg
+        tmp.seek(0)
+        try:
+            gm.s3.put_object(Bucket=gm.bucket, Key=key, Body=tmp.read(), ContentType='application/gzip')
+        except Exception as e:
+            return False, f"Erreur S3: {str(e)}"
+    return True, f"Archive enregistrée : {key}"
+
+
+def main():
+    from src.game_manager import GameManager, create_game_manager
+    from src.local_storage import LocalS3Client
+
+    parser = argparse.ArgumentParser(description="Archive / restauration d'un jeu")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_pack = sub.add_parser("pack")
+    p_pack.add_argument("game")
+    p_pack.add_argument("output")
+    p_unpack = sub.add_parser("unpack")
+    p_unpack.add_argument("archive")
+    p_unpack.add_argument("--name", default=None, help="Nouveau nom du jeu")
+    p_unpack.add_argument("--local", default=None, help="Restaurer dans un dossier local au lieu du bucket")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        with open(args.output, "wb") as f:
+            ok, msg, _ = pack_game(create_game_manager(), args.game, f)
+    else:
+        gm = GameManager(s3=LocalS3Client(args.local), bucket="local") if args.local else create_game_manager()
+        with open(args.archive, "rb") as f:
+            ok, msg = unpack_game(gm, f, args.name)
+    print(msg)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
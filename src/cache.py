@@ -0,0 +1,111 @@
+import time
+import threading
+from src.metrics import metrics
+
+
+class _Flight:
+    """Chargement en cours d'une clé, partagé par les appelants concurrents"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+
+
+class TTLCache:
+    """
+    Cache mémoire thread-safe avec expiration, partagé par toutes les sessions.
+    Les clés sont des tuples (type, clé S3) pour pouvoir invalider un objet
+    sous toutes ses formes (contenu, URL, head, listing du dossier parent).
+    get_or_load regroupe les chargements concurrents d'une même clé (un seul
+    appel au stockage, les autres appelants attendent son résultat).
+    """
+
+    def __init__(self, default_ttl=60, max_entries=10000, name="default"):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (expire_at, value)
+        self.inflight = {}  # key -> _Flight
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retourne (trouvé, valeur)"""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.data[key]
+                self.misses += 1
+                hit = False
+            else:
+                self.hits += 1
+                hit = True
+        # Hors verrou : le registre de métriques a le sien
+        metrics.inc("cache_requests_total", cache=self.name, kind=str(key[0]), result="hit" if hit else "miss")
+        return (True, entry[1]) if hit else (False, None)
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            if len(self.data) >= self.max_entries:
+                self._evict()
+            self.data[key] = (time.monotonic() + (ttl or self.default_ttl), value)
+
+    def get_or_load(self, key, loader, ttl=None):
+        found, value = self.get(key)
+        if found:
+            return value
+
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+        if not leader:
+            metrics.inc("cache_requests_total", cache=self.name, kind=str(key[0]), result="coalesced")
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            # Pas de mise en cache si la clé a été invalidée pendant le chargement
+            if not flight.stale:
+                self.set(key, flight.value, ttl)
+        except Exception as e:
+            # Les erreurs ne sont pas mises en cache : seuls les appelants en attente les partagent
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.inflight.get(key) is flight:
+                    del self.inflight[key]
+            flight.event.set()
+        return flight.value
+
+    def invalidate(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+                flight = self.inflight.pop(key, None)
+                if flight is not None:
+                    flight.stale = True
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def _evict(self):
+        # Entrées expirées d'abord, puis les plus proches de l'expiration
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self.data.items() if exp < now]
+        for k in expired:
+            del self.data[k]
+        if len(self.data) >= self.max_entries:
+            oldest = sorted(self.data.items(), key=lambda item: item[1][0])
+            for k, _ in oldest[:len(self.data) // 10 + 1]:
+                del self.data[k]
@@ -0,0 +1,134 @@
+import threading
+import unicodedata
+
+
+def normalize(text):
+    """Forme de recherche : minuscules, sans accents"""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class CardIndex:
+    """
+    Index mémoire des cartes (nom, deck, dimensions, quantité, hash) de tous les
+    jeux, construit à partir de config.json, des listings des decks et des
+    cards.json (une carte sans métadonnées compte pour 1 exemplaire), tenu à
+    jour par GameManager à chaque écriture. Chaque jeu est chargé à sa première
+    recherche ; ensuite les recherches ne font aucun appel au stockage.
+    """
+
+    def __init__(self, load_config, load_deck_metadata, list_card_files, list_games):
+        self.load_config = load_config
+        self.load_deck_metadata = load_deck_metadata
+        self.list_card_files = list_card_files
+        self.list_games = list_games
+        self.lock = threading.Lock()
+        self.games = {}  # game -> {folder: {'deck': dict, 'cards': {filename: entry} ou None}}
+
+    # --- CHARGEMENT / MISE A JOUR ---
+    def _entry(self, deck, filename, info):
+        name = filename[:-4] if filename.endswith(".png") else filename
+        return {
+            "name": name,
+            "filename": filename,
+            "folder": deck["folder"],
+            "deck": deck["name"],
+            "width_mm": deck["width_mm"],
+            "height_mm": deck["height_mm"],
+            "count": info.get("count", 1),
+            "hash": info.get("hash"),
+            "key": normalize(name),
+        }
+
+    def _ensure(self, game_name):
+        """Charge ce qui manque (config, decks invalidés) ; retourne les decks du jeu"""
+        with self.lock:
+            decks = self.games.get(game_name)
+        if decks is None:
+            config = self.load_config(game_name)
+            decks = {
+                d["folder"]: {"deck": d, "cards": None}
+                for d in config.get("card_types", {}).values()
+            }
+            with self.lock:
+                decks = self.games.setdefault(game_name, decks)
+
+        for folder, slot in list(decks.items()):
+            if slot["cards"] is None:
+                meta = self.load_deck_metadata(game_name, folder)
+                self.update_deck(game_name, folder, meta)
+        with self.lock:
+            return dict(self.games.get(game_name, {}))
+
+    def update_deck(self, game_name, folder, meta):
+        """
+        Remplace les cartes d'un deck : celles de son listing, avec les informations
+        de son cards.json (déjà en main)
+        """
+        with self.lock:
+            if folder not in self.games.get(game_name, {}):
+                return
+        filenames = self.list_card_files(game_name, folder)
+        with self.lock:
+            slot = self.games.get(game_name, {}).get(folder)
+            if slot is None:
+                return
+            slot["cards"] = {
+                filename: self._entry(slot["deck"], filename, meta.get(filename) or {})
+                for filename in filenames
+            }
+
+    def drop_deck(self, game_name, folder):
+        with self.lock:
+            slot = self.games.get(game_name, {}).get(folder)
+            if slot is not None:
+                slot["cards"] = None
+
+    def drop_game(self, game_name):
+        with self.lock:
+            self.games.pop(game_name, None)
+
+    # --- REQUETES ---
+    def entries(self, game_name, folders=None):
+        decks = self._ensure(game_name)
+        result = []
+        for folder, slot in decks.items():
+            if folders is not None and folder not in folders:
+                continue
+            result += (slot["cards"] or {}).values()
+        return result
+
+    def search(self, game_name, query="", folders=None, min_count=None, dims=None):
+        """
+        Cartes dont le nom commence par / contient query (insensible à la casse
+        et aux accents). Les correspondances de préfixe viennent en premier.
+        dims : (largeur_mm, hauteur_mm) pour filtrer sur un format.
+        """
+        q = normalize(query.strip())
+        prefix, substring = [], []
+        for entry in self.entries(game_name, folders):
+            if min_count is not None and entry["count"] < min_count:
+                continue
+            if dims is not None and (entry["width_mm"], entry["height_mm"]) != tuple(dims):
+                continue
+            if entry["key"].startswith(q):
+                prefix.append(entry)
+            elif q in entry["key"]:
+                substring.append(entry)
+        order = lambda e: (e["key"], e["folder"])
+        return sorted(prefix, key=order) + sorted(substring, key=order)
+
+    def decks_containing(self, game_name, query):
+        """{nom du deck: nombre d'exemplaires} des cartes correspondant à query"""
+        decks = {}
+        for entry in self.search(game_name, query):
+            decks[entry["deck"]] = decks.get(entry["deck"], 0) + entry["count"]
+        return decks
+
+    def decks_containing_all(self, query):
+        """{(jeu, nom du deck): nombre d'exemplaires} des cartes correspondant à query, tous jeux confondus"""
+        decks = {}
+        for game_name in self.list_games():
+            for deck, n in self.decks_containing(game_name, query).items():
+                decks[(game_name, deck)] = n
+        return decks
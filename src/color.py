@@ -0,0 +1,107 @@
+import cv2
+import numpy as np
+from src.metrics import metrics
+
+# Gains de balance des blancs bornés : une référence imparfaite ne teinte pas tout le batch
+MIN_GAIN, MAX_GAIN = 0.5, 2.0
+# Référence inutilisable pour la balance des blancs : trop sombre (niveau moyen de la
+# médiane) ou trop colorée (écart entre canaux rapporté au plus fort)
+MIN_REFERENCE_LEVEL = 50
+MAX_REFERENCE_SATURATION = 0.4
+
+
+def _ring_mask(card, ring_px):
+    """Pixels opaques de la bordure de la carte (largeur ring_px)"""
+    h, w = card.shape[:2]
+    mask = np.zeros((h, w), dtype=bool)
+    mask[:ring_px, :] = True
+    mask[-ring_px:, :] = True
+    mask[:, :ring_px] = True
+    mask[:, -ring_px:] = True
+    if card.shape[2] == 4:
+        mask &= card[:, :, 3] > 0
+    return mask
+
+
+def _samples(card, source, ring_px, step):
+    """Echantillon (N, 3) de pixels BGR servant à l'estimation"""
+    if source == "bordure":
+        mask = _ring_mask(card, ring_px)
+    elif card.shape[2] == 4:
+        mask = card[:, :, 3] > 0
+    else:
+        mask = np.ones(card.shape[:2], dtype=bool)
+    # Sous-échantillonnage régulier : l'estimation n'a pas besoin de tous les pixels
+    return card[::step, ::step, :3][mask[::step, ::step]]
+
+
+@metrics.timed("color_seconds")
+def estimate_correction(cards, source="bordure", ring_mm=2, ppi=10, low_pct=0.5, high_pct=99.5, step=4):
+    """
+    Estime une correction commune à un batch de cartes redressées (BGRA).
+    - Balance des blancs : gains par canal rendant neutre la médiane des
+      pixels de référence (bordure des cartes, ou carte entière), bornés à
+      [MIN_GAIN, MAX_GAIN] ; ignorée si la référence est trop sombre ou trop
+      colorée pour être un blanc / gris.
+    - Niveaux : étirement entre les percentiles low_pct / high_pct de la
+      luminance de toutes les cartes du batch après balance.
+    Returns:
+        dict: {'luts': array (1, 256, 3) uint8, 'gains': (b, g, r), 'levels': (bas, haut),
+        'warning': message ou None} ou None si aucune carte
+    """
+    ring_px = max(1, int(ring_mm * ppi))
+    cards = [card for card in cards if card is not None]
+    reference = [_samples(card, source, ring_px, step) for card in cards]
+    reference = [p for p in reference if len(p)]
+    if not reference:
+        return None
+    reference = np.concatenate(reference).astype(np.float32)
+    median = np.median(reference, axis=0)
+    saturation = (median.max() - median.min()) / max(float(median.max()), 1.0)
+    warning = None
+    if median.mean() < MIN_REFERENCE_LEVEL:
+        warning = f"Référence trop sombre (niveau {median.mean():.0f}) : balance des blancs ignorée."
+    elif saturation > MAX_REFERENCE_SATURATION:
+        warning = f"Référence trop colorée (saturation {saturation:.0%}) : balance des blancs ignorée."
+    if warning:
+        gains = np.ones(3, dtype=np.float32)
+    else:
+        gains = np.clip(median.mean() / np.maximum(median, 1.0), MIN_GAIN, MAX_GAIN)
+
+    # Niveaux : sur le contenu complet des cartes, balance appliquée
+    content = np.concatenate([_samples(card, "carte", ring_px, step) for card in cards]).astype(np.float32)
+    balanced = np.clip(content * gains, 0, 255)
+    luminance = balanced @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+    low, high = np.percentile(luminance, [low_pct, high_pct])
+    if high - low < 10:
+        low, high = 0.0, 255.0
+
+    values = np.arange(256, dtype=np.float32)[:, None] * gains[None, :]
+    luts = np.clip((values - low) * 255.0 / (high - low), 0, 255).round().astype(np.uint8)
+    return {
+        "luts": luts.reshape(1, 256, 3),
+        "gains": tuple(float(g) for g in gains),
+        "levels": (float(low), float(high)),
+        "warning": warning,
+    }
+
+
+def apply_correction(card, correction):
+    """Applique les tables de correspondance (une passe cv2.LUT) ; l'alpha est conservé"""
+    if card is None or correction is None:
+        return card
+    bgr = cv2.LUT(np.ascontiguousarray(card[:, :, :3]), correction["luts"])
+    if card.shape[2] == 4:
+        return np.dstack([bgr, card[:, :, 3]])
+    return bgr
+
+
+@metrics.timed("color_seconds")
+def normalize_batch(cards, **kwargs):
+    """
+    Corrige toutes les cartes d'un batch avec une même estimation.
+    Returns:
+        tuple: (cartes corrigées, correction ou None)
+    """
+    correction = estimate_correction(cards, **kwargs)
+    return [apply_correction(card, correction) for card in cards], correction
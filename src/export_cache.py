@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+import tempfile
+
+# A incrémenter quand le rendu d'une section change (invalide tout le cache)
+CACHE_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "boardgame_print", "sections")
+
+
+def deck_manifest(deck, cards, back, layout):
+    """
+    Construit le manifeste d'un deck : tout ce qui influence le rendu de sa section.
+    deck: dict du type de carte (config.json)
+    cards: liste retournée par GameManager.get_cards_by_type
+    back: dict retourné par GameManager.get_back_image_info (ou None)
+    layout: dict des options de mise en page (marges, format, fond perdu, dpi)
+    Les dérivés d'impression sont identifiés par leur tag (image source + réglages).
+    """
+    return {
+        "version": CACHE_VERSION,
+        "folder": deck['folder'],
+        "width": deck['width_mm'],
+        "height": deck['height_mm'],
+        "cards": [[c['filename'], c.get('etag', ''), int(c.get('count', 1)), c.get('print_tag')] for c in cards],
+        "back": [back['etag'], back.get('print_tag')] if back else None,
+        "layout": layout,
+    }
+
+
+def manifest_hash(manifest):
+    """Hash stable (sha256) d'un manifeste"""
+    payload = json.dumps(manifest, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SectionCache:
+    """Cache disque des sections PDF déjà rendues, indexées par hash de manifeste"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Touch pour l'éviction LRU
+            os.utime(path, None)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        # Ecriture atomique : deux exports concurrents ne lisent jamais un fichier partiel
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error cache put {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.prune()
+
+    def prune(self):
+        """Supprime les sections les moins récemment utilisées au-delà de max_entries"""
+        try:
+            entries = [
+                os.path.join(self.cache_dir, f)
+                for f in os.listdir(self.cache_dir) if f.endswith(".pdf")
+            ]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
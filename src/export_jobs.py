@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_ROOT = os.path.join(tempfile.gettempdir(), "boardgame_print")
+
+# Etats d'un job
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+def _status_path(jobs_root, job_id):
+    return os.path.join(jobs_root, "jobs", f"{job_id}.json")
+
+
+def artifact_path(jobs_root, artifact_id, ext=".pdf"):
+    return os.path.join(jobs_root, "artifacts", f"{artifact_id}{ext}")
+
+
+def _write_status(jobs_root, job_id, **fields):
+    """Met à jour le fichier de statut d'un job (écriture atomique, lu par l'UI)"""
+    path = _status_path(jobs_root, job_id)
+    status = read_status(jobs_root, job_id) or {"job_id": job_id}
+    status.update(fields)
+    status["updated"] = time.time()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def read_status(jobs_root, job_id):
+    try:
+        with open(_status_path(jobs_root, job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _run_export_job(jobs_root, job_id, game_name, decks, store_in_bucket, output):
+    """Point d'entrée du process worker : génère l'export et publie la progression"""
+    # Imports locaux : le worker est un process "spawn" qui n'hérite pas de la session
+    from src.game_manager import create_game_manager
+    from src.exporter import export_decks, export_raster
+
+    _write_status(jobs_root, job_id, state=RUNNING, progress=0.0, message="Démarrage...")
+    gm = create_game_manager()
+    raster = output.get("mode") == "raster"
+    output_path = artifact_path(jobs_root, job_id, ".zip" if raster else ".pdf")
+
+    def progress(fraction, message):
+        _write_status(jobs_root, job_id, progress=fraction, message=message)
+
+    try:
+        if raster:
+            ok, msg, stats = export_raster(
+                gm, game_name, decks, output_path,
+                dpi=output.get("dpi", 300), fmt=output.get("format", "png"), progress=progress
+            )
+        else:
+            ok, msg, stats = export_decks(gm, game_name, decks, output_path, progress=progress)
+    except Exception as e:
+        ok, msg, stats = False, f"Erreur génération export : {str(e)}", {}
+
+    if not ok:
+        _write_status(jobs_root, job_id, state=ERROR, message=msg)
+        return
+
+    bucket_key = None
+    if store_in_bucket:
+        succ, result = gm.save_export(game_name, os.path.basename(output_path), output_path)
+        if succ:
+            bucket_key = result
+        else:
+            msg = f"{msg} (archivage bucket échoué : {result})"
+
+    _write_status(
+        jobs_root, job_id,
+        state=DONE, progress=1.0, message=msg, stats=stats,
+        artifact=output_path, bucket_key=bucket_key
+    )
+
+
+class ExportQueue:
+    """
+    File d'exports PDF exécutés par un process worker local.
+    Chaque job produit un artefact d'identifiant unique ; deux demandes identiques
+    (même jeu, mêmes decks) soumises pendant qu'un job tourne partagent ce job.
+    """
+
+    def __init__(self, jobs_root=JOBS_ROOT, max_workers=1):
+        self.jobs_root = jobs_root
+        os.makedirs(os.path.join(jobs_root, "jobs"), exist_ok=True)
+        os.makedirs(os.path.join(jobs_root, "artifacts"), exist_ok=True)
+        # "spawn" : ne pas forker le serveur Streamlit et ses threads
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self.lock = threading.Lock()
+        self.active = {}  # request_key -> job_id
+
+    @staticmethod
+    def _request_key(game_name, decks, output):
+        payload = json.dumps({"game": game_name, "decks": decks, "output": output}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, game_name, decks, store_in_bucket=False, output=None):
+        """
+        Soumet un export et retourne l'identifiant du job (existant si coalescé).
+        output: {'mode': 'pdf'} (défaut) ou {'mode': 'raster', 'dpi': 300, 'format': 'png'|'tiff'}
+        """
+        output = output or {"mode": "pdf"}
+        key = self._request_key(game_name, decks, output)
+        with self.lock:
+            job_id = self.active.get(key)
+            if job_id:
+                status = read_status(self.jobs_root, job_id)
+                if status and status.get("state") in (QUEUED, RUNNING):
+                    return job_id
+
+            job_id = uuid.uuid4().hex
+            _write_status(
+                self.jobs_root, job_id,
+                game=game_name, decks=[d['name'] for d in decks],
+                output=output, state=QUEUED, progress=0.0, message="En attente...", created=time.time()
+            )
+            future = self.executor.submit(
+                _run_export_job, self.jobs_root, job_id, game_name, decks, store_in_bucket, output
+            )
+            future.add_done_callback(lambda f, k=key, j=job_id: self._on_done(f, k, j))
+            self.active[key] = job_id
+        return job_id
+
+    def _on_done(self, future, key, job_id):
+        with self.lock:
+            if self.active.get(key) == job_id:
+                del self.active[key]
+        if future.exception() is not None:
+            # Crash du worker (le job n'a pas pu écrire son propre statut)
+            _write_status(self.jobs_root, job_id, state=ERROR, message=f"Erreur worker : {future.exception()}")
+
+    def status(self, job_id):
+        return read_status(self.jobs_root, job_id)
+
+    def list_jobs(self, game_name, limit=10):
+        """Derniers jobs d'un jeu, du plus récent au plus ancien"""
+        jobs_dir = os.path.join(self.jobs_root, "jobs")
+        jobs = []
+        for filename in os.listdir(jobs_dir):
+            if not filename.endswith(".json"):
+                continue
+            status = read_status(self.jobs_root, filename[:-len(".json")])
+            if status and status.get("game") == game_name:
+                jobs.append(status)
+        jobs.sort(key=lambda s: s.get("created", 0), reverse=True)
+        return jobs[:limit]
+
+    def prune(self, max_age_s=7 * 24 * 3600):
+        """Supprime les jobs terminés et leurs artefacts plus anciens que max_age_s"""
+        jobs_dir = os.path.join(self.jobs_root, "jobs")
+        now = time.time()
+        for filename in os.listdir(jobs_dir):
+            if not filename.endswith(".json"):
+                continue
+            job_id = filename[:-len(".json")]
+            status = read_status(self.jobs_root, job_id)
+            if not status or status.get("state") not in (DONE, ERROR):
+                continue
+            if now - status.get("updated", now) < max_age_s:
+                continue
+            for path in (_status_path(self.jobs_root, job_id), status.get("artifact") or ""):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_export_queue():
+    """File d'export partagée par toutes les sessions du process Streamlit"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ExportQueue()
+            _queue.prune()
+        return _queue
@@ -0,0 +1,162 @@
+import io
+import os
+import tempfile
+import zipfile
+from pypdf import PdfWriter
+from src.pdf_generator import PDFGenerator
+from src.raster_generator import RasterSheetGenerator
+from src.export_cache import SectionCache, deck_manifest, manifest_hash
+from src.metrics import metrics
+from src.print_derivative import print_tag
+
+
+def build_cards_data(cards, back_path, width, height, bleed=0, back_print_path=None):
+    """
+    Développe les cartes d'un deck selon leur nombre d'exemplaires (format add_deck_section).
+    Les dérivés d'impression ('print_path' des cartes, back_print_path) remplacent
+    les originaux quand ils existent.
+    """
+    cards_data = []
+    for c in cards:
+        qty = int(c.get('count', 1))
+        for _ in range(qty):
+            cards_data.append({
+                'front': c.get('print_path') or c['path'],
+                'back': back_print_path or back_path,
+                'width': width,
+                'height': height,
+                'bleed': bleed,
+                'front_bleed': bool(c.get('print_path')),
+                'back_bleed': bool(back_print_path)
+            })
+    return cards_data
+
+
+def with_print_path(gm, game_name, folder, image, filename, settings):
+    """
+    Ajoute à une carte (ou au dos) l'URL de son dérivé d'impression à jour et le tag
+    de ce dérivé (il identifie son contenu dans le manifeste de la section)
+    """
+    path = gm.get_print_path(game_name, folder, filename, image['etag'], settings)
+    return {**image, 'print_path': path, 'print_tag': print_tag(image['etag'], settings) if path else None}
+
+
+def export_decks(gm, game_name, decks, output_path, cache=None, progress=None):
+    """
+    Génère le PDF recto-verso des decks demandés.
+    Chaque deck est rendu dans sa propre section, mise en cache selon le hash
+    de son manifeste : seuls les decks modifiés sont re-téléchargés et re-rendus.
+    decks: liste de dicts de type de carte (config.json)
+    progress: callable(fraction, message) optionnel
+    Returns:
+        tuple: (succès, message, stats)
+    """
+    cache = cache or SectionCache()
+    # Dérivés d'impression (fond perdu) utilisés quand ils sont à jour
+    settings = gm.get_print_settings(game_name)
+    bleed = settings['bleed_mm'] if settings else 0
+    layout = {**PDFGenerator().layout_options(), "bleed": bleed, "dpi": settings['dpi'] if settings else None}
+    stats = {"rendered": 0, "cached": 0, "cards": 0}
+    sections = []
+
+    def report(fraction, message):
+        if progress:
+            progress(fraction, message)
+
+    for i, deck in enumerate(decks):
+        folder = deck['folder']
+        w, h = deck['width_mm'], deck['height_mm']
+
+        cards = gm.get_cards_by_type(game_name, folder)
+        if not cards:
+            continue
+        back = gm.get_back_image_info(game_name, folder)
+        if settings:
+            cards = [with_print_path(gm, game_name, folder, c, c['filename'], settings) for c in cards]
+            if back:
+                back = with_print_path(gm, game_name, folder, back, "back.png", settings)
+
+        key = manifest_hash(deck_manifest(deck, cards, back, layout))
+        data = cache.get(key)
+        metrics.inc("cache_requests_total", cache="export_sections", kind="section", result="hit" if data is not None else "miss")
+        if data is not None:
+            report(i / len(decks), f"{deck['name']} : inchangé (cache)")
+            stats["cached"] += 1
+        else:
+            report(i / len(decks), f"{deck['name']} : rendu (téléchargement images)...")
+            pdf = PDFGenerator()
+            pdf.add_deck_section(build_cards_data(
+                cards, back['path'] if back else None, w, h,
+                bleed=bleed, back_print_path=back.get('print_path') if back else None
+            ))
+            if pdf.page == 0:
+                # Format de carte trop grand pour la page
+                continue
+            data = pdf.to_bytes()
+            cache.put(key, data)
+            stats["rendered"] += 1
+
+        stats["cards"] += sum(int(c.get('count', 1)) for c in cards)
+        sections.append(data)
+
+    if not sections:
+        return False, "Aucune carte à imprimer.", stats
+
+    report(1.0, "Assemblage des sections...")
+    try:
+        with metrics.timer("pdf_stage_seconds", stage="merge"):
+            writer = PdfWriter()
+            for data in sections:
+                writer.append(io.BytesIO(data))
+            with open(output_path, "wb") as f:
+                writer.write(f)
+    except Exception as e:
+        return False, f"Erreur génération PDF : {str(e)}", stats
+
+    msg = (
+        f"PDF généré : {os.path.basename(output_path)} "
+        f"({stats['rendered']} deck(s) rendu(s), {stats['cached']} en cache)"
+    )
+    return True, msg, stats
+
+
+def export_raster(gm, game_name, decks, output_path, dpi=300, fmt="png", progress=None):
+    """
+    Génère les planches recto/verso aplaties (PNG/TIFF) des decks et les regroupe
+    dans une archive ZIP.
+    Returns:
+        tuple: (succès, message, stats)
+    """
+    stats = {"sheets": 0, "cards": 0}
+
+    def report(fraction, message):
+        if progress:
+            progress(fraction, message)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        generator = RasterSheetGenerator(tmp_dir, dpi=dpi, fmt=fmt)
+        for i, deck in enumerate(decks):
+            folder = deck['folder']
+            cards = gm.get_cards_by_type(game_name, folder)
+            if not cards:
+                continue
+            report(i / len(decks), f"{deck['name']} : composition des planches...")
+            back = gm.get_back_image_path(game_name, folder)
+            generator.add_deck_section(build_cards_data(cards, back, deck['width_mm'], deck['height_mm']))
+            stats["cards"] += sum(int(c.get('count', 1)) for c in cards)
+
+        ok, msg = generator.save()
+        if not ok:
+            return False, msg, stats
+
+        report(1.0, "Archivage des planches...")
+        try:
+            # Les planches sont déjà compressées : pas de recompression dans le ZIP
+            with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_STORED) as zf:
+                for path in generator.files:
+                    zf.write(path, arcname=os.path.basename(path))
+        except Exception as e:
+            return False, f"Erreur archive planches : {str(e)}", stats
+
+    stats["sheets"] = len(generator.files)
+    return True, msg, stats
@@ -1,55 +1,223 @@
 import os
 import io
+import copy
+import hashlib
 import json
+import threading
 import boto3
 from botocore.config import Config
 import cv2
 import numpy as np
 from dotenv import load_dotenv
+from src.cache import TTLCache
+from src.card_index import CardIndex
+from src.local_storage import LocalS3Client
+from src.metrics import metrics, InstrumentedS3Client
+from src.print_derivative import PRINT_DIR, make_print_image, print_tag, print_key
 
 load_dotenv()
 
+# Taille du pool de connexions HTTP : le client est partagé par toutes les sessions
+S3_POOL_SIZE = int(os.getenv("BOARDGAME_PRINT_S3_POOL_SIZE", "50"))
+# Durée de vie des entrées du cache partagé (configs, listings) et des URL presignées
+CACHE_TTL = int(os.getenv("BOARDGAME_PRINT_CACHE_TTL", "60"))
+URL_TTL = 3000  # < ExpiresIn (3600) pour ne jamais servir une URL expirée
+# Miniatures de la galerie : largeur (px) et nombre gardé en mémoire (invalidées à l'écriture)
+THUMB_WIDTH = 240
+THUMB_CACHE_SIZE = int(os.getenv("BOARDGAME_PRINT_THUMB_CACHE_SIZE", "2000"))
+THUMB_TTL = 3600
+# Nouvelles tentatives par requête (mode adaptatif : backoff + limitation de débit côté client)
+S3_MAX_ATTEMPTS = int(os.getenv("BOARDGAME_PRINT_S3_MAX_ATTEMPTS", "8"))
+
+# Codes d'erreur S3 / R2 : objet absent ou limitation de débit
+MISSING_CODES = ("NoSuchKey", "404", "NotFound")
+THROTTLING_CODES = (
+    "SlowDown", "Throttling", "ThrottlingException", "RequestLimitExceeded",
+    "TooManyRequests", "TooManyRequestsException", "RequestThrottled", "429", "503"
+)
+
+
+class StorageError(Exception):
+    """Stockage indisponible (à ne pas confondre avec un objet absent)"""
+
+
+class StorageThrottledError(StorageError):
+    """Limite de requêtes du stockage atteinte malgré les nouvelles tentatives"""
+
+
+def _error_code(e):
+    return str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+
+
+def _is_missing(e):
+    return _error_code(e) in MISSING_CODES
+
+
+def _storage_error(e, key):
+    code = _error_code(e)
+    if code in THROTTLING_CODES:
+        return StorageThrottledError(f"Stockage saturé ({code}) en lisant {key}, réessayez dans quelques secondes.")
+    return StorageError(f"Erreur stockage en lisant {key} : {e}")
+
+
+_MISSING = object()
+
+def create_s3_client():
+    """Client boto3 pour le bucket R2 configuré dans l'environnement"""
+    return boto3.client(
+        service_name="s3",
+        endpoint_url=os.getenv("CLOUFLARE_R2_URL"),
+        aws_access_key_id=os.getenv("CLOUFLARE_R2_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("CLOUFLARE_R2_SECRET_ACCESS_KEY"),
+        region_name="auto", # Required for R2
+        config=Config(
+            signature_version='s3v4',
+            max_pool_connections=S3_POOL_SIZE,
+            retries={'mode': 'adaptive', 'max_attempts': S3_MAX_ATTEMPTS}
+        )
+    )
+
+def create_game_manager():
+    """
+    GameManager de l'application. Si BOARDGAME_PRINT_WORKDIR est défini, il lit et
+    écrit dans cette copie de travail locale (synchronisée avec R2 par SyncEngine).
+    """
+    workdir = get_workdir()
+    if workdir:
+        bucket = os.getenv("CLOUFLARE_R2_BUCKET_NAME") or "local"
+        return GameManager(s3=LocalS3Client(workdir), bucket=bucket)
+    return GameManager()
+
+def get_workdir():
+    return os.getenv("BOARDGAME_PRINT_WORKDIR")
+
 class GameManager:
-    def __init__(self):
-        self.bucket = os.getenv("CLOUFLARE_R2_BUCKET_NAME")
+    def __init__(self, s3=None, bucket=None):
+        """
+        s3 / bucket : client et bucket à utiliser à la place de R2
+        (ex: LocalS3Client pour les benchmarks)
+        """
+        self.bucket = bucket or os.getenv("CLOUFLARE_R2_BUCKET_NAME")
         if not self.bucket:
              # Fallback ou erreur, mais on suppose .env chargé
              print("Warning: CLOUFLARE_R2_BUCKET_NAME not found")
         
-        self.s3 = boto3.client(
-            service_name="s3",
-            endpoint_url=os.getenv("CLOUFLARE_R2_URL"),
-            aws_access_key_id=os.getenv("CLOUFLARE_R2_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.getenv("CLOUFLARE_R2_SECRET_ACCESS_KEY"),
-            region_name="auto", # Required for R2
-            config=Config(signature_version='s3v4')
-        )
+        s3 = s3 or create_s3_client()
+        # Chaque appel S3 est compté / chronométré (panneau debug, export Prometheus)
+        self.s3 = InstrumentedS3Client(s3)
         # Prefix racine pour organiser les fichiers
         self.root_prefix = "games/"
+        # Cache partagé : une seule instance de GameManager sert toutes les sessions,
+        # chaque écriture invalide ce que les autres sessions voient
+        self.cache = TTLCache(default_ttl=CACHE_TTL, name="game_manager")
+        self.thumbnails = TTLCache(default_ttl=THUMB_TTL, max_entries=THUMB_CACHE_SIZE, name="thumbnails")
+        # Sérialise les lecture-modification-écriture des cards.json / config.json
+        self.write_lock = threading.RLock()
+        # Index de recherche des cartes de tous les jeux, mis à jour à chaque écriture
+        self.index = CardIndex(
+            self._load_config, self._load_deck_metadata,
+            lambda game, folder: [o['Key'].split('/')[-1] for o in self._list_card_objects(game, folder)],
+            self.get_games,
+        )
+
+    # --- CACHE ---
+    def _invalidate(self, key):
+        """Invalide toutes les vues en cache d'un objet après écriture/suppression"""
+        parent = key.rsplit('/', 1)[0] + '/'
+        self.cache.invalidate(("json", key), ("head", key), ("url", key), ("list", parent))
+        self.thumbnails.invalidate(("thumb", key))
+        if key.endswith("/config.json"):
+            self.cache.invalidate(("games",))
+        self._invalidate_index(key)
+
+    def _invalidate_index(self, key):
+        parts = key[len(self.root_prefix):].split('/')
+        if not key.startswith(self.root_prefix) or len(parts) < 2:
+            return
+        if parts[-1] == "config.json" and len(parts) == 2:
+            self.index.drop_game(parts[0])
+        elif len(parts) == 3 and (parts[-1] == "cards.json" or (parts[-1].endswith(".png") and parts[-1] != "back.png")):
+            # Carte ajoutée / supprimée (même sans cards.json, ex. synchronisation) : le deck est relu
+            self.index.drop_deck(parts[0], parts[1])
+
+    def _presigned_url(self, key):
+        return self.cache.get_or_load(
+            ("url", key),
+            lambda: self.s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket, 'Key': key},
+                ExpiresIn=3600
+            ),
+            ttl=URL_TTL
+        )
+
+    def _fetch_json(self, key):
+        try:
+            resp = self.s3.get_object(Bucket=self.bucket, Key=key)
+            body = resp['Body'].read()
+        except Exception as e:
+            if _is_missing(e):
+                return _MISSING
+            # Surtout pas de valeur par défaut : une config vide serait affichée, voire réécrite
+            raise _storage_error(e, key) from e
+        try:
+            return json.loads(body.decode('utf-8'))
+        except ValueError as e:
+            print(f"Error JSON {key}: {e}")
+            return _MISSING
+
+    def _load_json(self, key, default):
+        """
+        Contenu JSON d'un objet, default s'il n'existe pas.
+        Lève StorageError (StorageThrottledError si limitation) si le stockage ne répond pas.
+        """
+        data = self.cache.get_or_load(("json", key), lambda: self._fetch_json(key))
+        if data is _MISSING:
+            return default
+        # Copie : les appelants modifient le dict avant de le sauver
+        return copy.deepcopy(data)
+
+    def _save_json(self, key, data):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(data, indent=4),
+            ContentType='application/json'
+        )
+        self._invalidate(key)
+        self.cache.set(("json", key), copy.deepcopy(data))
+        # Index mis à jour directement depuis les données écrites (pas de relecture)
+        parts = key[len(self.root_prefix):].split('/')
+        if key.endswith("/cards.json") and len(parts) == 3:
+            self.index.update_deck(parts[0], parts[1], data)
 
     def _get_game_path(self, game_name):
         return f"{self.root_prefix}{game_name}/"
 
+    @metrics.timed("game_manager_seconds")
     def get_games(self):
         """Retourne la liste des jeux (dossiers virtuels)"""
+        return list(self.cache.get_or_load(("games",), self._fetch_games))
+
+    def _fetch_games(self):
         try:
             resp = self.s3.list_objects_v2(
                 Bucket=self.bucket, 
                 Prefix=self.root_prefix, 
                 Delimiter='/'
             )
-            games = []
-            if 'CommonPrefixes' in resp:
-                for p in resp['CommonPrefixes']:
-                    # p['Prefix'] = "games/MyGame/"
-                    name = p['Prefix'].rstrip('/').split('/')[-1]
-                    if name:
-                        games.append(name)
-            return games
         except Exception as e:
-            print(f"Error get_games: {e}")
-            return []
+            raise _storage_error(e, self.root_prefix) from e
+        games = []
+        if 'CommonPrefixes' in resp:
+            for p in resp['CommonPrefixes']:
+                # p['Prefix'] = "games/MyGame/"
+                name = p['Prefix'].rstrip('/').split('/')[-1]
+                if name:
+                    games.append(name)
+        return games
 
+    @metrics.timed("game_manager_seconds")
     def create_game(self, game_name):
         sanitized_name = "".join([c for c in game_name if c.isalnum() or c in (' ', '-', '_')]).strip()
         if not sanitized_name:
@@ -57,22 +225,17 @@ class GameManager:
             
         key = f"{self._get_game_path(sanitized_name)}config.json"
         
-        # Check exists (via list ou head)
+        # Check exists (via head) : une erreur de stockage n'est pas une absence
         try:
-            self.s3.head_object(Bucket=self.bucket, Key=key)
-            return False, "Ce jeu existe déjà."
-        except:
-            pass # N'existe pas
+            if self._fetch_head(key) is not None:
+                return False, "Ce jeu existe déjà."
+        except StorageError as e:
+            return False, str(e)
         
         # Init config
         initial_config = {"card_types": {}}
         try:
-            self.s3.put_object(
-                Bucket=self.bucket,
-                Key=key,
-                Body=json.dumps(initial_config, indent=4),
-                ContentType='application/json'
-            )
+            self._save_json(key, initial_config)
             return True, f"Jeu '{sanitized_name}' créé !"
         except Exception as e:
             return False, f"Erreur S3: {str(e)}"
@@ -81,23 +244,20 @@ class GameManager:
         return f"{self.root_prefix}{game_name}/config.json"
 
     def _load_config(self, game_name):
-        key = self._get_config_key(game_name)
-        try:
-            resp = self.s3.get_object(Bucket=self.bucket, Key=key)
-            return json.loads(resp['Body'].read().decode('utf-8'))
-        except:
-            return {"card_types": {}}
+        return self._load_json(self._get_config_key(game_name), {"card_types": {}})
 
     def _save_config(self, game_name, config):
-        key = self._get_config_key(game_name)
-        self.s3.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=json.dumps(config, indent=4),
-            ContentType='application/json'
-        )
+        self._save_json(self._get_config_key(game_name), config)
 
+    @metrics.timed("game_manager_seconds")
     def add_card_type(self, game_name, type_name, width_mm, height_mm):
+        with self.write_lock:
+            try:
+                return self._add_card_type(game_name, type_name, width_mm, height_mm)
+            except StorageError as e:
+                return False, str(e)
+
+    def _add_card_type(self, game_name, type_name, width_mm, height_mm):
         config = self._load_config(game_name)
         sanitized_type = "".join([c for c in type_name if c.isalnum() or c in (' ', '-', '_')]).strip()
         
@@ -114,31 +274,40 @@ class GameManager:
         self._save_config(game_name, config)
         return True, f"Type '{type_name}' ajouté."
 
+    @metrics.timed("game_manager_seconds")
     def get_card_types(self, game_name):
         config = self._load_config(game_name)
         return config.get("card_types", {})
 
+    def get_print_settings(self, game_name):
+        """Réglages des dérivés d'impression ({'bleed_mm', 'dpi'}) ou None si désactivés"""
+        return self._load_config(game_name).get("print")
+
+    @metrics.timed("game_manager_seconds")
+    def set_print_settings(self, game_name, settings):
+        with self.write_lock:
+            try:
+                config = self._load_config(game_name)
+                if settings:
+                    config["print"] = {"bleed_mm": float(settings["bleed_mm"]), "dpi": int(settings["dpi"])}
+                else:
+                    config.pop("print", None)
+                self._save_config(game_name, config)
+                return True, "Réglages d'impression enregistrés."
+            except StorageError as e:
+                return False, str(e)
+
     # --- METADATA (cards.json dans le "dossier" du deck) ---
     def _get_meta_key(self, game_name, deck_folder):
         return f"{self.root_prefix}{game_name}/{deck_folder}/cards.json"
 
     def _load_deck_metadata(self, game_name, deck_folder):
-        key = self._get_meta_key(game_name, deck_folder)
-        try:
-            resp = self.s3.get_object(Bucket=self.bucket, Key=key)
-            return json.loads(resp['Body'].read().decode('utf-8'))
-        except:
-            return {}
+        return self._load_json(self._get_meta_key(game_name, deck_folder), {})
 
     def _save_deck_metadata(self, game_name, deck_folder, data):
-        key = self._get_meta_key(game_name, deck_folder)
-        self.s3.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=json.dumps(data, indent=4),
-            ContentType='application/json'
-        )
+        self._save_json(self._get_meta_key(game_name, deck_folder), data)
 
+    @metrics.timed("game_manager_seconds")
     def save_card(self, game_name, card_type_folder, card_image, card_name=None, count=1):
         # 1. Nom fichier
         if not card_name:
@@ -167,72 +336,140 @@ class GameManager:
                 Body=encoded_img.tobytes(),
                 ContentType='image/png'
             )
+            self._invalidate(key)
             
             # 3. Metadata
-            meta = self._load_deck_metadata(game_name, card_type_folder)
-            meta[filename] = {"count": int(count)}
-            self._save_deck_metadata(game_name, card_type_folder, meta)
+            with self.write_lock:
+                meta = self._load_deck_metadata(game_name, card_type_folder)
+                meta[filename] = {"count": int(count), "hash": hashlib.md5(encoded_img.tobytes()).hexdigest()}
+                self._save_deck_metadata(game_name, card_type_folder, meta)
+
+            # 4. Dérivé d'impression (si activé pour le jeu)
+            self._save_print_derivative(game_name, card_type_folder, key, card_image, meta[filename]["hash"])
             
             return True, f"Carte sauvée : {filename}"
         except Exception as e:
             return False, f"Erreur S3: {str(e)}"
 
-    def get_cards_by_type(self, game_name, card_type_folder):
+    def _list_card_objects(self, game_name, card_type_folder):
+        """Objets S3 des faces de cartes d'un deck (triés par nom, sans URL presignée)"""
         prefix = f"{self.root_prefix}{game_name}/{card_type_folder}/"
-        meta = self._load_deck_metadata(game_name, card_type_folder)
-        
-        try:
-            resp = self.s3.list_objects_v2(Bucket=self.bucket, Prefix=prefix)
-        except:
-            return []
-            
-        cards = []
-        if 'Contents' in resp:
-            for obj in resp['Contents']:
-                key = obj['Key']
-                filename = key.split('/')[-1]
-                if not filename.endswith('.png') or filename == "back.png":
+        return list(self.cache.get_or_load(("list", prefix), lambda: self._fetch_card_objects(prefix)))
+
+    def _fetch_card_objects(self, prefix):
+        objects = []
+        kwargs = {'Bucket': self.bucket, 'Prefix': prefix}
+        while True:
+            try:
+                resp = self.s3.list_objects_v2(**kwargs)
+            except Exception as e:
+                raise _storage_error(e, prefix) from e
+            for obj in resp.get('Contents', []):
+                filename = obj['Key'][len(prefix):]
+                # Uniquement les images directement dans le dossier du deck
+                if '/' in filename or not filename.endswith('.png') or filename == "back.png":
                     continue
-                    
-                # Generate Presigned URL
-                url = self.s3.generate_presigned_url(
-                    'get_object',
-                    Params={'Bucket': self.bucket, 'Key': key},
-                    ExpiresIn=3600
-                )
-                
-                info = meta.get(filename, {})
-                c_val = info.get("count", 1)
-                
-                cards.append({
-                    "name": filename.replace('.png', ''),
-                    "filename": filename,
-                    "path": url,      # URL pour Streamlit
-                    "s3_key": key,    # Key pour operations internes
-                    "count": c_val
-                })
+                objects.append(obj)
+            if not resp.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = resp['NextContinuationToken']
         
         # Sort by filename
-        cards.sort(key=lambda x: x['filename'])
-        return cards
+        objects.sort(key=lambda o: o['Key'])
+        return objects
+
+    def _make_card(self, obj, meta):
+        key = obj['Key']
+        filename = key.split('/')[-1]
+        
+        # Generate Presigned URL
+        url = self._presigned_url(key)
+        
+        info = meta.get(filename, {})
+        c_val = info.get("count", 1)
+        
+        return {
+            "name": filename.replace('.png', ''),
+            "filename": filename,
+            "path": url,      # URL pour Streamlit
+            "s3_key": key,    # Key pour operations internes
+            "count": c_val,
+            "etag": obj.get('ETag', '').strip('"'),  # Hash du contenu (cache export)
+            "size": obj.get('Size', 0)
+        }
 
+    @metrics.timed("game_manager_seconds")
+    def get_cards_by_type(self, game_name, card_type_folder):
+        meta = self._load_deck_metadata(game_name, card_type_folder)
+        objects = self._list_card_objects(game_name, card_type_folder)
+        return [self._make_card(obj, meta) for obj in objects]
+
+    @metrics.timed("game_manager_seconds")
+    def get_cards_page(self, game_name, card_type_folders, offset, limit):
+        """
+        Page de cartes sur un ou plusieurs decks (dans l'ordre donné).
+        Seules les cartes de la page sont signées ; les métadonnées ne sont
+        chargées que pour les decks présents dans la page.
+        Returns:
+            tuple: (cartes de la page avec leur 'folder', nombre total de cartes)
+        """
+        listings = [(folder, self._list_card_objects(game_name, folder)) for folder in card_type_folders]
+        
+        total = sum(len(objects) for _, objects in listings)
+        page = []
+        start = offset
+        for folder, objects in listings:
+            if len(page) >= limit:
+                break
+            if start >= len(objects):
+                start -= len(objects)
+                continue
+            selection = objects[start:start + (limit - len(page))]
+            start = 0
+            meta = self._load_deck_metadata(game_name, folder)
+            for obj in selection:
+                card = self._make_card(obj, meta)
+                card['folder'] = folder
+                page.append(card)
+        return page, total
+
+    @metrics.timed("game_manager_seconds")
+    def search_cards_page(self, game_name, query, card_type_folders, offset, limit, min_count=None):
+        """
+        Comme get_cards_page, mais sur les cartes de l'index correspondant à query
+        (préfixe puis sous-chaîne). Seules les cartes de la page sont signées.
+        """
+        entries = self.index.search(game_name, query, folders=set(card_type_folders), min_count=min_count)
+        page = []
+        for entry in entries[offset:offset + limit]:
+            key = f"{self._get_game_path(game_name)}{entry['folder']}/{entry['filename']}"
+            card = self._make_card({'Key': key, 'ETag': entry['hash'] or ''}, {entry['filename']: entry})
+            card['folder'] = entry['folder']
+            page.append(card)
+        return page, len(entries)
+
+    @metrics.timed("game_manager_seconds")
     def delete_card(self, game_name, card_type_folder, card_name):
         filename = f"{card_name}.png"
         key = f"{self.root_prefix}{game_name}/{card_type_folder}/{filename}"
         
         try:
             self.s3.delete_object(Bucket=self.bucket, Key=key)
+            self._invalidate(key)
+            self._delete_print_derivatives(key)
             
             # Update meta
-            meta = self._load_deck_metadata(game_name, card_type_folder)
-            if filename in meta:
-                del meta[filename]
-                self._save_deck_metadata(game_name, card_type_folder, meta)
+            with self.write_lock:
+                meta = self._load_deck_metadata(game_name, card_type_folder)
+                if filename in meta:
+                    del meta[filename]
+                    self._save_deck_metadata(game_name, card_type_folder, meta)
                 
             return True, "Supprimé."
         except Exception as e:
             return False, f"Erreur: {str(e)}"
 
+    @metrics.timed("game_manager_seconds")
     def update_card(self, game_name, current_type_folder, card_name, new_name=None, new_type_folder=None, new_count=None):
         old_filename = f"{card_name}.png"
         old_key = f"{self.root_prefix}{game_name}/{current_type_folder}/{old_filename}"
@@ -253,42 +490,53 @@ class GameManager:
                 self.s3.copy_object(CopySource=copy_source, Bucket=self.bucket, Key=new_key)
                 # Delete old
                 self.s3.delete_object(Bucket=self.bucket, Key=old_key)
+                self._invalidate(new_key)
+                self._invalidate(old_key)
+                # Le dérivé suit la carte (nouveau nom / nouveau deck, éventuellement d'autres dimensions)
+                self._delete_print_derivatives(old_key)
+                self._rebuild_print_derivative(game_name, target_folder, new_key)
             
-            # Update Metadata logic
-            # 1. Load old meta
-            old_meta = self._load_deck_metadata(game_name, current_type_folder)
-            current_data = old_meta.get(old_filename, {"count": 1})
-            
-            if new_count is not None:
-                current_data["count"] = int(new_count)
-                
-            if target_folder != current_type_folder:
-                # Remove from old
-                if old_filename in old_meta:
-                    del old_meta[old_filename]
-                    self._save_deck_metadata(game_name, current_type_folder, old_meta)
-                # Add to new
-                new_meta = self._load_deck_metadata(game_name, target_folder)
-                new_meta[new_filename] = current_data
-                self._save_deck_metadata(game_name, target_folder, new_meta)
-                
-            elif new_filename != old_filename:
-                # Same folder, rename
-                if old_filename in old_meta:
-                    del old_meta[old_filename]
-                old_meta[new_filename] = current_data
-                self._save_deck_metadata(game_name, current_type_folder, old_meta)
-                
-            elif new_count is not None:
-                # Just count update
-                old_meta[old_filename] = current_data
-                self._save_deck_metadata(game_name, current_type_folder, old_meta)
-                
+            with self.write_lock:
+                self._update_card_metadata(
+                    game_name, current_type_folder, target_folder, old_filename, new_filename, new_count
+                )
             return True, "Mis à jour."
             
         except Exception as e:
             return False, f"Erreur update S3: {str(e)}"
 
+    def _update_card_metadata(self, game_name, current_type_folder, target_folder, old_filename, new_filename, new_count):
+        # Update Metadata logic
+        # 1. Load old meta
+        old_meta = self._load_deck_metadata(game_name, current_type_folder)
+        current_data = old_meta.get(old_filename, {"count": 1})
+        
+        if new_count is not None:
+            current_data["count"] = int(new_count)
+            
+        if target_folder != current_type_folder:
+            # Remove from old
+            if old_filename in old_meta:
+                del old_meta[old_filename]
+                self._save_deck_metadata(game_name, current_type_folder, old_meta)
+            # Add to new
+            new_meta = self._load_deck_metadata(game_name, target_folder)
+            new_meta[new_filename] = current_data
+            self._save_deck_metadata(game_name, target_folder, new_meta)
+            
+        elif new_filename != old_filename:
+            # Same folder, rename
+            if old_filename in old_meta:
+                del old_meta[old_filename]
+            old_meta[new_filename] = current_data
+            self._save_deck_metadata(game_name, current_type_folder, old_meta)
+            
+        elif new_count is not None:
+            # Just count update
+            old_meta[old_filename] = current_data
+            self._save_deck_metadata(game_name, current_type_folder, old_meta)
+
+    @metrics.timed("game_manager_seconds")
     def save_back_image(self, game_name, card_type_folder, image_data):
         key = f"{self.root_prefix}{game_name}/{card_type_folder}/back.png"
         try:
@@ -300,22 +548,156 @@ class GameManager:
                     Body=encoded_img.tobytes(),
                     ContentType='image/png'
                 )
+                self._invalidate(key)
+                self._save_print_derivative(
+                    game_name, card_type_folder, key, image_data, hashlib.md5(encoded_img.tobytes()).hexdigest()
+                )
                 return True, "Dos enregistré."
             return False, "Erreur encode."
         except Exception as e:
             return False, str(e)
 
-    def get_back_image_path(self, game_name, card_type_folder):
-        """Retourne une URL presignée pour le dos"""
+    @metrics.timed("game_manager_seconds")
+    def get_back_image_info(self, game_name, card_type_folder):
+        """Retourne {'path': URL presignée, 'etag': hash} pour le dos, ou None"""
+        head = self._back_head(game_name, card_type_folder)
+        if head is None:
+            return None
+        key = f"{self.root_prefix}{game_name}/{card_type_folder}/back.png"
+        return {"path": self._presigned_url(key), "etag": head.get('ETag', '').strip('"')}
+
+    def _back_head(self, game_name, card_type_folder):
+        """head_object du dos (None si absent) ; absence mise en cache aussi"""
         key = f"{self.root_prefix}{game_name}/{card_type_folder}/back.png"
-        # Check existence via head
+        return self.cache.get_or_load(("head", key), lambda: self._fetch_head(key))
+
+    def _fetch_head(self, key):
         try:
-            self.s3.head_object(Bucket=self.bucket, Key=key)
-            url = self.s3.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket, 'Key': key},
-                ExpiresIn=3600
-            )
-            return url
-        except:
+            return self.s3.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _is_missing(e):
+                return None
+            raise _storage_error(e, key) from e
+
+    # --- DERIVES D'IMPRESSION (sous-dossier print/ du deck) ---
+    def _list_print_objects(self, game_name, card_type_folder):
+        """Objets S3 du sous-dossier print/ du deck, par clé"""
+        prefix = f"{self.root_prefix}{game_name}/{card_type_folder}/{PRINT_DIR}/"
+        return {o['Key']: o for o in self.cache.get_or_load(("list", prefix), lambda: self._fetch_card_objects(prefix))}
+
+    def _list_print_keys(self, game_name, card_type_folder):
+        return set(self._list_print_objects(game_name, card_type_folder))
+
+    def _put_print_derivative(self, source_key, image, source_etag, deck, settings):
+        derivative = make_print_image(image, deck['width_mm'], deck['height_mm'], settings['dpi'], settings['bleed_mm'])
+        success, encoded = cv2.imencode('.png', derivative)
+        if not success:
+            raise ValueError("Erreur encodage dérivé.")
+        key = print_key(source_key, print_tag(source_etag, settings))
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=encoded.tobytes(), ContentType='image/png')
+        self._invalidate(key)
+        return key
+
+    def _save_print_derivative(self, game_name, card_type_folder, source_key, image, source_etag):
+        """Crée le dérivé d'une image qui vient d'être enregistrée et supprime les précédents"""
+        try:
+            settings = self.get_print_settings(game_name)
+            deck = next((d for d in self.get_card_types(game_name).values() if d['folder'] == card_type_folder), None)
+            if not settings or not deck:
+                return
+            keep = self._put_print_derivative(source_key, image, source_etag, deck, settings)
+            self._delete_print_derivatives(source_key, keep=keep)
+        except Exception as e:
+            # L'image est enregistrée : le backfill créera le dérivé plus tard
+            print(f"Error print derivative {source_key}: {e}")
+
+    def _rebuild_print_derivative(self, game_name, card_type_folder, source_key):
+        """Recrée le dérivé d'une image déjà stockée (carte renommée ou déplacée)"""
+        try:
+            if not self.get_print_settings(game_name):
+                return
+            data = self.s3.get_object(Bucket=self.bucket, Key=source_key)['Body'].read()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError("image illisible")
+        except Exception as e:
+            print(f"Error print derivative {source_key}: {e}")
+            return
+        self._save_print_derivative(game_name, card_type_folder, source_key, image, hashlib.md5(data).hexdigest())
+
+    def _delete_print_derivatives(self, source_key, keep=None):
+        parent, filename = source_key.rsplit('/', 1)
+        game_name, card_type_folder = parent[len(self.root_prefix):].split('/', 1)
+        stem_prefix = f"{parent}/{PRINT_DIR}/{filename[:-len('.png')]}."
+        try:
+            for key in self._list_print_keys(game_name, card_type_folder):
+                if key.startswith(stem_prefix) and key != keep:
+                    self.s3.delete_object(Bucket=self.bucket, Key=key)
+                    self._invalidate(key)
+        except Exception as e:
+            print(f"Error delete print derivatives {source_key}: {e}")
+
+    def get_print_path(self, game_name, card_type_folder, filename, source_etag, settings):
+        """URL presignée du dérivé d'impression à jour d'une image du deck, ou None"""
+        source_key = f"{self.root_prefix}{game_name}/{card_type_folder}/{filename}"
+        key = print_key(source_key, print_tag(source_etag, settings))
+        if key not in self._list_print_keys(game_name, card_type_folder):
             return None
+        return self._presigned_url(key)
+
+    @metrics.timed("game_manager_seconds")
+    def get_thumbnail(self, key):
+        """Miniature PNG (THUMB_WIDTH px de large) d'une image du bucket, gardée en mémoire"""
+        return self.thumbnails.get_or_load(("thumb", key), lambda: self._fetch_thumbnail(key))
+
+    def cached_thumbnail(self, key):
+        """Miniature si elle est déjà en mémoire, sinon None (aucun appel au stockage)"""
+        found, value = self.thumbnails.get(("thumb", key))
+        return value if found else None
+
+    def _fetch_thumbnail(self, key):
+        try:
+            data = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except Exception as e:
+            raise _storage_error(e, key) from e
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise ValueError(f"Image illisible : {key}")
+        h, w = img.shape[:2]
+        if w > THUMB_WIDTH:
+            img = cv2.resize(img, (THUMB_WIDTH, round(h * THUMB_WIDTH / w)), interpolation=cv2.INTER_AREA)
+        return cv2.imencode('.png', img)[1].tobytes()
+
+    def get_back_image_path(self, game_name, card_type_folder):
+        """Retourne une URL presignée pour le dos"""
+        info = self.get_back_image_info(game_name, card_type_folder)
+        return info["path"] if info else None
+
+    # --- EXPORTS (artefacts PDF / planches archivés) ---
+    def _get_export_key(self, game_name, artifact_filename):
+        return f"exports/{game_name}/{artifact_filename}"
+
+    @metrics.timed("game_manager_seconds")
+    def save_export(self, game_name, artifact_filename, artifact_path):
+        """Archive un export généré dans le bucket, hors du dossier du jeu"""
+        key = self._get_export_key(game_name, artifact_filename)
+        content_type = 'application/zip' if artifact_filename.endswith('.zip') else 'application/pdf'
+        try:
+            with open(artifact_path, "rb") as f:
+                self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=f.read(),
+                    ContentType=content_type
+                )
+            return True, key
+        except Exception as e:
+            return False, f"Erreur S3: {str(e)}"
+
+    def get_export_url(self, game_name, artifact_filename):
+        key = self._get_export_key(game_name, artifact_filename)
+        return self.s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': key},
+            ExpiresIn=3600
+        )
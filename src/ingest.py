@@ -0,0 +1,117 @@
+"""
+Import d'un lot de photos de cartes depuis une archive ZIP ou tar (éventuellement
+compressée) : les membres sont lus un par un, jamais extraits sur disque, puis
+décodés, détourés et enregistrés en parallèle.
+"""
+import os
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from src.metrics import metrics
+from src.utils import detourer_carte_precise
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Statuts du rapport d'import
+OK = "ok"
+FAILED = "échec"
+SKIPPED = "ignoré"
+
+
+def _is_image(name):
+    base = os.path.basename(name)
+    # Fichiers cachés et métadonnées ajoutées par macOS ("__MACOSX/", "._photo.jpg")
+    if base.startswith('.') or name.startswith('__MACOSX/'):
+        return False
+    return base.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_archive_members(fileobj):
+    """
+    Membres d'une archive ZIP ou tar, un à la fois : (nom, octets ou None si ignoré).
+    Le tar est lu en flux (pas de seek) ; le ZIP exige un fichier seekable.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                yield info.filename, (zf.read(info) if _is_image(info.filename) else None)
+        return
+
+    fileobj.seek(0)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            yield member.name, (tar.extractfile(member).read() if _is_image(member.name) else None)
+
+
+def card_name_for(member_name):
+    """Nom de carte dérivé du chemin du membre (les dossiers évitent les collisions)"""
+    return os.path.splitext(member_name)[0].strip('/').replace('/', '_')
+
+
+def ingest_archive(gm, game_name, card_type, fileobj, ppi=10, seuil=45, mode="contour",
+                   count=1, workers=4, progress=None):
+    """
+    Détoure et enregistre dans le deck card_type chaque photo de l'archive.
+    Au plus 2 x workers photos sont en mémoire à la fois ; le rapport suit
+    l'ordre de l'archive.
+    Returns:
+        tuple: (succès, message, rapport [{member, card, status, msg}])
+    """
+    def process(name, data):
+        try:
+            return _process(name, data)
+        except Exception as e:
+            return FAILED, None, str(e)
+
+    def _process(name, data):
+        with metrics.timer("ingest_seconds", stage="decode"):
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return FAILED, None, "Image illisible."
+        res, success, msg = detourer_carte_precise(
+            image, card_type['width_mm'], card_type['height_mm'], ppi, seuil, mode=mode
+        )
+        if not success:
+            return FAILED, None, msg
+        card_name = card_name_for(name)
+        with metrics.timer("ingest_seconds", stage="save"):
+            saved, msg = gm.save_card(game_name, card_type['folder'], res, card_name, count=count)
+        return (OK if saved else FAILED), card_name, msg
+
+    report = []
+
+    def collect():
+        name, future = window.popleft()
+        status, card, msg = (SKIPPED, None, "Pas une image.") if future is None else future.result()
+        report.append({"member": name, "card": card, "status": status, "msg": msg})
+        metrics.inc("ingest_members_total", status=status)
+        if progress:
+            progress(len(report), name)
+
+    window = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, data in iter_archive_members(fileobj):
+                window.append((name, None if data is None else pool.submit(process, name, data)))
+                # Fenêtre bornée : on attend le plus ancien membre avant de lire la suite
+                while len(window) >= 2 * workers:
+                    collect()
+            while window:
+                collect()
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError) as e:
+        return False, f"Archive illisible : {str(e)}", report
+
+    saved = sum(1 for r in report if r["status"] == OK)
+    images = sum(1 for r in report if r["status"] != SKIPPED)
+    if not images:
+        return False, "Aucune image dans l'archive.", report
+    return saved > 0, f"{saved}/{images} cartes enregistrées.", report
+
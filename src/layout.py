@@ -1,11 +1,76 @@
 import streamlit as st
-from src.game_manager import GameManager
+from src.game_manager import create_game_manager, create_s3_client, get_workdir, StorageError
+from src.metrics import metrics, start_file_exporter, InstrumentedS3Client
+from src.sync import SyncEngine, SYNCING, OFFLINE
+from src.prefetch import Prefetcher
+from datetime import datetime
 import os
 import sys
 
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+@st.cache_resource
+def get_game_manager():
+    """GameManager unique pour le process : client S3, pool de connexions et caches partagés"""
+    start_file_exporter()
+    return create_game_manager()
+
+@st.cache_resource
+def get_sync_engine():
+    """Synchronisation copie de travail <-> R2 (uniquement si BOARDGAME_PRINT_WORKDIR est défini)"""
+    workdir = get_workdir()
+    if not workdir:
+        return None
+    gm = get_game_manager()
+    engine = SyncEngine(
+        local=gm.s3,
+        remote=InstrumentedS3Client(create_s3_client()),
+        bucket=gm.bucket,
+        workdir=workdir,
+        root_prefix=gm.root_prefix,
+        interval=int(os.getenv("BOARDGAME_PRINT_SYNC_INTERVAL", "15")),
+        on_local_change=gm._invalidate,
+        lock=gm.write_lock
+    )
+    engine.start()
+    return engine
+
+@st.cache_resource
+def get_prefetcher():
+    """Préchargement en arrière-plan des jeux sélectionnés (pool partagé par les sessions)"""
+    return Prefetcher(get_game_manager())
+
+def _prefetch(game_name):
+    """Lance le préchargement du jeu sélectionné et annule celui de la sélection précédente"""
+    job = st.session_state.get('prefetch_job')
+    if job and job.game_name == game_name:
+        return
+    if job:
+        job.cancel()
+    st.session_state['prefetch_job'] = get_prefetcher().start(game_name) if game_name else None
+
+def _render_sync_status(engine, game_name):
+    status = engine.get_status(game_name)
+    pending = status.get("pending")
+    pending_txt = f" — {pending} modif. en attente" if pending else ""
+    if status["state"] == SYNCING:
+        st.caption(f"🔄 Synchronisation en cours...{pending_txt}")
+    elif status["state"] == OFFLINE:
+        st.caption(f"📴 Hors ligne{pending_txt}")
+    elif status.get("last_sync"):
+        last = datetime.fromtimestamp(status["last_sync"]).strftime("%H:%M:%S")
+        st.caption(f"✅ Synchronisé à {last}{pending_txt}")
+    else:
+        st.caption(f"⏳ Première synchronisation...{pending_txt}")
+
+    if status.get("conflicts"):
+        with st.expander(f"⚠️ {len(status['conflicts'])} conflit(s)"):
+            for c in status["conflicts"]:
+                st.caption(c)
+    if st.button("🔄 Synchroniser", use_container_width=True, key="sync_now"):
+        engine.request_sync()
+
 def init_page(page_title="Boardgame Print"):
     st.set_page_config(
         page_title=page_title,
@@ -24,10 +89,9 @@ def init_page(page_title="Boardgame Print"):
     </style>
     """, unsafe_allow_html=True)
 
-    # Init GameManager
-    if 'gm' not in st.session_state:
-        st.session_state['gm'] = GameManager()
-    
+    # Compteur S3 au début du rerun (panneau debug)
+    st.session_state['s3_calls_at_rerun'] = metrics.counter_value("s3_requests_total")
+
     # Init Session Vars
     if 'selected_game_name' not in st.session_state:
         st.session_state['selected_game_name'] = None
@@ -36,8 +100,12 @@ def init_page(page_title="Boardgame Print"):
     with st.sidebar:
         st.header("🎲 Boardgame Print")
         
-        gm = st.session_state['gm']
-        games = gm.get_games()
+        gm = get_game_manager()
+        try:
+            games = gm.get_games()
+        except StorageError as e:
+            st.error(f"⚠️ {e}")
+            games = []
         
         # Determine index
         index = 0
@@ -57,6 +125,14 @@ def init_page(page_title="Boardgame Print"):
         else:
              st.session_state['selected_game_name'] = None
 
+        _prefetch(st.session_state['selected_game_name'])
+
+        # Copie de travail locale : statut de synchronisation du jeu actif
+        engine = get_sync_engine()
+        if engine and st.session_state['selected_game_name']:
+            engine.track(st.session_state['selected_game_name'])
+            _render_sync_status(engine, st.session_state['selected_game_name'])
+
         st.divider()
         
         # Create Game
@@ -70,11 +146,89 @@ def init_page(page_title="Boardgame Print"):
                         st.rerun()
                     else:
                         st.error(msg)
-        
+
+        # Restaurer une sauvegarde (archive .tar.gz créée depuis la Configuration)
+        with st.expander("📥 Importer une archive"):
+            uploaded_archive = st.file_uploader("Archive (.tar.gz)", type=['gz'], key="import_archive")
+            import_name = st.text_input("Nom (vide = nom d'origine)", key="import_archive_name")
+            if uploaded_archive and st.button("Importer", use_container_width=True):
+                from src.archive import unpack_game
+                with st.spinner("Restauration..."):
+                    success, msg = unpack_game(gm, uploaded_archive, import_name or None)
+                if success:
+                    st.success(msg)
+                    st.rerun()
+                else:
+                    st.error(msg)
+
         st.divider()
         
         # Navigation Note
         if not st.session_state['selected_game_name']:
             st.warning("👈 Veuillez sélectionner un jeu pour commencer.")
 
-    return st.session_state['gm'], st.session_state['selected_game_name']
+    return gm, st.session_state['selected_game_name']
+
+
+def _debug_enabled():
+    return bool(os.getenv("BOARDGAME_PRINT_DEBUG")) or st.query_params.get("debug") == "1"
+
+def render_debug_panel():
+    """Métriques du process (appels S3, latences, caches) ; activé par ?debug=1 ou BOARDGAME_PRINT_DEBUG"""
+    if not _debug_enabled():
+        return
+
+    snap = metrics.snapshot()
+    with st.sidebar.expander("🔧 Debug : métriques"):
+        total_calls = metrics.counter_value("s3_requests_total")
+        rerun_calls = total_calls - st.session_state.get('s3_calls_at_rerun', total_calls)
+        col1, col2 = st.columns(2)
+        col1.metric("Appels S3 (ce rerun)", int(rerun_calls))
+        col2.metric("Appels S3 (process)", int(total_calls))
+        st.caption(
+            f"Reçu : {metrics.counter_value('s3_bytes_received_total') / 1e6:.1f} Mo — "
+            f"Envoyé : {metrics.counter_value('s3_bytes_sent_total') / 1e6:.1f} Mo"
+        )
+
+        # Taux de succès des caches
+        rates = {}
+        for c in snap["counters"]:
+            if c["name"] == "cache_requests_total":
+                name = f"{c['labels']['cache']}/{c['labels']['kind']}"
+                hit, miss, coalesced = rates.get(name, (0, 0, 0))
+                if c["labels"]["result"] == "hit":
+                    hit += c["value"]
+                elif c["labels"]["result"] == "coalesced":
+                    coalesced += c["value"]
+                else:
+                    miss += c["value"]
+                rates[name] = (hit, miss, coalesced)
+        if rates:
+            st.markdown("**Caches**")
+            st.dataframe([
+                {
+                    "cache": name, "hits": hit, "misses": miss,
+                    # Misses servis par un chargement déjà en cours (aucun appel S3)
+                    "regroupés": coalesced,
+                    "taux": f"{hit / (hit + miss):.0%}" if hit + miss else "-"
+                }
+                for name, (hit, miss, coalesced) in sorted(rates.items())
+            ], hide_index=True)
+
+        st.markdown("**Latences**")
+        st.dataframe([
+            {
+                "mesure": t["name"],
+                "labels": ", ".join(f"{v}" for v in t["labels"].values()),
+                "appels": t["count"],
+                "moy. ms": round(1000 * t["sum"] / t["count"], 1) if t["count"] else 0,
+                "max ms": round(1000 * t["max"], 1),
+            }
+            for t in snap["timings"]
+        ], hide_index=True)
+
+        col_prom, col_json = st.columns(2)
+        col_prom.download_button("Prometheus", metrics.to_prometheus(), file_name="metrics.prom")
+        col_json.download_button("JSON lines", metrics.to_json_lines(), file_name="metrics.jsonl")
+        if st.button("Réinitialiser", use_container_width=True):
+            metrics.reset()
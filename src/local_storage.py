@@ -0,0 +1,142 @@
+import os
+import io
+import hashlib
+import threading
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+
+def _client_error(code, operation, message):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+class LocalS3Client:
+    """
+    Stand-in local du client boto3 S3 : un dossier par bucket, une clé par fichier.
+    Implémente le sous-ensemble d'API utilisé par GameManager ; les URL "presignées"
+    sont des chemins locaux, directement lisibles par PDFGenerator.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        # Cache des ETag (md5) : path -> (mtime, size, etag)
+        self.etags = {}
+
+    def _path(self, bucket, key):
+        path = os.path.abspath(os.path.join(self.root, bucket, key))
+        if not path.startswith(os.path.join(self.root, bucket)):
+            raise _client_error("InvalidKey", "Path", f"Clé invalide : {key}")
+        return path
+
+    def _etag(self, path):
+        stat = os.stat(path)
+        with self.lock:
+            cached = self.etags.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                md5.update(chunk)
+        etag = f'"{md5.hexdigest()}"'
+        with self.lock:
+            self.etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        return etag
+
+    def _object_info(self, bucket, key, path):
+        stat = os.stat(path)
+        return {
+            "Key": key,
+            "ETag": self._etag(path),
+            "Size": stat.st_size,
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        }
+
+    def list_objects_v2(self, Bucket, Prefix="", Delimiter=None, MaxKeys=1000, ContinuationToken=None, StartAfter=None):
+        bucket_root = os.path.join(self.root, Bucket)
+        keys = []
+        for dirpath, _, filenames in os.walk(bucket_root):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                key = os.path.relpath(full, bucket_root).replace(os.sep, "/")
+                if key.startswith(Prefix) and not filename.endswith(".tmp"):
+                    keys.append(key)
+        keys.sort()
+
+        start = ContinuationToken or StartAfter
+        if start:
+            keys = [k for k in keys if k > start]
+
+        contents, prefixes = [], []
+        truncated, last_key = False, None
+        for key in keys:
+            if len(contents) + len(prefixes) >= MaxKeys:
+                truncated = True
+                break
+            last_key = key
+            if Delimiter:
+                rest = key[len(Prefix):]
+                if Delimiter in rest:
+                    common = Prefix + rest.split(Delimiter)[0] + Delimiter
+                    if common not in prefixes:
+                        prefixes.append(common)
+                    continue
+            contents.append(self._object_info(Bucket, key, os.path.join(bucket_root, key)))
+
+        resp = {"KeyCount": len(contents) + len(prefixes), "IsTruncated": truncated, "Prefix": Prefix}
+        if contents:
+            resp["Contents"] = contents
+        if prefixes:
+            resp["CommonPrefixes"] = [{"Prefix": p} for p in prefixes]
+        if truncated:
+            resp["NextContinuationToken"] = last_key
+        return resp
+
+    def get_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise _client_error("NoSuchKey", "GetObject", f"Clé introuvable : {Key}")
+        info = self._object_info(Bucket, Key, path)
+        return {"Body": io.BytesIO(data), "ContentLength": len(data), "ETag": info["ETag"]}
+
+    def head_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise _client_error("404", "HeadObject", "Not Found")
+        info = self._object_info(Bucket, Key, path)
+        return {"ContentLength": info["Size"], "ETag": info["ETag"], "LastModified": info["LastModified"]}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None):
+        path = self._path(Bucket, Key)
+        if IfMatch is not None:
+            # Ecriture conditionnelle : l'objet doit exister avec cet ETag
+            if not os.path.isfile(path) or self._etag(path).strip('"') != IfMatch.strip('"'):
+                raise _client_error("PreconditionFailed", "PutObject", f"ETag différent : {Key}")
+        if isinstance(Body, str):
+            Body = Body.encode("utf-8")
+        elif hasattr(Body, "read"):
+            Body = Body.read()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(Body)
+        os.replace(tmp_path, path)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def delete_object(self, Bucket, Key):
+        try:
+            os.remove(self._path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
+
+    def copy_object(self, CopySource, Bucket, Key):
+        resp = self.get_object(CopySource["Bucket"], CopySource["Key"])
+        return self.put_object(Bucket, Key, resp["Body"].read())
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn=3600):
+        return self._path(Params["Bucket"], Params["Key"])
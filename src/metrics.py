@@ -0,0 +1,197 @@
+import os
+import time
+import json
+import threading
+import functools
+from contextlib import contextmanager
+
+# Bornes des histogrammes de latence (secondes)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    Registre de métriques du process : compteurs et latences étiquetés.
+    Partagé par toutes les sessions ; exportable en texte Prometheus ou JSON lines.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}  # (name, labels) -> valeur
+        self.timings = {}   # (name, labels) -> {'count', 'sum', 'max', 'buckets'}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels_key(labels))
+        with self.lock:
+            t = self.timings.get(key)
+            if t is None:
+                t = self.timings[key] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            t["count"] += 1
+            t["sum"] += seconds
+            t["max"] = max(t["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    t["buckets"][i] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        """Décorateur : mesure chaque appel (label 'method' = nom de la fonction)"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, method=func.__name__, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def counter_value(self, name, **labels):
+        """Somme d'un compteur sur toutes les séries dont les labels contiennent ceux donnés"""
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(
+                v for (n, lk), v in self.counters.items()
+                if n == name and wanted.issubset(lk)
+            )
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": [
+                    {"name": n, "labels": dict(lk), "value": v}
+                    for (n, lk), v in sorted(self.counters.items())
+                ],
+                "timings": [
+                    {"name": n, "labels": dict(lk), "count": t["count"], "sum": t["sum"], "max": t["max"]}
+                    for (n, lk), t in sorted(self.timings.items())
+                ],
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.timings.clear()
+
+    def to_prometheus(self, prefix="boardgame_print_"):
+        def fmt_labels(lk, extra=()):
+            items = list(lk) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for (n, lk), v in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{prefix}{name}{fmt_labels(lk)} {v}")
+            for name in sorted({n for n, _ in self.timings}):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for (n, lk), t in sorted(self.timings.items()):
+                    if n != name:
+                        continue
+                    for bound, count in zip(BUCKETS, t["buckets"]):
+                        lines.append(f"{prefix}{name}_bucket{fmt_labels(lk, [('le', bound)])} {count}")
+                    lines.append(f"{prefix}{name}_bucket{fmt_labels(lk, [('le', '+Inf')])} {t['count']}")
+                    lines.append(f"{prefix}{name}_sum{fmt_labels(lk)} {t['sum']}")
+                    lines.append(f"{prefix}{name}_count{fmt_labels(lk)} {t['count']}")
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        ts = time.time()
+        snap = self.snapshot()
+        records = [{"ts": ts, "type": "counter", **c} for c in snap["counters"]]
+        records += [{"ts": ts, "type": "timing", **t} for t in snap["timings"]]
+        return "".join(json.dumps(r) + "\n" for r in records)
+
+    def write(self, path):
+        """.prom : fichier texte Prometheus (remplacé) ; sinon JSON lines (ajoutées)"""
+        if path.endswith(".prom"):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(self.to_json_lines())
+
+
+metrics = Metrics()
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_file_exporter(path=None, interval=None):
+    """
+    Ecrit périodiquement les métriques dans BOARDGAME_PRINT_METRICS_FILE
+    (collecteur textfile Prometheus ou ingestion JSON lines).
+    """
+    global _exporter_started
+    path = path or os.getenv("BOARDGAME_PRINT_METRICS_FILE")
+    interval = interval or int(os.getenv("BOARDGAME_PRINT_METRICS_INTERVAL", "30"))
+    with _exporter_lock:
+        if not path or _exporter_started:
+            return
+        _exporter_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                metrics.write(path)
+            except OSError as e:
+                print(f"Error metrics export: {e}")
+
+    threading.Thread(target=loop, name="metrics-exporter", daemon=True).start()
+
+
+class InstrumentedS3Client:
+    """Proxy du client S3 : compte les appels, leur latence et les octets transférés"""
+
+    def __init__(self, client, registry=metrics):
+        self._client = client
+        self._metrics = registry
+
+    def __getattr__(self, operation):
+        attr = getattr(self._client, operation)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            self._metrics.inc("s3_requests_total", operation=operation)
+            body = kwargs.get("Body")
+            if isinstance(body, str):
+                self._metrics.inc("s3_bytes_sent_total", len(body.encode("utf-8")), operation=operation)
+            elif isinstance(body, (bytes, bytearray)):
+                self._metrics.inc("s3_bytes_sent_total", len(body), operation=operation)
+            start = time.perf_counter()
+            try:
+                resp = attr(*args, **kwargs)
+            except Exception as e:
+                code = getattr(e, "response", {}).get("Error", {}).get("Code", type(e).__name__)
+                self._metrics.inc("s3_errors_total", operation=operation, code=code)
+                raise
+            finally:
+                self._metrics.observe("s3_request_seconds", time.perf_counter() - start, operation=operation)
+            if isinstance(resp, dict) and "ContentLength" in resp and operation == "get_object":
+                self._metrics.inc("s3_bytes_received_total", resp["ContentLength"], operation=operation)
+            return resp
+        return call
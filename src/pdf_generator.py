@@ -1,6 +1,56 @@
 from fpdf import FPDF
 import math
 import os
+from src.metrics import metrics
+
+def compute_grid(card_w, card_h, page_w=210, page_h=297, margin=10):
+    """
+    Calcule la grille d'impression d'un format de carte sur une page.
+    Returns:
+        dict {'cols', 'rows', 'start_x', 'start_y'} en mm, ou None si la carte ne tient pas
+    """
+    usable_w = page_w - (2 * margin)
+    usable_h = page_h - (2 * margin)
+    
+    cols = int(usable_w // card_w)
+    rows = int(usable_h // card_h)
+    
+    if cols == 0 or rows == 0:
+        return None
+    
+    # Calcul de l'espacement pour centrer la grille
+    total_grid_w = cols * card_w
+    total_grid_h = rows * card_h
+    return {
+        'cols': cols,
+        'rows': rows,
+        'start_x': margin + (usable_w - total_grid_w) / 2,
+        'start_y': margin + (usable_h - total_grid_h) / 2,
+    }
+
+
+def bleed_grid(card_w, card_h, bleed, page_w=210, page_h=297, margin=10):
+    """
+    Grille des emplacements carte + fond perdu (bleed mm de chaque côté).
+    Le fond perdu des cartes du bord peut déborder sur la marge de la page : seule
+    la zone de coupe doit rester dans la zone imprimable.
+    Returns:
+        tuple: (grille de compute_grid ou None, largeur, hauteur d'un emplacement en mm)
+    """
+    slot_w, slot_h = card_w + 2 * bleed, card_h + 2 * bleed
+    return compute_grid(slot_w, slot_h, page_w, page_h, max(margin - bleed, 0)), slot_w, slot_h
+
+
+def slot_origin(grid, idx, card_w, card_h, verso=False):
+    """Coin haut-gauche (mm) de l'emplacement idx ; le verso est en miroir horizontal"""
+    cols, rows = grid['cols'], grid['rows']
+    r = (idx // cols) % rows
+    c = idx % cols
+    if verso:
+        # Col_Back = (Cols - 1) - c
+        c = (cols - 1) - c
+    return grid['start_x'] + (c * card_w), grid['start_y'] + (r * card_h)
+
 
 class PDFGenerator(FPDF):
     def __init__(self):
@@ -10,6 +60,10 @@ class PDFGenerator(FPDF):
         self.page_w = 210
         self.page_h = 297
 
+    def layout_options(self):
+        """Options de mise en page qui influencent le rendu (clé du cache d'export)"""
+        return {"margin": self.margin, "page_w": self.page_w, "page_h": self.page_h}
+
     def _validate_image(self, path):
         if not path:
             return False
@@ -17,10 +71,13 @@ class PDFGenerator(FPDF):
             return True
         return os.path.exists(path)
 
+    @metrics.timed("pdf_stage_seconds", stage="section")
     def add_deck_section(self, cards_data):
         """
         Ajoute une section au PDF pour un groupe de cartes de même dimension.
         cards_data: liste de dict {'front': path, 'back': path, 'width': mm, 'height': mm}
+        et optionnellement 'bleed' (mm, fond perdu autour de chaque carte) avec
+        'front_bleed' / 'back_bleed' si l'image inclut déjà ce fond perdu (dérivé d'impression)
         """
         if not cards_data:
             return
@@ -28,26 +85,14 @@ class PDFGenerator(FPDF):
         # Récupérer les dimensions du premier élément
         card_w = cards_data[0]['width']
         card_h = cards_data[0]['height']
-        
-        # Calcul de la grille
-        usable_w = self.page_w - (2 * self.margin)
-        usable_h = self.page_h - (2 * self.margin)
-        
-        cols = int(usable_w // card_w)
-        rows = int(usable_h // card_h)
-        
-        if cols == 0 or rows == 0:
+        bleed = cards_data[0].get('bleed', 0)
+        # Chaque emplacement inclut le fond perdu : les cartes voisines ne se chevauchent pas
+        grid, slot_w, slot_h = bleed_grid(card_w, card_h, bleed, self.page_w, self.page_h, self.margin)
+        if grid is None:
             # Skip if impossible to fit
             return 
             
-        items_per_page = cols * rows
-        
-        # Calcul de l'espacement pour centrer la grille
-        total_grid_w = cols * card_w
-        total_grid_h = rows * card_h
-        start_x = self.margin + (usable_w - total_grid_w) / 2
-        start_y = self.margin + (usable_h - total_grid_h) / 2
-        
+        items_per_page = grid['cols'] * grid['rows']
         total_cards = len(cards_data)
         num_pages_pairs = math.ceil(total_cards / items_per_page)
         
@@ -59,48 +104,53 @@ class PDFGenerator(FPDF):
             
             # Placer les cartes
             for idx, card in enumerate(batch):
-                r = (idx // cols) % rows
-                c = idx % cols
-                
-                x = start_x + (c * card_w)
-                y = start_y + (r * card_h)
+                x, y = slot_origin(grid, idx, slot_w, slot_h)
                 
                 # Image Front
                 if self._validate_image(card['front']):
                     try:
-                        self.image(card['front'], x=x, y=y, w=card_w, h=card_h)
+                        # Téléchargement + décodage + intégration de l'image
+                        with metrics.timer("pdf_stage_seconds", stage="image"):
+                            self._place(card['front'], x, y, card_w, card_h, bleed, card.get('front_bleed'))
                     except Exception as e:
                         print(f"Error adding image {card['front']}: {e}")
                     
                     # Cadre léger de coupe
                     self.set_draw_color(200, 200, 200)
-                    self.rect(x, y, card_w, card_h)
+                    self.rect(x + bleed, y + bleed, card_w, card_h)
 
             # --- PAGE VERSO (Backs) ---
             self.add_page()
             
             for idx, card in enumerate(batch):
-                r = (idx // cols) % rows
-                c = idx % cols
-                
                 # MIROIR HORIZONTAL pour verso
-                # Col_Back = (Cols - 1) - c
-                c_back = (cols - 1) - c
-                
-                x = start_x + (c_back * card_w)
-                y = start_y + (r * card_h)
+                x, y = slot_origin(grid, idx, slot_w, slot_h, verso=True)
                 
                 back_path = card.get('back')
                 if self._validate_image(back_path):
                     try:
-                        self.image(back_path, x=x, y=y, w=card_w, h=card_h)
+                        with metrics.timer("pdf_stage_seconds", stage="image"):
+                            self._place(back_path, x, y, card_w, card_h, bleed, card.get('back_bleed'))
                     except:
                         pass
                 
                 # Cadre léger
                 self.set_draw_color(200, 200, 200)
-                self.rect(x, y, card_w, card_h)
+                self.rect(x + bleed, y + bleed, card_w, card_h)
+
+    def _place(self, path, x, y, card_w, card_h, bleed, with_bleed):
+        """Image sur tout l'emplacement (fond perdu compris) ou seulement sur la zone de coupe"""
+        if with_bleed:
+            self.image(path, x=x, y=y, w=card_w + 2 * bleed, h=card_h + 2 * bleed)
+        else:
+            self.image(path, x=x + bleed, y=y + bleed, w=card_w, h=card_h)
+
+    @metrics.timed("pdf_stage_seconds", stage="save")
+    def to_bytes(self):
+        """Retourne le PDF en mémoire (sections mises en cache)"""
+        return bytes(self.output())
 
+    @metrics.timed("pdf_stage_seconds", stage="save")
     def save(self, output_path):
         try:
             self.output(output_path)
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import metrics
+
+# Nombre de miniatures préchargées (les premières pages de la galerie, tous types)
+PREFETCH_THUMBNAILS = 48
+
+
+class PrefetchJob:
+    """Préchargement d'un jeu pour une session ; annulé dès que la sélection change"""
+
+    def __init__(self, game_name):
+        self.game_name = game_name
+        self.cancelled = threading.Event()
+        self.stage = "en attente"
+        self.done = False
+        self.error = None
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class Prefetcher:
+    """
+    Remplit les caches de GameManager en arrière-plan dès qu'un jeu est sélectionné,
+    par ordre de priorité : config, listings et métadonnées des decks, dos, puis
+    miniatures des premières pages de la galerie. Partagé par toutes les sessions :
+    les chargements identiques sont regroupés par le cache.
+    """
+
+    def __init__(self, gm, workers=4, thumbnails=PREFETCH_THUMBNAILS):
+        self.gm = gm
+        self.thumbnails = thumbnails
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def start(self, game_name):
+        job = PrefetchJob(game_name)
+        threading.Thread(target=self._run, args=(job,), name=f"prefetch-{game_name}", daemon=True).start()
+        return job
+
+    def warm_thumbnails(self, keys):
+        """Charge en arrière-plan des miniatures demandées par la galerie (sans attendre)"""
+        for key in keys:
+            self.pool.submit(self._warm_thumbnail, key)
+        metrics.inc("prefetch_thumbnails_requested_total", value=len(keys))
+
+    def _warm_thumbnail(self, key):
+        try:
+            self.gm.get_thumbnail(key)
+        except Exception as e:
+            print(f"Error prefetch thumbnail {key}: {e}")
+
+    def _map(self, job, func, items):
+        """Exécute func sur items en parallèle ; les tâches pas encore lancées sont sautées après annulation"""
+        def task(item):
+            if not job.cancelled.is_set():
+                func(item)
+        for future in [self.pool.submit(task, item) for item in items]:
+            future.result()
+
+    def _run(self, job):
+        gm, game_name = self.gm, job.game_name
+        try:
+            job.stage = "configuration"
+            with metrics.timer("prefetch_seconds", stage="config"):
+                folders = [d['folder'] for d in gm.get_card_types(game_name).values()]
+            if job.cancelled.is_set():
+                return
+
+            job.stage = "listings"
+            with metrics.timer("prefetch_seconds", stage="listings"):
+                self._map(job, lambda f: gm._list_card_objects(game_name, f), folders)
+                self._map(job, lambda f: gm._load_deck_metadata(game_name, f), folders)
+            if job.cancelled.is_set():
+                return
+
+            job.stage = "dos"
+            with metrics.timer("prefetch_seconds", stage="backs"):
+                self._map(job, lambda f: gm.get_back_image_info(game_name, f), folders)
+            if job.cancelled.is_set():
+                return
+
+            job.stage = "miniatures"
+            with metrics.timer("prefetch_seconds", stage="thumbnails"):
+                # Même ordre que la galerie (filtre "Tous") : la première page arrive en premier
+                cards, _ = gm.get_cards_page(game_name, folders, 0, self.thumbnails)
+                self._map(job, lambda c: gm.get_thumbnail(c['s3_key']), cards)
+        except Exception as e:
+            job.error = str(e)
+            print(f"Error prefetch {game_name}: {e}")
+        finally:
+            job.done = True
+            metrics.inc("prefetch_total", result="cancelled" if job.cancelled.is_set() else "done")
@@ -0,0 +1,150 @@
+"""
+Dérivés d'impression des cartes et des dos : fond perdu par extension des bords,
+coins opaques et résolution d'impression, calculés une fois à l'enregistrement
+plutôt qu'à chaque export.
+
+Ils sont stockés dans le sous-dossier print/ du deck (ignoré par les listings de
+cartes) sous le nom <carte>.<tag>.png, où tag dépend du hash de l'image source et
+des réglages : un dérivé périmé n'est jamais utilisé, l'export reprend alors
+l'original.
+
+Usage en ligne de commande (depuis la racine du dépôt) :
+    python -m src.print_derivative backfill "Mon Jeu"
+    python -m src.print_derivative backfill "Mon Jeu" --local ./workdir
+"""
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from src.metrics import metrics
+
+PRINT_DIR = "print"
+DEFAULT_SETTINGS = {"bleed_mm": 3, "dpi": 300}
+MM_PER_INCH = 25.4
+
+
+@metrics.timed("print_derivative_seconds")
+def make_print_image(image, width_mm, height_mm, dpi=300, bleed_mm=3):
+    """
+    Image d'impression (BGR, sans alpha) : carte redimensionnée à la résolution
+    d'impression, zones transparentes (coins arrondis) reconstruites à partir des
+    pixels voisins, puis bords répliqués sur bleed_mm.
+    """
+    scale = dpi / MM_PER_INCH  # pixels par mm
+    w, h = round(width_mm * scale), round(height_mm * scale)
+    upscale = w > image.shape[1]
+    image = cv2.resize(image, (w, h), interpolation=cv2.INTER_CUBIC if upscale else cv2.INTER_AREA)
+
+    if image.ndim == 2:
+        bgr = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif image.shape[2] == 4:
+        bgr = np.ascontiguousarray(image[:, :, :3])
+        # Coins opaques : les pixels (partiellement) transparents sont reconstruits
+        mask = (image[:, :, 3] < 250).astype(np.uint8)
+        if mask.any():
+            bgr = cv2.inpaint(bgr, mask, 3, cv2.INPAINT_TELEA)
+    else:
+        bgr = image
+
+    bleed = round(bleed_mm * scale)
+    if bleed:
+        bgr = cv2.copyMakeBorder(bgr, bleed, bleed, bleed, bleed, cv2.BORDER_REPLICATE)
+    return bgr
+
+
+def print_tag(source_etag, settings):
+    """Identifiant du dérivé : change avec l'image source ou les réglages d'impression"""
+    etag = source_etag.strip('"')
+    payload = f"{etag}:{settings['dpi']}:{settings['bleed_mm']}"
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def print_key(source_key, tag):
+    """Clé du dérivé d'une image du deck (carte ou dos)"""
+    parent, filename = source_key.rsplit('/', 1)
+    return f"{parent}/{PRINT_DIR}/{filename[:-len('.png')]}.{tag}.png"
+
+
+def backfill_print_derivatives(gm, game_name, workers=4, progress=None):
+    """
+    Génère les dérivés manquants ou périmés de tous les decks d'un jeu (cartes et
+    dos) et supprime ceux qui ne correspondent plus à aucune image.
+    Returns:
+        tuple: (succès, message, stats)
+    """
+    settings = gm.get_print_settings(game_name)
+    if not settings:
+        return False, "Dérivés d'impression désactivés pour ce jeu.", {}
+
+    stats = {"created": 0, "up_to_date": 0, "deleted": 0, "errors": 0}
+    decks = list(gm.get_card_types(game_name).values())
+
+    def create(deck, key, etag):
+        try:
+            data = gm.s3.get_object(Bucket=gm.bucket, Key=key)['Body'].read()
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError("image illisible")
+            gm._put_print_derivative(key, image, etag, deck, settings)
+            return True
+        except Exception as e:
+            print(f"Error print derivative {key}: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i, deck in enumerate(decks):
+            if progress:
+                progress(i / len(decks), f"{deck['name']}...")
+            folder = deck['folder']
+            sources = [(o['Key'], o.get('ETag', '')) for o in gm._list_card_objects(game_name, folder)]
+            back = gm._back_head(game_name, folder)
+            if back:
+                sources.append((f"{gm.root_prefix}{game_name}/{folder}/back.png", back.get('ETag', '')))
+
+            existing = gm._list_print_keys(game_name, folder)
+            expected = {print_key(key, print_tag(etag, settings)): (key, etag) for key, etag in sources}
+            missing = [src for dkey, src in expected.items() if dkey not in existing]
+            stats["up_to_date"] += len(expected) - len(missing)
+
+            for ok in pool.map(lambda src: create(deck, *src), missing):
+                stats["created" if ok else "errors"] += 1
+
+            for dkey in existing - set(expected):
+                try:
+                    gm.s3.delete_object(Bucket=gm.bucket, Key=dkey)
+                    gm._invalidate(dkey)
+                    stats["deleted"] += 1
+                except Exception as e:
+                    print(f"Error delete print derivative {dkey}: {e}")
+                    stats["errors"] += 1
+
+    if progress:
+        progress(1.0, "Terminé.")
+    msg = (
+        f"{stats['created']} dérivé(s) créé(s), {stats['up_to_date']} à jour, "
+        f"{stats['deleted']} supprimé(s)"
+        + (f", {stats['errors']} erreur(s)" if stats['errors'] else "")
+    )
+    return stats["errors"] == 0, msg, stats
+
+
+def main():
+    from src.game_manager import GameManager, create_game_manager
+    from src.local_storage import LocalS3Client
+
+    parser = argparse.ArgumentParser(description="Dérivés d'impression (fond perdu) des cartes d'un jeu")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backfill = sub.add_parser("backfill", help="Génère les dérivés manquants d'un jeu")
+    p_backfill.add_argument("game")
+    p_backfill.add_argument("--local", default=None, help="Dossier local au lieu du bucket")
+    args = parser.parse_args()
+
+    gm = GameManager(s3=LocalS3Client(args.local), bucket="local") if args.local else create_game_manager()
+    ok, msg, _ = backfill_print_derivatives(gm, args.game, progress=lambda f, m: print(f"[{f:4.0%}] {m}"))
+    print(msg)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
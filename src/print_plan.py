@@ -0,0 +1,90 @@
+import math
+from src.pdf_generator import PDFGenerator, bleed_grid
+from src.metrics import metrics
+from src.print_derivative import print_key, print_tag
+
+# Estimation de la taille du PDF (calibrée sur des exports réels) : fpdf ré-encode
+# chaque image distincte une seule fois, légèrement plus lourde que le PNG source
+IMAGE_SIZE_FACTOR = 1.1
+PAGE_OVERHEAD_BYTES = 600
+PLACEMENT_OVERHEAD_BYTES = 100
+
+
+@metrics.timed("print_plan_seconds")
+def plan_export(gm, game_name, decks, layout=None, mode="pdf"):
+    """
+    Plan d'impression des decks sans télécharger aucune image : mêmes grilles et même
+    pagination que PDFGenerator.add_deck_section (ou RasterSheetGenerator pour
+    mode="raster"), à partir de la config, des nombres d'exemplaires (cards.json)
+    et des tailles des listings.
+    decks: liste de dicts de type de carte (config.json)
+    Returns:
+        dict {'decks': [...], 'sheets', 'pages', 'cards', 'fill', 'estimated_bytes'}
+    """
+    layout = layout or PDFGenerator().layout_options()
+    # Avec les dérivés d'impression, chaque emplacement inclut le fond perdu ; les
+    # planches images n'utilisent ni fond perdu ni dérivés
+    settings = gm.get_print_settings(game_name) if mode == "pdf" else None
+    bleed = settings['bleed_mm'] if settings else 0
+    plans = []
+    for deck in decks:
+        folder = deck['folder']
+        w, h = deck['width_mm'], deck['height_mm']
+        plan = {"name": deck['name'], "folder": folder, "width": w, "height": h,
+                "cards": 0, "per_sheet": 0, "sheets": 0, "pages": 0, "fill": 0.0,
+                "estimated_bytes": 0, "skipped": None}
+        plans.append(plan)
+
+        objects = gm._list_card_objects(game_name, folder)
+        if not objects:
+            plan["skipped"] = "Aucune carte."
+            continue
+        grid, _, _ = bleed_grid(w, h, bleed, layout['page_w'], layout['page_h'], layout['margin'])
+        if grid is None:
+            plan["skipped"] = "Format trop grand pour la page."
+            continue
+
+        meta = gm._load_deck_metadata(game_name, folder)
+        copies = sum(int(meta.get(o['Key'].split('/')[-1], {}).get("count", 1)) for o in objects)
+        per_sheet = grid['cols'] * grid['rows']
+        sheets = math.ceil(copies / per_sheet)
+
+        back = gm._back_head(game_name, folder)
+        sources = [(o['Key'], o.get('ETag', ''), o.get('Size', 0)) for o in objects]
+        if back:
+            sources.append((f"{gm.root_prefix}{game_name}/{folder}/back.png", back.get('ETag', ''), back.get('ContentLength', 0)))
+        derivatives = gm._list_print_objects(game_name, folder) if settings else {}
+
+        def embedded_size(key, etag, size):
+            # Taille du dérivé d'impression s'il est à jour (c'est lui qui sera intégré)
+            derivative = derivatives.get(print_key(key, print_tag(etag, settings))) if settings else None
+            return derivative.get('Size', 0) if derivative else size
+
+        image_bytes = sum(embedded_size(*src) for src in sources)
+
+        plan.update({
+            "cards": copies,
+            "per_sheet": per_sheet,
+            # Une feuille = une page recto + une page verso
+            "sheets": sheets,
+            "pages": 2 * sheets,
+            "fill": copies / (sheets * per_sheet) if sheets else 0.0,
+            "estimated_bytes": int(
+                image_bytes * IMAGE_SIZE_FACTOR
+                + 2 * sheets * PAGE_OVERHEAD_BYTES
+                # Recto et verso : image (si présente) et cadre de coupe
+                + 2 * copies * PLACEMENT_OVERHEAD_BYTES
+            ),
+        })
+
+    sheets = sum(p["sheets"] for p in plans)
+    cards = sum(p["cards"] for p in plans if not p["skipped"])
+    slots = sum(p["sheets"] * p["per_sheet"] for p in plans)
+    return {
+        "decks": plans,
+        "sheets": sheets,
+        "pages": 2 * sheets,
+        "cards": cards,
+        "fill": cards / slots if slots else 0.0,
+        "estimated_bytes": sum(p["estimated_bytes"] for p in plans),
+    }
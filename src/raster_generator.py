@@ -0,0 +1,137 @@
+import os
+import math
+import urllib.request
+from collections import OrderedDict
+import cv2
+import numpy as np
+from PIL import Image
+from src.pdf_generator import compute_grid, slot_origin
+from src.metrics import metrics
+
+MM_PER_INCH = 25.4
+
+FORMATS = {"png": ".png", "tiff": ".tif"}
+
+
+def load_image_bytes(path):
+    """Lit une image depuis une URL (presignée) ou un chemin local"""
+    if path.startswith('http://') or path.startswith('https://'):
+        with urllib.request.urlopen(path, timeout=60) as resp:
+            return resp.read()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class RasterSheetGenerator:
+    """
+    Planches d'impression aplaties (PNG/TIFF) composées directement en NumPy.
+    Même grille et même miroir verso que PDFGenerator.add_deck_section ;
+    chaque planche est écrite sur disque dès qu'elle est terminée.
+    """
+
+    def __init__(self, output_dir, dpi=300, fmt="png", tile_cache_size=64):
+        if fmt not in FORMATS:
+            raise ValueError(f"Format inconnu : {fmt}")
+        self.output_dir = output_dir
+        self.dpi = dpi
+        self.fmt = fmt
+        self.margin = 10
+        self.page_w = 210
+        self.page_h = 297
+        self.scale = dpi / MM_PER_INCH  # pixels par mm
+        self.sheet_w = round(self.page_w * self.scale)
+        self.sheet_h = round(self.page_h * self.scale)
+        self.files = []
+        # Cartes décodées, redimensionnées et aplaties sur blanc : (path, w, h) -> BGR
+        self.tile_cache = OrderedDict()
+        self.tile_cache_size = tile_cache_size
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _tile(self, path, w_px, h_px):
+        """Carte prête à blitter : alpha composité sur blanc une seule fois par taille"""
+        key = (path, w_px, h_px)
+        if key in self.tile_cache:
+            self.tile_cache.move_to_end(key)
+            return self.tile_cache[key]
+
+        with metrics.timer("raster_stage_seconds", stage="fetch"):
+            data = np.frombuffer(load_image_bytes(path), dtype=np.uint8)
+        img = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise ValueError("image illisible")
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+        elif img.shape[2] == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+
+        img = cv2.resize(img, (w_px, h_px), interpolation=cv2.INTER_AREA)
+        alpha = img[:, :, 3:4].astype(np.float32) / 255.0
+        tile = img[:, :, :3].astype(np.float32) * alpha + 255.0 * (1.0 - alpha)
+        tile = tile.round().astype(np.uint8)
+
+        self.tile_cache[key] = tile
+        if len(self.tile_cache) > self.tile_cache_size:
+            self.tile_cache.popitem(last=False)
+        return tile
+
+    def _slot_px(self, x_mm, y_mm, card_w, card_h):
+        # Bornes arrondies séparément : pas de trou ni de chevauchement entre cartes voisines
+        x0, y0 = round(x_mm * self.scale), round(y_mm * self.scale)
+        x1, y1 = round((x_mm + card_w) * self.scale), round((y_mm + card_h) * self.scale)
+        return x0, y0, x1, y1
+
+    def _render_side(self, batch, grid, card_w, card_h, verso):
+        sheet = np.full((self.sheet_h, self.sheet_w, 3), 255, dtype=np.uint8)
+        for idx, card in enumerate(batch):
+            x_mm, y_mm = slot_origin(grid, idx, card_w, card_h, verso=verso)
+            x0, y0, x1, y1 = self._slot_px(x_mm, y_mm, card_w, card_h)
+
+            path = card.get('back') if verso else card['front']
+            if path:
+                try:
+                    sheet[y0:y1, x0:x1] = self._tile(path, x1 - x0, y1 - y0)
+                except Exception as e:
+                    print(f"Error adding image {path}: {e}")
+            elif not verso:
+                continue
+
+            # Cadre léger de coupe
+            cv2.rectangle(sheet, (x0, y0), (x1 - 1, y1 - 1), (200, 200, 200), 1)
+        return sheet
+
+    @metrics.timed("raster_stage_seconds", stage="write")
+    def _write_sheet(self, sheet):
+        index = len(self.files) + 1
+        side = "recto" if index % 2 else "verso"
+        path = os.path.join(self.output_dir, f"planche_{(index + 1) // 2:03d}_{side}{FORMATS[self.fmt]}")
+        img = Image.fromarray(cv2.cvtColor(sheet, cv2.COLOR_BGR2RGB))
+        if self.fmt == "png":
+            img.save(path, dpi=(self.dpi, self.dpi), compress_level=3)
+        else:
+            img.save(path, dpi=(self.dpi, self.dpi), compression="tiff_deflate")
+        self.files.append(path)
+
+    def add_deck_section(self, cards_data):
+        """
+        Ajoute les planches recto/verso d'un groupe de cartes de même dimension.
+        cards_data: liste de dict {'front': path, 'back': path, 'width': mm, 'height': mm}
+        """
+        if not cards_data:
+            return
+
+        card_w = cards_data[0]['width']
+        card_h = cards_data[0]['height']
+        grid = compute_grid(card_w, card_h, self.page_w, self.page_h, self.margin)
+        if grid is None:
+            return
+
+        items_per_page = grid['cols'] * grid['rows']
+        for i in range(math.ceil(len(cards_data) / items_per_page)):
+            batch = cards_data[i*items_per_page : (i+1)*items_per_page]
+            self._write_sheet(self._render_side(batch, grid, card_w, card_h, verso=False))
+            self._write_sheet(self._render_side(batch, grid, card_w, card_h, verso=True))
+
+    def save(self):
+        if not self.files:
+            return False, "Aucune planche générée."
+        return True, f"{len(self.files)} planches générées ({self.dpi} dpi)"
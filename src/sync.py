@@ -0,0 +1,317 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from botocore.exceptions import ClientError
+
+# Etats de synchronisation d'un jeu
+IDLE = "idle"
+SYNCING = "syncing"
+OFFLINE = "offline"
+
+# Fichiers fusionnés clé par clé en cas de modification des deux côtés
+MERGEABLE = ("config.json", "cards.json")
+# Nouvelles tentatives d'une fusion dont l'envoi échoue (distant modifié entre-temps)
+MERGE_ATTEMPTS = 3
+
+
+def _md5(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def merge_json(base, local, remote):
+    """
+    Fusion à trois voies de deux dicts JSON modifiés depuis la même base.
+    Retourne (fusion, conflits) ; en cas de modification concurrente d'une même
+    valeur, la version locale est conservée et la clé est signalée.
+    """
+    base = base if isinstance(base, dict) else {}
+    merged, conflicts = {}, []
+    for key in sorted(set(local) | set(remote) | set(base)):
+        b, l, r = base.get(key), local.get(key), remote.get(key)
+        if l == r:
+            value = l
+        elif l == b:
+            value = r
+        elif r == b:
+            value = l
+        elif isinstance(l, dict) and isinstance(r, dict):
+            value, sub = merge_json(b, l, r)
+            conflicts += [f"{key}.{c}" for c in sub]
+        else:
+            value = l if key in local else r
+            conflicts.append(key)
+        if value is not None or (key in local and key in remote):
+            merged[key] = value
+    return merged, conflicts
+
+
+class SyncEngine:
+    """
+    Synchronisation en arrière-plan entre la copie de travail locale
+    (LocalS3Client) et le bucket distant. Seuls les objets modifiés depuis la
+    dernière synchronisation (ETag / md5) sont transférés dans un sens ou dans
+    l'autre ; config.json et cards.json modifiés des deux côtés sont fusionnés.
+    """
+
+    def __init__(self, local, remote, bucket, workdir, root_prefix="games/",
+                 interval=15, on_local_change=None, lock=None):
+        self.local = local
+        self.remote = remote
+        self.bucket = bucket
+        self.root_prefix = root_prefix
+        self.interval = interval
+        # Appelé pour chaque clé modifiée localement par un pull (invalidation des caches)
+        self.on_local_change = on_local_change or (lambda key: None)
+        # Verrou partagé avec GameManager : pris uniquement pour les écritures locales,
+        # pour ne pas écraser une lecture-modification-écriture en cours
+        self.lock = lock or threading.RLock()
+
+        self.state_dir = os.path.join(workdir, ".sync")
+        self.base_dir = os.path.join(self.state_dir, "base")
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.state_path = os.path.join(self.state_dir, "state.json")
+        self.state = self._load_state()  # key -> {'local': md5, 'remote': etag}
+
+        self.tracked = set()
+        self.status = {}  # game -> dict
+        self.status_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    # --- ETAT PERSISTANT ---
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _base_path(self, key):
+        return os.path.join(self.base_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def _read_base(self, key):
+        try:
+            with open(self._base_path(key), "rb") as f:
+                return json.loads(f.read().decode("utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _record(self, key, local_etag, remote_etag, data=None):
+        """Nouvelle base commune pour key (None, None : supprimée des deux côtés)"""
+        if local_etag is None and remote_etag is None:
+            self.state.pop(key, None)
+            if os.path.exists(self._base_path(key)):
+                os.remove(self._base_path(key))
+            return
+        self.state[key] = {"local": local_etag, "remote": remote_etag}
+        if data is not None and key.endswith(MERGEABLE):
+            with open(self._base_path(key), "wb") as f:
+                f.write(data)
+
+    # --- LISTINGS ---
+    def _list(self, client, prefix):
+        objects = {}
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            resp = client.list_objects_v2(**kwargs)
+            for obj in resp.get("Contents", []):
+                objects[obj["Key"]] = obj["ETag"].strip('"')
+            if not resp.get("IsTruncated"):
+                return objects
+            kwargs["ContinuationToken"] = resp["NextContinuationToken"]
+
+    def _local_etag(self, key):
+        """ETag actuel de la copie locale (None si absente)"""
+        try:
+            return self.local.head_object(Bucket=self.bucket, Key=key)["ETag"].strip('"')
+        except ClientError:
+            return None
+
+    # --- TRANSFERTS ---
+    def _push(self, key):
+        data = self.local.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        resp = self.remote.put_object(Bucket=self.bucket, Key=key, Body=data)
+        self._record(key, _md5(data), resp.get("ETag", "").strip('"') or _md5(data), data)
+
+    def _pull(self, key, local_etag):
+        """
+        Remplace la copie locale par la version distante, sauf si elle a changé depuis le listing (local_etag) : rien n'est écrit et
+        False est retourné.
+        """
+        obj = self.remote.get_object(Bucket=self.bucket, Key=key)
+        data = obj["Body"].read()
+        with self.lock:
+            # Vérifié sous le verrou : une écriture de GameManager a pu suivre le listing
+            if self._local_etag(key) != local_etag:
+                return False
+            resp = self.local.put_object(Bucket=self.bucket, Key=key, Body=data)
+        self._record(key, resp["ETag"].strip('"'), obj["ETag"].strip('"'), data)
+        self.on_local_change(key)
+        return True
+
+    def _delete_local(self, key, local_etag):
+        """Comme _pull, pour un objet supprimé à distance"""
+        with self.lock:
+            if self._local_etag(key) != local_etag:
+                return False
+            self.local.delete_object(Bucket=self.bucket, Key=key)
+        self._record(key, None, None)
+        self.on_local_change(key)
+        return True
+
+    def _merge(self, key):
+        base = self._read_base(key)
+        for _ in range(MERGE_ATTEMPTS):
+            obj = self.remote.get_object(Bucket=self.bucket, Key=key)
+            remote = json.loads(obj["Body"].read().decode("utf-8"))
+            with self.lock:
+                local_data = self.local.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+                merged, conflicts = merge_json(base, json.loads(local_data.decode("utf-8")), remote)
+                data = json.dumps(merged, indent=4).encode("utf-8")
+                self.local.put_object(Bucket=self.bucket, Key=key, Body=data)
+            self.on_local_change(key)
+            try:
+                # Envoi conditionnel : si le distant a changé depuis sa lecture, on refusionne
+                # avec pour base la version distante lue (déjà intégrée à la copie locale)
+                resp = self.remote.put_object(
+                    Bucket=self.bucket, Key=key, Body=data, ContentType="application/json", IfMatch=obj["ETag"]
+                )
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") in ("PreconditionFailed", "412"):
+                    base = remote
+                    continue
+                raise
+            self._record(key, _md5(data), resp.get("ETag", "").strip('"') or _md5(data), data)
+            return [f"{key} : {c}" for c in conflicts]
+        raise RuntimeError(f"{key} : modifié à distance pendant la fusion, nouvel essai au prochain passage")
+
+    def _resolve(self, key, l, r):
+        """Objet modifié des deux côtés depuis la dernière synchronisation ; retourne les conflits"""
+        if l == r:
+            self._record(key, l, r)
+            return []
+        if l is None or r is None:
+            # Suppression contre modification : la modification l'emporte
+            if l is None:
+                if not self._pull(key, None):
+                    # Recréé localement entre-temps : traité au prochain passage
+                    self.request_sync()
+                    return []
+            else:
+                self._push(key)
+            return [f"{key} : supprimé d'un côté, modifié de l'autre"]
+        if key.endswith(MERGEABLE):
+            return self._merge(key)
+        # Image modifiée des deux côtés : la copie locale l'emporte
+        self._push(key)
+        return [f"{key} : version locale conservée"]
+
+    def sync_game(self, game_name):
+        """Une passe de synchronisation d'un jeu ; retourne (nb transferts, conflits)"""
+        prefix = f"{self.root_prefix}{game_name}/"
+        transfers, conflicts = 0, []
+        local = self._list(self.local, prefix)
+        remote = self._list(self.remote, prefix)
+        for key in sorted(set(local) | set(remote) | {k for k in self.state if k.startswith(prefix)}):
+            base = self.state.get(key, {})
+            l, r = local.get(key), remote.get(key)
+            l_changed = l != base.get("local")
+            r_changed = r != base.get("remote")
+            if not l_changed and not r_changed:
+                continue
+
+            if l_changed and not r_changed:
+                if l is None:
+                    self.remote.delete_object(Bucket=self.bucket, Key=key)
+                    self._record(key, None, None)
+                else:
+                    self._push(key)
+            elif r_changed and not l_changed:
+                done = self._delete_local(key, l) if r is None else self._pull(key, l)
+                if not done:
+                    # Modifié localement pendant la passe : modifié des deux côtés
+                    conflicts += self._resolve(key, self._local_etag(key), r)
+            elif l == r:
+                self._record(key, l, r)
+                continue
+            else:
+                conflicts += self._resolve(key, l, r)
+            transfers += 1
+        self._save_state()
+        return transfers, conflicts
+
+    def pending_changes(self, game_name):
+        """Objets modifiés localement et pas encore envoyés"""
+        prefix = f"{self.root_prefix}{game_name}/"
+        local = self._list(self.local, prefix)
+        state = dict(self.state)
+        keys = set(local) | {k for k in state if k.startswith(prefix)}
+        return sum(1 for k in keys if local.get(k) != state.get(k, {}).get("local"))
+
+    def pull_game_list(self):
+        """Récupère le config.json des jeux distants inconnus pour qu'ils apparaissent localement"""
+        resp = self.remote.list_objects_v2(Bucket=self.bucket, Prefix=self.root_prefix, Delimiter="/")
+        for p in resp.get("CommonPrefixes", []):
+            key = f"{p['Prefix']}config.json"
+            if key in self.state:
+                continue
+            if self._local_etag(key) is None and self._pull(key, None):
+                self._save_state()
+
+    # --- BOUCLE D'ARRIERE-PLAN ---
+    def _set_status(self, game_name, **fields):
+        with self.status_lock:
+            self.status.setdefault(game_name, {"state": IDLE, "last_sync": None, "conflicts": []}).update(fields)
+
+    def get_status(self, game_name):
+        with self.status_lock:
+            status = dict(self.status.get(game_name, {"state": IDLE, "last_sync": None, "conflicts": []}))
+        try:
+            status["pending"] = self.pending_changes(game_name)
+        except Exception:
+            status["pending"] = None
+        return status
+
+    def track(self, game_name):
+        """Ajoute un jeu à la synchronisation complète (premier pull immédiat)"""
+        if game_name and game_name not in self.tracked:
+            self.tracked.add(game_name)
+            self.request_sync()
+
+    def request_sync(self):
+        self.wakeup.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self.pull_game_list()
+            except Exception as e:
+                print(f"Error sync game list: {e}")
+            for game_name in list(self.tracked):
+                self._set_status(game_name, state=SYNCING)
+                try:
+                    transfers, conflicts = self.sync_game(game_name)
+                    with self.status_lock:
+                        previous = self.status.get(game_name, {}).get("conflicts", [])
+                    self._set_status(
+                        game_name, state=IDLE, last_sync=time.time(), error=None,
+                        last_transfers=transfers, conflicts=(previous + conflicts)[-20:]
+                    )
+                except Exception as e:
+                    # Réseau indisponible : on continue en local, nouvel essai au prochain tour
+                    self._set_status(game_name, state=OFFLINE, error=str(e))
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name="r2-sync", daemon=True)
+            self.thread.start()
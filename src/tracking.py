@@ -0,0 +1,237 @@
+import time
+import queue
+import threading
+import cv2
+import numpy as np
+from src.metrics import metrics
+from src.utils import detecter_coins, redresser_carte
+
+# Etats du suivi (affichés en surimpression sur le flux caméra)
+SEARCHING = "recherche"
+TRACKING = "suivi"
+STABLE = "stable"
+CAPTURED = "capturée"
+
+
+def nettete(image):
+    """Variance du laplacien (niveaux de gris) : faible = image floue"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class CardTracker:
+    """
+    Suivi d'une carte dans un flux caméra, image par image.
+    La carte n'est recherchée sur toute l'image que lorsqu'elle est perdue ; sinon
+    la détection se limite à la zone de la carte précédente (élargie de roi_margin),
+    ce qui la rend bien plus rapide. La carte est capturée automatiquement quand ses
+    coins ne bougent plus depuis stable_frames images et que l'image est nette ;
+    une nouvelle capture n'est possible qu'après retrait ou déplacement de la carte.
+    """
+
+    def __init__(self, L_mm=60, H_mm=113, ppi=10, seuil=45, mode="contour",
+                 stable_frames=4, stable_px=3.0, rearm_px=25.0, rearm_frames=3,
+                 sharpness_min=60.0, roi_margin=0.2, min_area=0.05, ratio_tolerance=0.25,
+                 cooldown=0.5):
+        self.L_mm, self.H_mm, self.ppi = L_mm, H_mm, ppi
+        self.seuil, self.mode = seuil, mode
+        self.stable_frames = stable_frames
+        self.stable_px = stable_px
+        self.rearm_px = rearm_px
+        self.rearm_frames = rearm_frames
+        self.sharpness_min = sharpness_min
+        self.roi_margin = roi_margin
+        self.min_area = min_area
+        self.ratio_tolerance = ratio_tolerance
+        self.cooldown = cooldown
+        self.reset()
+
+    def reset(self):
+        self.rect = None
+        self.stable = 0
+        self.lost = 0
+        self.armed = True
+        self.anchor = None  # Coins au moment de la dernière capture
+        self.last_capture = float("-inf")
+        self.sharpness = 0.0
+        self.state = SEARCHING
+
+    def _valide(self, rect, frame_shape):
+        """Rejette les contours parasites : trop petits ou pas aux proportions de la carte"""
+        area = cv2.contourArea(rect)
+        if area < self.min_area * frame_shape[0] * frame_shape[1]:
+            return False
+        largeur = (np.linalg.norm(rect[1] - rect[0]) + np.linalg.norm(rect[2] - rect[3])) / 2
+        hauteur = (np.linalg.norm(rect[3] - rect[0]) + np.linalg.norm(rect[2] - rect[1])) / 2
+        if hauteur < 1:
+            return False
+        attendu = self.L_mm / self.H_mm
+        return abs(largeur / hauteur - attendu) <= self.ratio_tolerance * attendu
+
+    def _roi(self, frame_shape):
+        """Zone de recherche : rectangle englobant la carte précédente, élargi"""
+        h, w = frame_shape[:2]
+        x0, y0 = self.rect.min(axis=0)
+        x1, y1 = self.rect.max(axis=0)
+        mx, my = (x1 - x0) * self.roi_margin, (y1 - y0) * self.roi_margin
+        return (max(int(x0 - mx), 0), max(int(y0 - my), 0),
+                min(int(x1 + mx) + 1, w), min(int(y1 + my) + 1, h))
+
+    def _detect(self, frame):
+        """Coins de la carte : d'abord dans la zone précédente, sinon sur toute l'image"""
+        if self.rect is not None:
+            x0, y0, x1, y1 = self._roi(frame.shape)
+            with metrics.timer("tracking_seconds", stage="roi"):
+                rect, _ = detecter_coins(frame[y0:y1, x0:x1], self.seuil, self.mode)
+            if rect is not None:
+                rect = rect + np.array([x0, y0], dtype="float32")
+                # Carte coupée par le bord de la zone : elle a bougé, on recherche partout
+                au_bord = (
+                    (rect[:, 0].min() <= x0 + 1 and x0 > 0) or (rect[:, 1].min() <= y0 + 1 and y0 > 0)
+                    or (rect[:, 0].max() >= x1 - 2 and x1 < frame.shape[1])
+                    or (rect[:, 1].max() >= y1 - 2 and y1 < frame.shape[0])
+                )
+                if not au_bord and self._valide(rect, frame.shape):
+                    return rect
+        with metrics.timer("tracking_seconds", stage="full"):
+            rect, _ = detecter_coins(frame, self.seuil, self.mode)
+        if rect is not None and self._valide(rect, frame.shape):
+            return rect
+        return None
+
+    def process(self, frame, now=None):
+        """
+        Traite une image (BGR) du flux.
+        Returns:
+            carte redressée (BGRA) si elle vient d'être capturée, sinon None
+        """
+        now = time.monotonic() if now is None else now
+        rect = self._detect(frame)
+
+        if rect is None:
+            self.lost += 1
+            if self.lost >= self.rearm_frames:
+                # Carte retirée : la suivante pourra être capturée
+                self.rect, self.stable, self.armed = None, 0, True
+                self.state = SEARCHING
+            return None
+
+        self.lost = 0
+        mouvement = float(np.abs(rect - self.rect).max()) if self.rect is not None else float("inf")
+        self.stable = self.stable + 1 if mouvement <= self.stable_px else 0
+        self.rect = rect
+        if not self.armed and self.anchor is not None and float(np.abs(rect - self.anchor).max()) > self.rearm_px:
+            # Carte déplacée (ou remplacée à un autre endroit) sans avoir été retirée
+            self.armed = True
+
+        if not self.armed:
+            self.state = CAPTURED
+            return None
+        if self.stable < self.stable_frames:
+            self.state = TRACKING
+            return None
+
+        self.state = STABLE
+        if now - self.last_capture < self.cooldown:
+            return None
+        carte = redresser_carte(frame, rect, self.L_mm, self.H_mm, self.ppi)
+        self.sharpness = nettete(carte[:, :, :3])
+        if self.sharpness < self.sharpness_min:
+            return None
+
+        self.armed = False
+        self.anchor = rect.copy()
+        self.last_capture = now
+        self.state = CAPTURED
+        metrics.inc("tracking_captures_total")
+        return carte
+
+    def draw(self, frame):
+        """Surimpression du contour suivi (vert = stable / capturée, orange = en mouvement)"""
+        if self.rect is None:
+            return frame
+        color = (0, 200, 0) if self.state in (STABLE, CAPTURED) else (0, 165, 255)
+        cv2.polylines(frame, [self.rect.astype(np.int32)], True, color, 3, lineType=cv2.LINE_AA)
+        cv2.putText(frame, self.state, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2, cv2.LINE_AA)
+        return frame
+
+
+class CaptureQueue:
+    """
+    Enregistrement des cartes capturées par un thread dédié : le flux caméra n'attend
+    jamais le stockage. Les cartes sont nommées <base>_<n> dans l'ordre de capture,
+    la numérotation reprenant après les cartes <base>_<n> déjà présentes dans le deck :
+    une nouvelle file (autre session, paramètres modifiés) n'écrase jamais une carte.
+    """
+
+    def __init__(self, gm, game_name, folder, base_name, count=1):
+        self.gm = gm
+        self.game_name = game_name
+        self.folder = folder
+        self.base_name = base_name
+        # Même nettoyage que save_card : les noms comparés sont ceux réellement stockés
+        self.prefix = "".join([c for c in base_name if c.isalnum() or c in (' ', '-', '_')]).strip() + "_"
+        self.count = count
+        self.queue = queue.Queue()
+        self.captured = 0
+        self.index = self._last_index()
+        self.saved = 0
+        self.errors = []
+        self.last_card = None
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name=f"capture-{game_name}", daemon=True)
+        self.thread.start()
+
+    def put(self, card):
+        with self.lock:
+            self.captured += 1
+            self.last_card = card
+        self.queue.put(card)
+
+    def _existing_names(self):
+        return {o['Key'].split('/')[-1][:-len('.png')] for o in self.gm._list_card_objects(self.game_name, self.folder)}
+
+    def _last_index(self):
+        """Plus grand n des cartes <base>_<n> déjà présentes dans le deck"""
+        prefix = self.prefix
+        indexes = [
+            int(name[len(prefix):]) for name in self._existing_names()
+            if name.startswith(prefix) and name[len(prefix):].isdigit()
+        ]
+        return max(indexes, default=0)
+
+    def _next_name(self):
+        # Vérifié au moment de l'enregistrement : une autre session peut utiliser la même base
+        existing = self._existing_names()
+        while True:
+            self.index += 1
+            name = f"{self.prefix}{self.index:03d}"
+            if name not in existing:
+                return name
+
+    @property
+    def pending(self):
+        return self.queue.unfinished_tasks
+
+    def stop(self):
+        """Termine le thread une fois les captures en attente enregistrées"""
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                card = item
+                name = self._next_name()
+                with metrics.timer("tracking_save_seconds"):
+                    ok, msg = self.gm.save_card(self.game_name, self.folder, card, name, count=self.count)
+                if ok:
+                    self.saved += 1
+                else:
+                    self.errors.append(f"{name} : {msg}")
+            except Exception as e:
+                self.errors.append(f"{self.base_name} : {e}")
+            finally:
+                self.queue.task_done()
@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from src.metrics import metrics
 
 def ordonner_points(pts):
     """Ordonne les 4 points d'un quadrilatère dans l'ordre: haut-gauche, haut-droite, bas-droite, bas-gauche"""
@@ -17,44 +18,121 @@ def ordonner_points(pts):
     
     return rect
 
-def detourer_carte_precise(image, L_mm=60, H_mm=113, ppi=10, seuil=45):
-    """
-    Détecte et redresse une carte depuis une image
-    Args:
-        image: Image numpy array (BGR)
-        L_mm: Largeur de la carte en mm
-        H_mm: Hauteur de la carte en mm
-        ppi: Pixels par mm
-        seuil: Seuil de binarisation pour la détection
-    Returns:
-        tuple: (carte_redressée, succès, message)
-    """
-    orig = image.copy()
-    
-    # Configuration des dimensions cibles
-    dst_w, dst_h = L_mm * ppi, H_mm * ppi
-
-    # Prétraitement pour fond noir
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (11, 11), 0)
-    _, thresh = cv2.threshold(blurred, seuil, 255, cv2.THRESH_BINARY)
+def _plus_grand_contour(image, seuil, blur=11):
+    """Plus grand contour externe de l'image binarisée (carte claire sur fond noir)"""
+    with metrics.timer("detection_stage_seconds", stage="blur"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        blurred = cv2.GaussianBlur(gray, (blur, blur), 0)
+    with metrics.timer("detection_stage_seconds", stage="threshold"):
+        _, thresh = cv2.threshold(blurred, seuil, 255, cv2.THRESH_BINARY)
     
     # Détection du contour
-    cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    with metrics.timer("detection_stage_seconds", stage="contours"):
+        cnts, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not cnts:
-        return None, False, "Aucun contour détecté."
-    
+        return None
     # On prend le plus grand contour (la carte)
-    c = max(cnts, key=cv2.contourArea)
-    
-    # Gestion du trapèze - points extrêmes du contour
+    return max(cnts, key=cv2.contourArea)
+
+
+def _points_extremes(c):
+    """Points extrêmes du contour (gestion du trapèze)"""
+    if c is None:
+        return None, "Aucun contour détecté."
     pts_contour = c.reshape(c.shape[0], 2)
     
     # Vérification simple si on a bien trouvé quelque chose qui ressemble à un quadrilatère
     if len(pts_contour) < 4:
-         return None, False, "Contour trop petit ou invalide."
+        return None, "Contour trop petit ou invalide."
+    return ordonner_points(pts_contour.astype("float32")), None
+
+
+def _coins_contour(image, seuil):
+    return _points_extremes(_plus_grand_contour(image, seuil))
+
+
+def _intersection(l1, l2):
+    (vx1, vy1, x1, y1), (vx2, vy2, x2, y2) = l1, l2
+    det = vx1 * vy2 - vy1 * vx2
+    if abs(det) < 1e-6:
+        return None
+    t = ((x2 - x1) * vy2 - (y2 - y1) * vx2) / det
+    return [x1 + t * vx1, y1 + t * vy1]
+
+
+def _coins_lignes(image, seuil):
+    """
+    Coins = intersections de droites ajustées sur chaque côté du contour.
+    Les coins arrondis de la carte sont exclus de l'ajustement : les coins
+    obtenus sont ceux du rectangle de la carte, au sous-pixel.
+    """
+    c = _plus_grand_contour(image, seuil)
+    rect, msg = _points_extremes(c)
+    if rect is None:
+        return None, msg
+    pts = c.reshape(-1, 2).astype(np.float32)
+
+    with metrics.timer("detection_stage_seconds", stage="lines"):
+        lignes = []
+        for i in range(4):
+            a, b = rect[i], rect[(i + 1) % 4]
+            ab = b - a
+            longueur = float(np.hypot(*ab))
+            if longueur < 1:
+                return rect, None
+            # Points proches du côté [a, b], hors 15 % aux extrémités (coins arrondis)
+            t = ((pts - a) @ ab) / (longueur ** 2)
+            dist = np.abs((pts - a) @ np.array([-ab[1], ab[0]])) / longueur
+            cote = pts[(t > 0.15) & (t < 0.85) & (dist < 0.05 * longueur)]
+            if len(cote) < 2:
+                return rect, None
+            lignes.append(cv2.fitLine(cote, cv2.DIST_HUBER, 0, 0.01, 0.01).ravel())
+
+        coins = []
+        for i in range(4):
+            p = _intersection(lignes[i - 1], lignes[i])
+            if p is None:
+                return rect, None
+            coins.append(p)
+    return np.array(coins, dtype="float32"), None
+
+
+def _coins_reduit(image, seuil, facteur=2):
+    """Détection sur l'image réduite (plus rapide), coins remis à l'échelle"""
+    petite = cv2.resize(image, None, fx=1 / facteur, fy=1 / facteur, interpolation=cv2.INTER_AREA)
+    rect, msg = _coins_contour(petite, seuil)
+    if rect is None:
+        return None, msg
+    return rect * facteur, None
 
-    rect_source = ordonner_points(pts_contour.astype("float32"))
+
+# Modes de détection des coins (comparés par benchmarks/bench_detection.py)
+MODES_DETECTION = {
+    "contour": _coins_contour,
+    "lignes": _coins_lignes,
+    "reduit": _coins_reduit,
+}
+
+
+def detecter_coins(image, seuil=45, mode="contour"):
+    """
+    Coins de la carte dans l'image (BGR), ordonnés haut-gauche, haut-droite,
+    bas-droite, bas-gauche.
+    Returns:
+        tuple: (array (4, 2) float32 ou None, message d'erreur ou None)
+    """
+    return MODES_DETECTION[mode](image, seuil)
+
+
+def redresser_carte(image, rect_source, L_mm=60, H_mm=113, ppi=10):
+    """
+    Redresse la carte délimitée par rect_source (coins ordonnés, voir detecter_coins)
+    et applique le masque des coins arrondis
+    Returns:
+        array BGRA de (H_mm * ppi) x (L_mm * ppi) pixels
+    """
+    # Configuration des dimensions cibles
+    dst_w, dst_h = L_mm * ppi, H_mm * ppi
 
     # Correction de Perspective (Warp)
     dst = np.array([
@@ -63,27 +141,52 @@ def detourer_carte_precise(image, L_mm=60, H_mm=113, ppi=10, seuil=45):
         [dst_w - 1, dst_h - 1],
         [0, dst_h - 1]], dtype="float32")
 
-    M = cv2.getPerspectiveTransform(rect_source, dst)
-    warped = cv2.warpPerspective(orig, M, (dst_w, dst_h))
+    with metrics.timer("detection_stage_seconds", stage="warp"):
+        M = cv2.getPerspectiveTransform(rect_source, dst)
+        warped = cv2.warpPerspective(image, M, (dst_w, dst_h))
 
-    # Création du masque pour bords arrondis (Rayon de 3mm)
-    rayon_px = int(3 * ppi)
-    mask = np.zeros((dst_h, dst_w), dtype="uint8")
-    
-    # Forme arrondie sur le masque
-    cv2.rectangle(mask, (rayon_px, 0), (dst_w - rayon_px, dst_h), 255, -1)
-    cv2.rectangle(mask, (0, rayon_px), (dst_w, dst_h - rayon_px), 255, -1)
-    
-    # Coins avec Anti-Aliasing
-    coins = [
-        (rayon_px, rayon_px), (dst_w - rayon_px, rayon_px), 
-        (rayon_px, dst_h - rayon_px), (dst_w - rayon_px, dst_h - rayon_px)
-    ]
-    for centre in coins:
-        cv2.circle(mask, centre, rayon_px, 255, -1, lineType=cv2.LINE_AA)
-
-    # Assemblage final avec canal Alpha
-    b, g, r = cv2.split(warped)
-    resultat = cv2.merge([b, g, r, mask])
+    with metrics.timer("detection_stage_seconds", stage="mask"):
+        # Création du masque pour bords arrondis (Rayon de 3mm)
+        rayon_px = int(3 * ppi)
+        mask = np.zeros((dst_h, dst_w), dtype="uint8")
+        
+        # Forme arrondie sur le masque
+        cv2.rectangle(mask, (rayon_px, 0), (dst_w - rayon_px, dst_h), 255, -1)
+        cv2.rectangle(mask, (0, rayon_px), (dst_w, dst_h - rayon_px), 255, -1)
+        
+        # Coins avec Anti-Aliasing
+        coins = [
+            (rayon_px, rayon_px), (dst_w - rayon_px, rayon_px), 
+            (rayon_px, dst_h - rayon_px), (dst_w - rayon_px, dst_h - rayon_px)
+        ]
+        for centre in coins:
+            cv2.circle(mask, centre, rayon_px, 255, -1, lineType=cv2.LINE_AA)
+
+        # Assemblage final avec canal Alpha
+        b, g, r = cv2.split(warped)
+        resultat = cv2.merge([b, g, r, mask])
+
+    return resultat
+
+
+@metrics.timed("detection_seconds")
+def detourer_carte_precise(image, L_mm=60, H_mm=113, ppi=10, seuil=45, mode="contour"):
+    """
+    Détecte et redresse une carte depuis une image
+    Args:
+        image: Image numpy array (BGR)
+        L_mm: Largeur de la carte en mm
+        H_mm: Hauteur de la carte en mm
+        ppi: Pixels par mm
+        seuil: Seuil de binarisation pour la détection
+        mode: Méthode de détection des coins (voir MODES_DETECTION)
+    Returns:
+        tuple: (carte_redressée, succès, message)
+    """
+    rect_source, msg = detecter_coins(image, seuil, mode)
+    if rect_source is None:
+        return None, False, msg
 
+    resultat = redresser_carte(image, rect_source, L_mm, H_mm, ppi)
+    dst_h, dst_w = resultat.shape[:2]
     return resultat, True, f"Carte détectée ({dst_w}x{dst_h}px)"
@@ -1,6 +1,8 @@
 import streamlit as st
+import io
 import cv2
 import numpy as np
+from src.game_manager import StorageError
 
 def render(gm, game_name):
     # Paramètres globaux locaux pour cette vue si besoin
@@ -13,9 +15,11 @@ def render(gm, game_name):
     # Charger la configuration
     try:
         config = gm._load_config(game_name)
-        card_types = config.get("card_types", {})
-    except:
-        card_types = {}
+    except StorageError as e:
+        # Stockage saturé / indisponible : surtout ne pas afficher un jeu vide
+        st.error(f"⚠️ {e}")
+        return
+    card_types = config.get("card_types", {})
 
     col_add, col_list = st.columns([1, 2])
     
@@ -44,48 +48,165 @@ def render(gm, game_name):
             st.info("Aucun type de carte configuré.")
         else:
             for key, val in card_types.items():
-                with st.container(border=True):
-                    col_info, col_back = st.columns([2, 1])
-                    
-                    with col_info:
-                        st.markdown(f"#### {val['name']}")
-                        st.caption(f"Dimensions : {val['width_mm']} x {val['height_mm']} mm")
-                        st.caption(f"Dossier : `{val['folder']}`")
-
-                    with col_back:
-                        # Gestion du dos de carte
-                        back_path = gm.get_back_image_path(game_name, val['folder'])
-                        if back_path:
-                            st.image(back_path, caption="Dos actuel", width=100)
-                        else:
-                            st.info("Pas de dos")
-                    
-                    with st.expander("🖼️ Modifier le dos de carte"):
-                        uploaded_back = st.file_uploader(f"Choisir une image pour {val['name']}", type=['png', 'jpg'], key=f"back_{key}")
-                        if uploaded_back:
-                            # Lecture
-                            file_bytes = np.asarray(bytearray(uploaded_back.read()), dtype=np.uint8)
-                            raw_back_img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-                            
-                            # Traitement (Détection & Recadrage simple hardcodé ou paramétré)
-                            # Pour éviter de redemander les sliders ici, on utilise des valeurs par défaut ou session
-                            
-                            with st.spinner("Détection..."):
-                                from src.utils import detourer_carte_precise
-                                res_back, success, msg = detourer_carte_precise(
-                                    raw_back_img, 
-                                    val['width_mm'], 
-                                    val['height_mm'], 
-                                    10, # PPI default
-                                    45  # Seuil default
-                                )
-                            
-                            if success:
-                                succ_save, msg_save = gm.save_back_image(game_name, val['folder'], res_back)
-                                if succ_save:
-                                    st.success("Dos enregistré !")
-                                    st.rerun()
-                                else:
-                                    st.error(msg_save)
-                            else:
-                                st.error(f"Echec détection: {msg}")
+                _render_type(gm, game_name, key, val)
+
+    _render_print_settings(gm, game_name)
+    _render_backup(gm, game_name)
+
+
+@st.fragment
+def _render_print_settings(gm, game_name):
+    # Dérivés d'impression : fond perdu et coins opaques calculés à l'enregistrement
+    from src.print_derivative import DEFAULT_SETTINGS, backfill_print_derivatives
+
+    # Relu à chaque exécution : un rerun du fragment réutilise les arguments du dernier run complet
+    try:
+        settings = gm.get_print_settings(game_name)
+    except StorageError as e:
+        st.error(f"⚠️ {e}")
+        return
+
+    with st.expander("🖨️ Impression (fond perdu)"):
+        current = settings or DEFAULT_SETTINGS
+        enabled = st.toggle("Générer les dérivés d'impression", value=bool(settings), key=f"print_enabled_{game_name}",
+                            help="Chaque carte et chaque dos enregistrés sont aussi préparés pour l'imprimeur ; l'export PDF les utilise")
+        col_bleed, col_dpi = st.columns(2)
+        with col_bleed:
+            bleed = st.number_input("Fond perdu (mm)", min_value=0.0, max_value=10.0, value=float(current['bleed_mm']),
+                                    step=0.5, key=f"print_bleed_{game_name}", disabled=not enabled)
+        with col_dpi:
+            dpis = [150, 300, 600]
+            dpi = st.selectbox("Résolution (dpi)", dpis, index=dpis.index(current['dpi']) if current['dpi'] in dpis else 1,
+                               key=f"print_dpi_{game_name}", disabled=not enabled)
+
+        if enabled and bleed:
+            st.caption(
+                "⚠️ Chaque carte occupe sa taille + 2 x fond perdu : moins de cartes par feuille, donc plus de papier. "
+                + _bleed_cost(gm, game_name, bleed)
+            )
+
+        new_settings = {"bleed_mm": bleed, "dpi": dpi} if enabled else None
+        if new_settings != settings and st.button("Enregistrer", key=f"print_save_{game_name}"):
+            ok, msg = gm.set_print_settings(game_name, new_settings)
+            (st.success if ok else st.error)(msg)
+            if ok:
+                settings = gm.get_print_settings(game_name)
+
+        if settings:
+            st.caption("Les cartes déjà enregistrées n'ont pas de dérivé : générez-les une fois (et après tout changement de réglage).")
+            if st.button("Générer les dérivés manquants", key=f"print_backfill_{game_name}"):
+                bar = st.progress(0.0)
+                ok, msg, _ = backfill_print_derivatives(gm, game_name, progress=lambda f, m: bar.progress(f, text=m))
+                (st.success if ok else st.error)(msg)
+
+
+def _bleed_cost(gm, game_name, bleed):
+    """Cartes par feuille avec / sans fond perdu, pour chaque deck du jeu"""
+    from src.pdf_generator import PDFGenerator, bleed_grid
+
+    layout = PDFGenerator().layout_options()
+    parts = []
+    for deck in gm.get_card_types(game_name).values():
+        counts = []
+        for b in (bleed, 0):
+            grid, _, _ = bleed_grid(deck['width_mm'], deck['height_mm'], b, layout['page_w'], layout['page_h'], layout['margin'])
+            counts.append(grid['cols'] * grid['rows'] if grid else 0)
+        parts.append(f"{deck['name']} : {counts[0]} au lieu de {counts[1]}")
+    return " — ".join(parts)
+
+
+@st.fragment
+def _render_backup(gm, game_name):
+    # Archive unique du jeu : sauvegarde téléchargeable, copie dans le bucket, clonage
+    from src.archive import pack_game, save_archive_to_bucket, clone_game
+
+    with st.expander("💾 Sauvegarde & clonage"):
+        col_dl, col_bucket, col_clone = st.columns(3)
+
+        with col_dl:
+            if st.button("Préparer l'archive", use_container_width=True):
+                buffer = io.BytesIO()
+                with st.spinner("Archivage..."):
+                    ok, msg, _ = pack_game(gm, game_name, buffer)
+                if ok:
+                    st.session_state['backup_archive'] = (game_name, buffer.getvalue())
+                else:
+                    st.error(msg)
+            archive = st.session_state.get('backup_archive')
+            if archive and archive[0] == game_name:
+                st.download_button(
+                    "📥 Télécharger (.tar.gz)",
+                    data=archive[1],
+                    file_name=f"{game_name}.tar.gz",
+                    mime="application/gzip",
+                    use_container_width=True
+                )
+
+        with col_bucket:
+            if st.button("Sauvegarder dans le bucket", use_container_width=True):
+                with st.spinner("Archivage..."):
+                    ok, msg = save_archive_to_bucket(gm, game_name)
+                (st.success if ok else st.error)(msg)
+
+        with col_clone:
+            clone_name = st.text_input("Nom de la copie", key="clone_game_name")
+            if st.button("Cloner", use_container_width=True) and clone_name:
+                with st.spinner("Clonage..."):
+                    ok, msg = clone_game(gm, game_name, clone_name)
+                (st.success if ok else st.error)(msg)
+
+
+@st.fragment
+def _render_type(gm, game_name, key, val):
+    # Fragment : l'upload d'un dos ne relance que la carte de ce type
+    with st.container(border=True):
+        col_info, col_back = st.columns([2, 1])
+        
+        with col_info:
+            st.markdown(f"#### {val['name']}")
+            st.caption(f"Dimensions : {val['width_mm']} x {val['height_mm']} mm")
+            st.caption(f"Dossier : `{val['folder']}`")
+
+        with col_back:
+            # Gestion du dos de carte
+            try:
+                back_path = gm.get_back_image_path(game_name, val['folder'])
+            except StorageError as e:
+                st.error(f"⚠️ {e}")
+                back_path = None
+            if back_path:
+                st.image(back_path, caption="Dos actuel", width=100)
+            else:
+                st.info("Pas de dos")
+        
+        with st.expander("🖼️ Modifier le dos de carte"):
+            uploaded_back = st.file_uploader(f"Choisir une image pour {val['name']}", type=['png', 'jpg'], key=f"back_{key}")
+            # Un même fichier n'est traité qu'une fois (sinon chaque rerun le ré-enregistre)
+            if uploaded_back and st.session_state.get(f"back_done_{key}") != uploaded_back.file_id:
+                # Lecture
+                file_bytes = np.asarray(bytearray(uploaded_back.read()), dtype=np.uint8)
+                raw_back_img = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+                
+                # Traitement (Détection & Recadrage simple hardcodé ou paramétré)
+                # Pour éviter de redemander les sliders ici, on utilise des valeurs par défaut ou session
+                
+                with st.spinner("Détection..."):
+                    from src.utils import detourer_carte_precise
+                    res_back, success, msg = detourer_carte_precise(
+                        raw_back_img, 
+                        val['width_mm'], 
+                        val['height_mm'], 
+                        10, # PPI default
+                        45  # Seuil default
+                    )
+                
+                if success:
+                    succ_save, msg_save = gm.save_back_image(game_name, val['folder'], res_back)
+                    if succ_save:
+                        st.session_state[f"back_done_{key}"] = uploaded_back.file_id
+                        st.success("Dos enregistré !")
+                        st.rerun(scope="fragment")
+                    else:
+                        st.error(msg_save)
+                else:
+                    st.error(f"Echec détection: {msg}")
@@ -1,22 +1,38 @@
 import streamlit as st
 import os
-import tempfile
-from src.pdf_generator import PDFGenerator
+from datetime import datetime
+from src.export_jobs import get_export_queue, QUEUED, RUNNING, ERROR
+from src.game_manager import StorageError
+from src.print_plan import plan_export
 
 def render(gm, game_name):
-    st.subheader(f"🖨️ Export PDF : {game_name}")
+    st.subheader(f"🖨️ Export : {game_name}")
     
     try:
         config = gm._load_config(game_name)
-        card_types = config.get("card_types", {})
-    except:
-        card_types = {}
+    except StorageError as e:
+        # Stockage saturé / indisponible : surtout ne pas afficher un jeu vide
+        st.error(f"⚠️ {e}")
+        return
+    card_types = config.get("card_types", {})
         
     if not card_types:
         st.warning("Aucun deck configuré.")
         return
 
-    st.markdown("Cochez les decks à inclure dans le fichier PDF.")
+    _render_form(gm, game_name, card_types)
+
+    # Suivi des jobs : on ne rafraîchit périodiquement que si un job est en cours
+    queue = get_export_queue()
+    jobs = queue.list_jobs(game_name)
+    pending = any(j['state'] in (QUEUED, RUNNING) for j in jobs)
+    st.fragment(_render_jobs, run_every="1s" if pending else None)(gm, game_name, pending)
+
+
+@st.fragment
+def _render_form(gm, game_name, card_types):
+    # Fragment : la sélection des decks et des options ne relance que ce formulaire
+    st.markdown("Cochez les decks à inclure dans l'export.")
     
     deck_names = [v['name'] for k, v in card_types.items()]
     type_options = {v['name']: v for k, v in card_types.items()}
@@ -24,49 +40,104 @@ def render(gm, game_name):
     select_all = st.checkbox("Tout sélectionner", value=True)
     selected_decks = st.multiselect("Decks", deck_names, default=deck_names if select_all else [])
 
-    if st.button("🚀 Générer PDF Recto-Verso", type="primary", use_container_width=True):
+    col_mode, col_dpi, col_fmt = st.columns([2, 1, 1])
+    with col_mode:
+        mode = st.radio("Sortie", ["PDF", "Planches images"], horizontal=True)
+    output = {"mode": "pdf"}
+    if mode == "Planches images":
+        with col_dpi:
+            dpi = st.selectbox("Résolution (dpi)", [150, 300, 600], index=1)
+        with col_fmt:
+            fmt = st.selectbox("Format", ["png", "tiff"])
+        output = {"mode": "raster", "dpi": dpi, "format": fmt}
+
+    if selected_decks:
+        _render_plan(gm, game_name, [type_options[d_name] for d_name in selected_decks], output)
+
+    store_in_bucket = st.checkbox("Archiver l'export dans le bucket", value=False)
+
+    queue = get_export_queue()
+    if st.button("🚀 Générer Recto-Verso", type="primary", use_container_width=True):
         if not selected_decks:
             st.warning("Sélectionnez au moins un deck.")
         else:
-            pdf = PDFGenerator()
-            grouped_cards = {}
-            total_count = 0
-            
-            with st.status("Génération en cours...") as status:
-                for d_name in selected_decks:
-                    status.write(f"Ajout de {d_name}...")
-                    data = type_options[d_name]
-                    folder = data['folder']
-                    w, h = data['width_mm'], data['height_mm']
-                    
-                    key = (w, h)
-                    if key not in grouped_cards: grouped_cards[key] = []
-                    
-                    cards = gm.get_cards_by_type(game_name, folder)
-                    back = gm.get_back_image_path(game_name, folder)
-                    
-                    for c in cards:
-                        qty = int(c.get('count', 1))
-                        for _ in range(qty):
-                            grouped_cards[key].append({
-                                'front': c['path'],
-                                'back': back,
-                                'width': w, 
-                                'height': h
-                            })
-                            total_count += 1
-                
-                status.write("Assemblage PDF (téléchargement images)...")
-                for dim, lst in grouped_cards.items():
-                    pdf.add_deck_section(lst)
-                
-                t_file = f"Print_{game_name}.pdf"
-                t_path = os.path.join(tempfile.gettempdir(), t_file)
-                
-                ok, msg = pdf.save(t_path)
-                if ok:
-                    status.update(label="Terminé!", state="complete")
-                    with open(t_path, "rb") as f:
-                        st.download_button("📥 Télécharger PDF", f, file_name=t_file)
-                else:
-                    st.error(msg)
+            decks = [type_options[d_name] for d_name in selected_decks]
+            queue.submit(game_name, decks, store_in_bucket, output)
+            # Rerun complet : la liste des jobs démarre son suivi
+            st.rerun()
+
+
+def _render_plan(gm, game_name, decks, output):
+    """Plan d'impression calculé sur les métadonnées seules (aucune image téléchargée)"""
+    try:
+        plan = plan_export(gm, game_name, decks, mode=output['mode'])
+    except StorageError as e:
+        st.warning(f"Plan d'impression indisponible : {e}")
+        return
+
+    col_sheets, col_pages, col_fill, col_size = st.columns(4)
+    col_sheets.metric("Feuilles (recto-verso)", plan['sheets'])
+    col_pages.metric("Pages", plan['pages'])
+    col_fill.metric("Remplissage", f"{plan['fill']:.0%}")
+    if output['mode'] == "pdf":
+        size = plan['estimated_bytes']
+        col_size.metric("Taille estimée", f"{size / 1e6:.1f} Mo" if size >= 1e6 else f"{size / 1e3:.0f} Ko")
+    else:
+        col_size.metric("Planches", plan['pages'])
+
+    with st.expander("Détail par deck"):
+        st.dataframe([
+            {
+                "deck": p['name'],
+                "format": f"{p['width']} x {p['height']} mm",
+                "cartes": p['cards'],
+                "par feuille": p['per_sheet'],
+                "feuilles": p['sheets'],
+                "remplissage": f"{p['fill']:.0%}" if p['sheets'] else "-",
+                "remarque": p['skipped'] or "",
+            }
+            for p in plan['decks']
+        ], hide_index=True, use_container_width=True)
+
+
+def _render_jobs(gm, game_name, was_pending):
+    queue = get_export_queue()
+    jobs = queue.list_jobs(game_name)
+    if not jobs:
+        return
+
+    st.markdown("### Exports")
+    for job in jobs:
+        with st.container(border=True):
+            decks_label = ", ".join(job.get('decks', []))
+            created = datetime.fromtimestamp(job.get('created', 0)).strftime("%d/%m %H:%M:%S")
+            st.caption(f"{created} — {decks_label}")
+
+            if job['state'] in (QUEUED, RUNNING):
+                st.progress(job.get('progress', 0.0), text=job.get('message', ''))
+            elif job['state'] == ERROR:
+                st.error(job.get('message', 'Erreur.'))
+            else:
+                st.caption(job.get('message', ''))
+                artifact = job.get('artifact')
+                ext = os.path.splitext(artifact or "")[1] or ".pdf"
+                label = "📥 Télécharger planches" if ext == ".zip" else "📥 Télécharger PDF"
+                file_name = f"Print_{game_name}_{job['job_id'][:8]}{ext}"
+                if artifact and os.path.exists(artifact):
+                    with open(artifact, "rb") as f:
+                        st.download_button(label, f, file_name=file_name, key=f"dl_{job['job_id']}")
+                elif job.get('bucket_key'):
+                    # Nom de l'objet réellement archivé (extension comprise), pas l'id du job
+                    url = gm.get_export_url(game_name, os.path.basename(job['bucket_key']))
+                    if url.startswith(('http://', 'https://')):
+                        st.link_button(f"{label} (bucket)", url)
+                    elif os.path.exists(url):
+                        # Stockage local (workdir) : l'"URL" est un chemin, servi directement
+                        with open(url, "rb") as f:
+                            st.download_button(label, f, file_name=file_name, key=f"dl_{job['job_id']}")
+                    else:
+                        st.caption("Fichier d'export introuvable.")
+
+    if was_pending and not any(j['state'] in (QUEUED, RUNNING) for j in jobs):
+        # Plus rien en cours : rerun complet pour arrêter le rafraîchissement
+        st.rerun()
@@ -1,74 +1,153 @@
 import streamlit as st
+import math
+from src.game_manager import StorageError
 
 def render(gm, game_name):
     st.subheader(f"🖼️ Galerie : {game_name}")
     
     try:
         config = gm._load_config(game_name)
-        card_types = config.get("card_types", {})
-    except:
-        card_types = {}
-        
-    type_options = {v['name']: v for k, v in card_types.items()}
+    except StorageError as e:
+        # Stockage saturé / indisponible : surtout ne pas afficher un jeu vide
+        st.error(f"⚠️ {e}")
+        return
+    card_types = config.get("card_types", {})
     
     if not card_types:
          st.info("Aucun type configuré.")
          return
 
-    col_filter, col_size, col_edit = st.columns([2, 2, 1])
+    _render_grid(gm, game_name, card_types)
+
+
+@st.fragment
+def _render_grid(gm, game_name, card_types):
+    # Fragment : filtres, pagination et édition ne relancent que la galerie
+    type_options = {v['name']: v for k, v in card_types.items()}
+
+    col_search, col_min_count, col_all_games = st.columns([4, 1, 1])
+    with col_search:
+        query = st.text_input("🔎 Rechercher une carte", key="gallery_query", placeholder="Nom ou début du nom")
+    with col_min_count:
+        min_count = st.number_input("Qté min.", min_value=1, value=1, step=1, key="gallery_min_count")
+    with col_all_games:
+        # Sur demande seulement : la première recherche charge l'index de tous les jeux du bucket
+        all_games = st.checkbox("Tous les jeux", key="gallery_all_games",
+                                help="Indique aussi les decks des autres jeux contenant la carte")
+
+    col_filter, col_size, col_page_size, col_edit = st.columns([2, 2, 1, 1])
     with col_filter:
         type_filter = st.selectbox("Filtrer par type", ["Tous"] + list(type_options.keys()), key="filter_type")
     with col_size:
         nb_cols = st.slider("Taille de grille", min_value=2, max_value=10, value=6, help="Colonnes")
+    with col_page_size:
+        page_size = st.selectbox("Par page", [12, 24, 48, 96], index=1, key="gallery_page_size")
     with col_edit:
         edit_mode = st.toggle("✏️ Mode Édition", value=False)
     
-    all_cards = []
     folder_to_name = {v['folder']: v['name'] for k, v in card_types.items()}
     
     if type_filter == "Tous":
-            for t_key, t_val in card_types.items():
-                c_list = gm.get_cards_by_type(game_name, t_val['folder'])
-                for c in c_list:
-                    c['type_name'] = t_val['name']
-                    c['folder'] = t_val['folder']
-                    all_cards.append(c)
+        folders = [t_val['folder'] for t_val in card_types.values()]
     else:
-            folder = type_options[type_filter]['folder']
-            all_cards = gm.get_cards_by_type(game_name, folder)
-            for c in all_cards:
-                c['type_name'] = type_filter
-                c['folder'] = folder
+        folders = [type_options[type_filter]['folder']]
 
-    if not all_cards:
+    # Revenir à la première page quand le filtre change
+    if st.session_state.get('gallery_filter') != (type_filter, page_size, query, min_count):
+        st.session_state['gallery_filter'] = (type_filter, page_size, query, min_count)
+        st.session_state['gallery_page'] = 1
+    page = st.session_state.get('gallery_page', 1)
+
+    # Seule la page visible est listée, signée et affichée
+    try:
+        if query.strip() or min_count > 1:
+            # Recherche dans l'index mémoire : aucun listing du stockage
+            page_cards, total = gm.search_cards_page(
+                game_name, query, folders, (page - 1) * page_size, page_size, min_count=min_count
+            )
+            if query.strip():
+                decks = gm.index.decks_containing(game_name, query)
+                if decks:
+                    st.caption("Présente dans : " + ", ".join(f"{name} (x{n})" for name, n in decks.items()))
+                if all_games:
+                    elsewhere = [
+                        f"{game} / {deck} (x{n})"
+                        for (game, deck), n in gm.index.decks_containing_all(query).items() if game != game_name
+                    ]
+                    st.caption("Autres jeux : " + (", ".join(elsewhere) or "aucun"))
+        else:
+            page_cards, total = gm.get_cards_page(game_name, folders, (page - 1) * page_size, page_size)
+    except StorageError as e:
+        st.error(f"⚠️ {e}")
+        return
+    nb_pages = max(1, math.ceil(total / page_size))
+    if page > nb_pages:
+        st.session_state['gallery_page'] = nb_pages
+        st.rerun(scope="fragment")
+
+    if not page_cards:
         st.info("Aucune carte trouvée.")
-    else:
-        cols = st.columns(nb_cols)
-        for i, card in enumerate(all_cards):
-            with cols[i % nb_cols]:
-                st.image(card['path'], use_container_width=True)
-                
-                if not edit_mode:
-                    st.markdown(f"**{card['name']}**")
-                    st.caption(f"{card['type_name']} (x{card.get('count', 1)})")
-                else:
-                    with st.container(border=True):
-                        new_name = st.text_input("Nom", value=card['name'], key=f"name_{i}", label_visibility="collapsed")
-                        
-                        current_type = folder_to_name.get(card['folder'], list(type_options.keys())[0])
-                        try:
-                            idx = list(type_options.keys()).index(current_type)
-                        except: 
-                            idx = 0
-                        new_type = st.selectbox("Type", list(type_options.keys()), index=idx, key=f"t_{i}", label_visibility="collapsed")
-                        new_count = st.number_input("Qté", min_value=1, value=int(card.get('count', 1)), step=1, key=f"q_{i}")
+        return
+
+    col_prev, col_info, col_next = st.columns([1, 3, 1])
+    if col_prev.button("◀", disabled=page <= 1, use_container_width=True, key="gallery_prev"):
+        st.session_state['gallery_page'] = page - 1
+        st.rerun(scope="fragment")
+    col_info.markdown(
+        f"<div style='text-align: center'>Page {page} / {nb_pages} — {total} cartes</div>",
+        unsafe_allow_html=True
+    )
+    if col_next.button("▶", disabled=page >= nb_pages, use_container_width=True, key="gallery_next"):
+        st.session_state['gallery_page'] = page + 1
+        st.rerun(scope="fragment")
+
+    cols = st.columns(nb_cols)
+    missing_thumbnails = []
+    for i, card in enumerate(page_cards):
+        card['type_name'] = folder_to_name.get(card['folder'], card['folder'])
+        # Clés stables : identité de la carte, pas sa position dans la page
+        uid = f"{card['folder']}/{card['name']}"
+        with cols[i % nb_cols]:
+            st.image(_thumbnail(gm, card, missing_thumbnails), use_container_width=True)
+            
+            if not edit_mode:
+                st.markdown(f"**{card['name']}**")
+                st.caption(f"{card['type_name']} (x{card.get('count', 1)})")
+            else:
+                with st.container(border=True):
+                    new_name = st.text_input("Nom", value=card['name'], key=f"name_{uid}", label_visibility="collapsed")
+                    
+                    current_type = folder_to_name.get(card['folder'], list(type_options.keys())[0])
+                    try:
+                        idx = list(type_options.keys()).index(current_type)
+                    except: 
+                        idx = 0
+                    new_type = st.selectbox("Type", list(type_options.keys()), index=idx, key=f"t_{uid}", label_visibility="collapsed")
+                    new_count = st.number_input("Qté", min_value=1, value=int(card.get('count', 1)), step=1, key=f"q_{uid}")
+
+                    c1, c2 = st.columns(2)
+                    if c1.button("💾", key=f"s_{uid}"):
+                        tf = type_options[new_type]['folder']
+                        gm.update_card(game_name, card['folder'], card['name'], new_name, tf, new_count)
+                        st.rerun(scope="fragment")
+                    
+                    if c2.button("🗑️", key=f"d_{uid}"):
+                        gm.delete_card(game_name, card['folder'], card['name'])
+                        st.rerun(scope="fragment")
+
+    if missing_thumbnails:
+        # Miniatures chargées par le pool du préchargement : prêtes pour le prochain affichage
+        from src.layout import get_prefetcher
+        prefetcher = get_prefetcher()
+        if prefetcher.gm is gm:
+            prefetcher.warm_thumbnails(missing_thumbnails)
+
 
-                        c1, c2 = st.columns(2)
-                        if c1.button("💾", key=f"s_{i}"):
-                            tf = type_options[new_type]['folder']
-                            gm.update_card(game_name, card['folder'], card['name'], new_name, tf, new_count)
-                            st.rerun()
-                        
-                        if c2.button("🗑️", key=f"d_{i}"):
-                            gm.delete_card(game_name, card['folder'], card['name'])
-                            st.rerun()
+def _thumbnail(gm, card, missing):
+    # Miniature déjà en mémoire (préchargée), sinon l'URL presignée : la page ne
+    # télécharge jamais d'image elle-même ; la miniature est chargée en arrière-plan
+    thumbnail = gm.cached_thumbnail(card['s3_key'])
+    if thumbnail is None:
+        missing.append(card['s3_key'])
+        return card['path']
+    return thumbnail
@@ -2,7 +2,10 @@ import streamlit as st
 import cv2
 import numpy as np
 import os
-from src.utils import detourer_carte_precise
+from datetime import datetime
+from src.utils import detourer_carte_precise, MODES_DETECTION
+from src.game_manager import StorageError
+from src.tracking import CardTracker, CaptureQueue
 
 def render(gm, game_name):
     st.subheader(f"📸 Scanner : {game_name}")
@@ -11,13 +14,19 @@ def render(gm, game_name):
     with st.expander("🛠️ Paramètres de détection (Avancés)"):
         ppi = st.slider("Qualité (PPI)", 5, 20, 10, help="Plus élevé = meilleure qualité mais plus lent", key="ppi_scan")
         seuil = st.slider("Seuil détection", 20, 100, 45, help="Ajuster si la carte n'est pas détectée", key="seuil_scan")
+        mode = st.selectbox(
+            "Méthode de détection", list(MODES_DETECTION), key="mode_scan",
+            help="contour : rapide ; lignes : coins précis malgré les coins arrondis ; reduit : image réduite de moitié"
+        )
 
     # Charger la configuration
     try:
         config = gm._load_config(game_name)
-        card_types = config.get("card_types", {})
-    except:
-        card_types = {}
+    except StorageError as e:
+        # Stockage saturé / indisponible : surtout ne pas afficher un jeu vide
+        st.error(f"⚠️ {e}")
+        return
+    card_types = config.get("card_types", {})
 
     if not card_types:
         st.warning("⚠️ Veuillez d'abord configurer au moins un type de carte dans l'onglet Configuration.")
@@ -34,9 +43,10 @@ def render(gm, game_name):
     
     # 2. Upload / Camera
     with col_up:
-        input_method = st.radio("Source", ["📁 Fichier", "📷 Caméra"], horizontal=True, label_visibility="collapsed")
+        input_method = st.radio("Source", ["📁 Fichier", "🗜️ Archive", "📷 Caméra", "🎥 Continu"], horizontal=True, label_visibility="collapsed")
         
         uploaded_files = []
+        archive_file = None
         if input_method == "📁 Fichier":
             files = st.file_uploader(
                 "Déposez vos images (Une ou plusieurs)", 
@@ -45,7 +55,13 @@ def render(gm, game_name):
             )
             if files:
                 uploaded_files = files
-        else:
+        elif input_method == "🗜️ Archive":
+            archive_file = st.file_uploader(
+                "Archive de photos (ZIP ou tar)",
+                type=['zip', 'tar', 'gz', 'tgz', 'bz2', 'xz'],
+                key="scan_archive"
+            )
+        elif input_method == "📷 Caméra":
             camera_img = st.camera_input("Prendre une photo")
             if camera_img:
                 # Add a name attribute to mimic UploadedFile behavior if needed, though camera_input returns UploadedFile
@@ -54,117 +70,268 @@ def render(gm, game_name):
 
     st.divider()
 
+    if input_method == "🎥 Continu":
+        _render_continuous(gm, game_name, selected_type_data, ppi, seuil, mode)
+        return
+
+    if archive_file:
+        _render_archive(gm, game_name, archive_file, selected_type_data, ppi, seuil, mode)
+        return
+
     if uploaded_files:
-        # Mode SINGLE FILE
         if len(uploaded_files) == 1:
-            col_scan1, col_scan2 = st.columns([1, 1], gap="large")
-            file = uploaded_files[0]
-            
-            with col_scan1:
-                st.subheader("Prévisualisation")
-                file_bytes = np.asarray(bytearray(file.read()), dtype=np.uint8)
-                image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-                file.seek(0)
-                st.image(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), caption="Original", width=300)
-                
-                if st.button("✨ Traiter l'image", type="primary", use_container_width=True):
-                    with st.spinner("Traitement..."):
-                        res, success, msg = detourer_carte_precise(
-                            image, 
-                            selected_type_data['width_mm'], 
-                            selected_type_data['height_mm'], 
-                            ppi, 
-                            seuil
-                        )
-                        if success:
-                            st.session_state['last_processed'] = res
-                            st.session_state['last_processed_type'] = selected_type_data['folder']
-                            st.success(msg)
-                        else:
-                            st.error(msg)
-
-            with col_scan2:
-                st.subheader("Résultat")
-                if 'last_processed' in st.session_state:
-                    res_rgb = cv2.cvtColor(st.session_state['last_processed'], cv2.COLOR_BGRA2RGBA)
-                    st.image(res_rgb, caption="Carte Détectée", use_container_width=True)
-                    
-                    with st.form("save_single"):
-                        card_name = st.text_input("Nom de la carte")
-                        quantity = st.number_input("Nombre d'exemplaires", min_value=1, value=1, step=1)
-                        if st.form_submit_button("💾 Enregistrer"):
-                            gm.save_card(
-                                game_name, 
-                                st.session_state['last_processed_type'], 
-                                st.session_state['last_processed'], 
-                                card_name or None,
-                                count=quantity
-                            )
-                            st.success("Enregistré !")
-                            del st.session_state['last_processed']
-                            st.rerun()
-
-        # Mode BATCH
+            _render_single(gm, game_name, uploaded_files[0], selected_type_data, ppi, seuil, mode)
         else:
-            st.subheader(f"🔄 Mode Batch : {len(uploaded_files)} images")
+            _render_batch(gm, game_name, uploaded_files, selected_type_data, ppi, seuil, mode)
+
+
+def _render_continuous(gm, game_name, selected_type_data, ppi, seuil, mode):
+    """Capture continue : suivi de la carte dans le flux caméra, capture et enregistrement automatiques"""
+    try:
+        import av
+        from streamlit_webrtc import webrtc_streamer
+    except ImportError:
+        st.info("Le mode continu nécessite streamlit-webrtc et av : `pip install -r requirements.txt`")
+        return
+
+    st.caption("Posez les cartes une à une sous la caméra : chaque carte immobile et nette est capturée puis enregistrée.")
+    col_name, col_qty, col_sharp = st.columns([2, 1, 1])
+    with col_name:
+        base_name = st.text_input("Nom de base", value=f"scan_{datetime.now():%Y%m%d_%H%M%S}", key="continuous_base")
+    with col_qty:
+        quantity = st.number_input("Exemplaires", min_value=1, value=1, step=1, key="continuous_qty")
+    with col_sharp:
+        sharpness_min = st.number_input(
+            "Netteté min.", min_value=0.0, value=60.0, step=10.0, key="continuous_sharpness",
+            help="Variance du laplacien de la carte redressée ; augmenter si des captures sont floues"
+        )
+
+    # Suivi et file d'enregistrement propres à la session, recréés si les paramètres changent
+    folder = selected_type_data['folder']
+    tracker_params = (selected_type_data['width_mm'], selected_type_data['height_mm'], ppi, seuil, mode, sharpness_min)
+    if st.session_state.get('continuous_tracker_params') != tracker_params:
+        L_mm, H_mm = selected_type_data['width_mm'], selected_type_data['height_mm']
+        st.session_state['continuous_tracker'] = CardTracker(L_mm, H_mm, ppi, seuil, mode, sharpness_min=sharpness_min)
+        st.session_state['continuous_tracker_params'] = tracker_params
+    tracker = st.session_state['continuous_tracker']
+
+    capture_queue = st.session_state.get('capture_queue')
+    target = (game_name, folder, base_name, int(quantity))
+    if capture_queue is None or (capture_queue.game_name, capture_queue.folder, capture_queue.base_name, capture_queue.count) != target:
+        if capture_queue:
+            capture_queue.stop()
+        capture_queue = CaptureQueue(gm, *target)
+        st.session_state['capture_queue'] = capture_queue
+
+    # Appelé par streamlit-webrtc dans son propre thread (pas d'accès à st.session_state)
+    def on_frame(frame):
+        image = frame.to_ndarray(format="bgr24")
+        card = tracker.process(image)
+        if card is not None:
+            capture_queue.put(card)
+        return av.VideoFrame.from_ndarray(tracker.draw(image), format="bgr24")
+
+    ctx = webrtc_streamer(
+        key="continuous_scan",
+        video_frame_callback=on_frame,
+        media_stream_constraints={"video": {"width": 1280, "height": 720}, "audio": False},
+        async_processing=True
+    )
+    # Rafraîchissement périodique uniquement pendant le flux ou s'il reste des captures à enregistrer
+    active = ctx.state.playing or capture_queue.pending > 0
+    st.fragment(_render_capture_status, run_every="1s" if active else None)(ctx, capture_queue, active)
+
+
+def _render_capture_status(ctx, capture_queue, was_active):
+    col_c, col_s, col_p = st.columns(3)
+    col_c.metric("Capturées", capture_queue.captured)
+    col_s.metric("Enregistrées", capture_queue.saved)
+    col_p.metric("En attente", capture_queue.pending)
+    for err in capture_queue.errors[-3:]:
+        st.error(err)
+    if capture_queue.last_card is not None:
+        st.image(cv2.cvtColor(capture_queue.last_card, cv2.COLOR_BGRA2RGBA), caption="Dernière capture", width=200)
+
+    if was_active and not ctx.state.playing and capture_queue.pending == 0:
+        # Flux arrêté et tout est enregistré : rerun complet pour arrêter le rafraîchissement
+        st.rerun()
+
+
+@st.fragment
+def _render_archive(gm, game_name, archive_file, selected_type_data, ppi, seuil, mode):
+    # Mode ARCHIVE : photos lues une à une dans l'archive, détourées et enregistrées directement
+    st.subheader(f"🗜️ Archive : {archive_file.name}")
+    st.caption("Chaque photo est enregistrée sous le nom de son fichier (dossiers séparés par _).")
+    quantity = st.number_input("Exemplaires", min_value=1, value=1, step=1, key="archive_qty")
+
+    if st.button("🚀 Traiter et enregistrer", type="primary", key="archive_run"):
+        from src.ingest import ingest_archive
+        status = st.empty()
+        with st.spinner("Import..."):
+            ok, msg, report = ingest_archive(
+                gm, game_name, selected_type_data, archive_file, ppi, seuil, mode,
+                count=quantity, progress=lambda n, name: status.caption(f"{n} fichier(s) traité(s) — {name}")
+            )
+        status.empty()
+        st.session_state['archive_report'] = (archive_file.name, ok, msg, report)
+
+    if st.session_state.get('archive_report'):
+        name, ok, msg, report = st.session_state['archive_report']
+        if name != archive_file.name:
+            return
+        (st.success if ok else st.error)(msg)
+        if report:
+            st.dataframe(
+                [{"fichier": r["member"], "statut": r["status"], "carte": r["card"] or "", "message": r["msg"]} for r in report],
+                hide_index=True, use_container_width=True
+            )
+
+
+def _decode_upload(file):
+    """Décode un fichier uploadé une seule fois par session (clé : file_id)"""
+    cache = st.session_state.setdefault('decoded_uploads', {})
+    file_id = getattr(file, 'file_id', None) or file.name
+    if file_id not in cache:
+        file_bytes = np.asarray(bytearray(file.getvalue()), dtype=np.uint8)
+        # On ne garde que le dernier upload décodé
+        cache.clear()
+        cache[file_id] = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
+    return cache[file_id]
+
+
+@st.fragment
+def _render_single(gm, game_name, file, selected_type_data, ppi, seuil, mode):
+    # Mode SINGLE FILE
+    col_scan1, col_scan2 = st.columns([1, 1], gap="large")
+    
+    with col_scan1:
+        st.subheader("Prévisualisation")
+        image = _decode_upload(file)
+        st.image(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), caption="Original", width=300)
+        
+        if st.button("✨ Traiter l'image", type="primary", use_container_width=True):
+            with st.spinner("Traitement..."):
+                res, success, msg = detourer_carte_precise(
+                    image, 
+                    selected_type_data['width_mm'], 
+                    selected_type_data['height_mm'], 
+                    ppi, 
+                    seuil,
+                    mode=mode
+                )
+                if success:
+                    st.session_state['last_processed'] = res
+                    st.session_state['last_processed_type'] = selected_type_data['folder']
+                    st.success(msg)
+                else:
+                    st.error(msg)
+
+    with col_scan2:
+        st.subheader("Résultat")
+        if 'last_processed' in st.session_state:
+            res_rgb = cv2.cvtColor(st.session_state['last_processed'], cv2.COLOR_BGRA2RGBA)
+            st.image(res_rgb, caption="Carte Détectée", use_container_width=True)
             
-            if st.button(f"🚀 Traiter {len(uploaded_files)} images", type="primary"):
-                progress_bar = st.progress(0)
-                results = []
-                
-                for i, file in enumerate(uploaded_files):
-                    file_bytes = np.asarray(bytearray(file.read()), dtype=np.uint8)
-                    image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
-                    
-                    res, success, msg = detourer_carte_precise(
-                        image, 
-                        selected_type_data['width_mm'], 
-                        selected_type_data['height_mm'], 
-                        ppi, 
-                        seuil
+            with st.form("save_single"):
+                card_name = st.text_input("Nom de la carte")
+                quantity = st.number_input("Nombre d'exemplaires", min_value=1, value=1, step=1)
+                if st.form_submit_button("💾 Enregistrer"):
+                    gm.save_card(
+                        game_name, 
+                        st.session_state['last_processed_type'], 
+                        st.session_state['last_processed'], 
+                        card_name or None,
+                        count=quantity
                     )
-                    results.append({
-                        "filename": file.name,
-                        "image": res if success else None,
-                        "success": success,
-                        "msg": msg
-                    })
-                    progress_bar.progress((i + 1) / len(uploaded_files))
-                
-                st.session_state['batch_results'] = results
-                st.session_state['batch_type'] = selected_type_data['folder']
+                    st.success("Enregistré !")
+                    del st.session_state['last_processed']
+                    st.rerun(scope="fragment")
+
+
+@st.fragment
+def _render_batch(gm, game_name, uploaded_files, selected_type_data, ppi, seuil, mode):
+    # Mode BATCH
+    st.subheader(f"🔄 Mode Batch : {len(uploaded_files)} images")
+
+    normalize = st.checkbox(
+        "🎨 Normaliser couleurs et niveaux",
+        value=False,
+        help="Balance des blancs (bordure des cartes) et niveaux estimés sur tout le batch, appliqués à chaque carte",
+        key="batch_normalize"
+    )
+    
+    if st.button(f"🚀 Traiter {len(uploaded_files)} images", type="primary"):
+        progress_bar = st.progress(0)
+        results = []
+        
+        for i, file in enumerate(uploaded_files):
+            file_bytes = np.asarray(bytearray(file.getvalue()), dtype=np.uint8)
+            image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
             
-            if st.session_state.get('batch_results'):
-                results = st.session_state['batch_results']
-                success_count = sum(1 for r in results if r['success'])
-                st.success(f"{success_count}/{len(results)} réussis")
-                
-                with st.form("save_batch"):
-                    col_b1, col_b2, col_b3 = st.columns([2, 1, 1])
-                    with col_b1:
-                        base_name = st.text_input("Nom de base", placeholder="Optionnel")
-                    with col_b3:
-                        batch_qty = st.number_input("Exemplaires", min_value=1, value=1)
-                    with col_b2:
-                        save_all = st.form_submit_button("💾 Tout Enregistrer")
-
-                    if save_all:
-                        count = 0
-                        for i, r in enumerate(results):
-                            if r['success']:
-                                final_name = f"{base_name}_{i+1}" if base_name else os.path.splitext(r['filename'])[0]
-                                gm.save_card(game_name, st.session_state['batch_type'], r['image'], final_name, count=batch_qty)
-                                count += 1
-                        st.success(f"{count} cartes enregistrées !")
-                        st.session_state['batch_results'] = None
-                        st.rerun()
-
-                st.markdown("### Aperçu")
-                cols = st.columns(4)
+            res, success, msg = detourer_carte_precise(
+                image, 
+                selected_type_data['width_mm'], 
+                selected_type_data['height_mm'], 
+                ppi, 
+                seuil,
+                mode=mode
+            )
+            results.append({
+                "filename": file.name,
+                "image": res if success else None,
+                "success": success,
+                "msg": msg
+            })
+            progress_bar.progress((i + 1) / len(uploaded_files))
+
+        if normalize:
+            from src.color import normalize_batch
+            ok = [r for r in results if r['success']]
+            corrected, correction = normalize_batch([r['image'] for r in ok], ppi=ppi)
+            for r, image in zip(ok, corrected):
+                r['image'] = image
+            if correction:
+                if correction['warning']:
+                    st.warning(correction['warning'])
+                st.caption(
+                    "Correction : gains BGR " + " / ".join(f"{g:.2f}" for g in correction['gains'])
+                    + f", niveaux {correction['levels'][0]:.0f}–{correction['levels'][1]:.0f}"
+                )
+        
+        st.session_state['batch_results'] = results
+        st.session_state['batch_type'] = selected_type_data['folder']
+    
+    if st.session_state.get('batch_results'):
+        results = st.session_state['batch_results']
+        success_count = sum(1 for r in results if r['success'])
+        st.success(f"{success_count}/{len(results)} réussis")
+        
+        with st.form("save_batch"):
+            col_b1, col_b2, col_b3 = st.columns([2, 1, 1])
+            with col_b1:
+                base_name = st.text_input("Nom de base", placeholder="Optionnel")
+            with col_b3:
+                batch_qty = st.number_input("Exemplaires", min_value=1, value=1)
+            with col_b2:
+                save_all = st.form_submit_button("💾 Tout Enregistrer")
+
+            if save_all:
+                count = 0
                 for i, r in enumerate(results):
-                    with cols[i % 4]:
-                        if r['success']:
-                            st.image(cv2.cvtColor(r['image'], cv2.COLOR_BGRA2RGBA), use_container_width=True)
-                            st.caption(f"✅ {r['filename']}")
-                        else:
-                            st.error(f"❌ {r['filename']}")
+                    if r['success']:
+                        final_name = f"{base_name}_{i+1}" if base_name else os.path.splitext(r['filename'])[0]
+                        gm.save_card(game_name, st.session_state['batch_type'], r['image'], final_name, count=batch_qty)
+                        count += 1
+                st.success(f"{count} cartes enregistrées !")
+                st.session_state['batch_results'] = None
+                st.rerun(scope="fragment")
+
+        st.markdown("### Aperçu")
+        cols = st.columns(4)
+        for i, r in enumerate(results):
+            with cols[i % 4]:
+                if r['success']:
+                    st.image(cv2.cvtColor(r['image'], cv2.COLOR_BGRA2RGBA), use_container_width=True)
+                    st.caption(f"✅ {r['filename']}")
+                else:
+                    st.error(f"❌ {r['filename']}")
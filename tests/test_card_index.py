@@ -0,0 +1,39 @@
+import numpy as np
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+
+
+def _gm(tmp_path):
+    gm = GameManager(s3=LocalS3Client(str(tmp_path)), bucket="b")
+    for game in ("G", "H"):
+        gm.create_game(game)
+        gm.add_card_type(game, "A", 60, 90)
+    return gm
+
+
+def _card():
+    return np.full((90, 60, 4), 128, np.uint8)
+
+
+def test_cards_without_metadata_are_indexed(tmp_path):
+    gm = _gm(tmp_path)
+    gm.save_card("G", "A", _card(), "Dragon", count=3)
+    # Carte déposée sans cards.json (ex. synchronisation d'un dossier local)
+    gm.s3.put_object(Bucket="b", Key=f"{gm.root_prefix}G/A/Dragonne.png", Body=b"png")
+    gm._invalidate(f"{gm.root_prefix}G/A/Dragonne.png")
+
+    found = {e["name"]: e["count"] for e in gm.index.search("G", "drag")}
+    assert found == {"Dragon": 3, "Dragonne": 1}
+
+    gm.s3.delete_object(Bucket="b", Key=f"{gm.root_prefix}G/A/Dragonne.png")
+    gm._invalidate(f"{gm.root_prefix}G/A/Dragonne.png")
+    assert [e["name"] for e in gm.index.search("G", "drag")] == ["Dragon"]
+
+
+def test_decks_containing_spans_games(tmp_path):
+    gm = _gm(tmp_path)
+    gm.save_card("G", "A", _card(), "Élan", count=2)
+    gm.save_card("H", "A", _card(), "elan")
+
+    assert gm.index.decks_containing("G", "elan") == {"A": 2}
+    assert gm.index.decks_containing_all("elan") == {("G", "A"): 2, ("H", "A"): 1}
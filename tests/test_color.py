@@ -0,0 +1,24 @@
+import numpy as np
+from src.color import estimate_correction
+
+
+def _card(border, inner=(120, 130, 140)):
+    card = np.full((90, 60, 4), 255, np.uint8)
+    card[:, :, :3] = border
+    card[10:-10, 10:-10, :3] = inner
+    return card
+
+
+def test_near_white_border_is_balanced():
+    correction = estimate_correction([_card((230, 240, 250))], ppi=2)
+    assert correction["warning"] is None
+    b, g, r = correction["gains"]
+    assert b > 1 > r
+
+
+def test_dark_or_coloured_border_is_rejected():
+    for border in ((20, 20, 25), (40, 90, 200)):
+        correction = estimate_correction([_card(border)], ppi=2)
+        assert correction["warning"]
+        assert correction["gains"] == (1.0, 1.0, 1.0)
+
@@ -0,0 +1,51 @@
+import numpy as np
+from pypdf import PdfReader
+from src.export_cache import SectionCache
+from src.exporter import export_decks, export_raster
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+from src.print_derivative import backfill_print_derivatives
+from src.print_plan import plan_export
+
+
+def test_section_rerendered_when_print_settings_change(tmp_path):
+    gm = GameManager(s3=LocalS3Client(str(tmp_path / "store")), bucket="b")
+    gm.create_game("G")
+    gm.add_card_type("G", "A", 63, 88)
+    gm.save_card("G", "A", np.full((88, 63, 4), 200, np.uint8), "c1")
+    decks = list(gm.get_card_types("G").values())
+    cache = SectionCache(str(tmp_path / "cache"))
+
+    def export():
+        ok, _, stats = export_decks(gm, "G", decks, str(tmp_path / "out.pdf"), cache=cache)
+        assert ok
+        return stats["rendered"], stats["cached"]
+
+    gm.set_print_settings("G", {"bleed_mm": 3, "dpi": 100})
+    backfill_print_derivatives(gm, "G")
+    assert export() == (1, 0)
+    assert export() == (0, 1)
+
+    # Même fond perdu, autre résolution : nouveaux dérivés, la section est re-rendue
+    gm.set_print_settings("G", {"bleed_mm": 3, "dpi": 150})
+    backfill_print_derivatives(gm, "G")
+    assert export() == (1, 0)
+
+
+def test_plan_matches_exports_with_bleed(tmp_path):
+    gm = GameManager(s3=LocalS3Client(str(tmp_path / "store")), bucket="b")
+    gm.create_game("G")
+    gm.add_card_type("G", "A", 63, 88)
+    gm.save_card("G", "A", np.full((88, 63, 4), 200, np.uint8), "c1", count=18)
+    gm.set_print_settings("G", {"bleed_mm": 3, "dpi": 100})
+    decks = list(gm.get_card_types("G").values())
+
+    # PDF : emplacements fond perdu compris (6 cartes par feuille)
+    ok, _, _ = export_decks(gm, "G", decks, str(tmp_path / "out.pdf"), cache=SectionCache(str(tmp_path / "cache")))
+    assert ok
+    assert plan_export(gm, "G", decks)["pages"] == len(PdfReader(str(tmp_path / "out.pdf")).pages) == 6
+
+    # Planches images : ni fond perdu ni dérivés (9 cartes par feuille)
+    ok, _, stats = export_raster(gm, "G", decks, str(tmp_path / "out.zip"), dpi=50)
+    assert ok
+    assert plan_export(gm, "G", decks, mode="raster")["pages"] == stats["sheets"] == 4
@@ -0,0 +1,98 @@
+import json
+import numpy as np
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+from src.sync import SyncEngine, merge_json
+
+
+def test_merge_json_keeps_both_sides_changes():
+    base = {"a.png": {"count": 1}, "b.png": {"count": 1}, "c.png": {"count": 1}}
+    local = {"a.png": {"count": 2}, "b.png": {"count": 1}, "d.png": {"count": 1}}
+    remote = {"a.png": {"count": 1}, "b.png": {"count": 3}, "c.png": {"count": 1}, "e.png": {"count": 1}}
+
+    merged, conflicts = merge_json(base, local, remote)
+    assert merged == {"a.png": {"count": 2}, "b.png": {"count": 3}, "d.png": {"count": 1}, "e.png": {"count": 1}}
+    assert conflicts == []
+
+
+def test_merge_json_conflict_keeps_local():
+    merged, conflicts = merge_json({"a": {"count": 1}}, {"a": {"count": 2}}, {"a": {"count": 3}})
+    assert merged == {"a": {"count": 2}}
+    assert conflicts == ["a.count"]
+
+
+def _setup(tmp_path):
+    local = LocalS3Client(str(tmp_path / "local"))
+    remote = LocalS3Client(str(tmp_path / "remote"))
+    gm = GameManager(s3=local, bucket="b")
+    engine = SyncEngine(local, remote, "b", str(tmp_path / "local"), lock=gm.write_lock, on_local_change=gm._invalidate)
+    gm.create_game("G")
+    gm.add_card_type("G", "A", 60, 90)
+    gm.save_card("G", "A", np.full((90, 60, 4), 10, np.uint8), "l1")
+    engine.sync_game("G")
+    # Autre poste travaillant directement sur le bucket distant
+    other = GameManager(s3=remote, bucket="b")
+    return gm, other, engine, remote
+
+
+def _cards(client):
+    return json.loads(client.get_object(Bucket="b", Key="games/G/A/cards.json")["Body"].read())
+
+
+def test_sync_game_merges_cards_changed_on_both_sides(tmp_path):
+    gm, other, engine, remote = _setup(tmp_path)
+    other.update_card("G", "A", "l1", new_count=5)
+    gm.save_card("G", "A", np.full((90, 60, 4), 20, np.uint8), "l2", count=7)
+
+    _, conflicts = engine.sync_game("G")
+    assert conflicts == []
+    expected = {"l1.png": 5, "l2.png": 7}
+    for client in (gm.s3, remote):
+        assert {k: v["count"] for k, v in _cards(client).items()} == expected
+    remote.head_object(Bucket="b", Key="games/G/A/l2.png")
+
+
+def test_sync_game_keeps_local_edit_made_during_pull(tmp_path):
+    gm, other, engine, remote = _setup(tmp_path)
+    other.update_card("G", "A", "l1", new_count=5)
+
+    # Carte enregistrée localement entre le listing et le téléchargement de cards.json
+    get_object = remote.get_object
+
+    def racing_get_object(Bucket, Key):
+        if Key.endswith("cards.json") and not racing_get_object.done:
+            racing_get_object.done = True
+            gm.save_card("G", "A", np.full((90, 60, 4), 20, np.uint8), "l2", count=7)
+        return get_object(Bucket=Bucket, Key=Key)
+    racing_get_object.done = False
+    remote.get_object = racing_get_object
+
+    engine.sync_game("G")
+    engine.sync_game("G")
+    expected = {"l1.png": 5, "l2.png": 7}
+    for client in (gm.s3, remote):
+        assert {k: v["count"] for k, v in _cards(client).items()} == expected
+    remote.head_object(Bucket="b", Key="games/G/A/l2.png")
+
+
+def test_sync_game_merges_again_when_remote_changes_during_merge(tmp_path):
+    gm, other, engine, remote = _setup(tmp_path)
+    other.update_card("G", "A", "l1", new_count=5)
+    gm.save_card("G", "A", np.full((90, 60, 4), 20, np.uint8), "l2", count=7)
+
+    # Modification distante entre la lecture de cards.json et l'envoi de la fusion
+    get_object = remote.get_object
+
+    def racing_get_object(Bucket, Key):
+        resp = get_object(Bucket=Bucket, Key=Key)
+        if Key.endswith("cards.json") and not racing_get_object.done:
+            racing_get_object.done = True
+            other.update_card("G", "A", "l1", new_count=9)
+        return resp
+    racing_get_object.done = False
+    remote.get_object = racing_get_object
+
+    engine.sync_game("G")
+    expected = {"l1.png": 9, "l2.png": 7}
+    for client in (gm.s3, remote):
+        assert {k: v["count"] for k, v in _cards(client).items()} == expected
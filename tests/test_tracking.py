@@ -0,0 +1,49 @@
+import numpy as np
+from src.game_manager import GameManager
+from src.local_storage import LocalS3Client
+from src.tracking import CaptureQueue
+
+
+def _gm(tmp_path):
+    gm = GameManager(s3=LocalS3Client(str(tmp_path)), bucket="b")
+    gm.create_game("G")
+    gm.add_card_type("G", "A", 60, 90)
+    return gm
+
+
+def _capture(queue, value):
+    queue.put(np.full((90, 60, 4), value, np.uint8))
+    queue.queue.join()
+
+
+def test_new_queue_never_overwrites_existing_cards(tmp_path):
+    gm = _gm(tmp_path)
+    first = CaptureQueue(gm, "G", "A", "scan")
+    _capture(first, 10)
+    _capture(first, 20)
+    first.stop()
+    first.thread.join()
+
+    # Nouvelle file sur la même base (ex. nombre d'exemplaires modifié)
+    second = CaptureQueue(gm, "G", "A", "scan", count=2)
+    _capture(second, 30)
+    second.stop()
+    second.thread.join()
+
+    cards = {c['name']: c for c in gm.get_cards_by_type("G", "A")}
+    assert sorted(cards) == ["scan_001", "scan_002", "scan_003"]
+    assert cards["scan_003"]['count'] == 2
+    assert first.errors == [] and second.errors == []
+
+
+def test_concurrent_queues_skip_taken_names(tmp_path):
+    gm = _gm(tmp_path)
+    a = CaptureQueue(gm, "G", "A", "scan")
+    b = CaptureQueue(gm, "G", "A", "scan")
+    _capture(a, 10)
+    _capture(b, 20)
+    for queue in (a, b):
+        queue.stop()
+        queue.thread.join()
+
+    assert sorted(c['name'] for c in gm.get_cards_by_type("G", "A")) == ["scan_001", "scan_002"]